@@ -1,18 +1,24 @@
-import ollama
+import sys
 
-# Test both URLs
+from reasoning_models.endpoints import EndpointPool
+from reasoning_models.transport import ollama_client
+
+# Test both URLs (probed concurrently, winner cached on disk)
 urls = ['http://localhost:11434', 'http://127.0.0.1:11434']
 
-for url in urls:
-    try:
-        client = ollama.Client(host=url)
-        models = client.list()
-        print(f"✅ {url} - Works! Found {len(models.get('models', []))} models")
-        working_url = url
-        break
-    except Exception as e:
-        print(f"❌ {url} - Failed: {e}")
+pool = EndpointPool(urls)
+working_url = pool.resolve()
+
+for record in pool.ranked():
+    if record.healthy:
+        print(f"✅ {record.url} - Works! Found {len(record.models)} models")
+    elif record.last_checked:
+        print(f"❌ {record.url} - Failed: {record.last_error}")
+
+if working_url is None:
+    errors = '; '.join(f"{r.url}: {r.last_error}" for r in pool.ranked() if r.last_error)
+    sys.exit(f"❌ No working Ollama URL ({errors or 'no URLs to try'})")
 
 # Use the working URL
-client = ollama.Client(host=working_url)
-print(f"🤖 Using: {working_url}")
\ No newline at end of file
+client = ollama_client(working_url)
+print(f"🤖 Using: {working_url}")
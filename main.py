@@ -1,6 +1,196 @@
-def main():
-    print("Hello from oreilly-reasoning-models!")
+"""
+Command-line entry point for the course helpers
+
+Each subcommand imports only what it needs, so ``health`` never loads
+pandas and ``--help`` loads nothing but argparse:
+
+    python main.py health --url http://localhost:11434 --model deepseek-r1:14b
+    python main.py generate "What's 2+2?" --stream
+    python main.py score notebooks/llm_model_comparison.csv --weights intelligence=0.4,speed=0.4,cost=0.2
+    python main.py bench --fake --workloads short_chat
+    python main.py import-check --budget-ms 150
+"""
+import argparse
+import os
+import sys
+
+DEFAULT_URL = os.environ.get('OLLAMA_URL', 'http://localhost:11434')
+DEFAULT_MODEL = os.environ.get('OLLAMA_MODEL', 'deepseek-r1:14b')
+# Modules that must not be imported just to start the CLI
+HEAVY_MODULES = ('pandas', 'numpy', 'matplotlib', 'seaborn', 'ollama', 'openai', 'anthropic', 'httpx',
+                 'dotenv', 'requests')
+IMPORT_BUDGET_MS = float(os.environ.get('REASONING_IMPORT_BUDGET_MS', 150))
+
+
+def cmd_health(args):
+    from reasoning_models.endpoints import EndpointPool
+
+    urls = args.url or [u for u in os.environ.get('OLLAMA_URLS', DEFAULT_URL).split(',') if u]
+    pool = EndpointPool(urls, model=args.model, cache_path=None, timeout=args.timeout)
+    pool.probe_all()
+    ok = False
+    for record in pool.ranked():
+        if record.healthy:
+            has_model = args.model is None or args.model in record.models
+            ok = ok or has_model
+            mark = '✅' if has_model else '⚠️ '
+            note = '' if has_model else f" ({args.model} not available)"
+            print(f"{mark} {record.url}: {record.latency * 1000:.0f} ms, {len(record.models)} models{note}")
+        else:
+            print(f"❌ {record.url}: {record.last_error}")
+    return 0 if ok else 1
+
+
+def cmd_generate(args):
+    from reasoning_models.transport import OllamaHTTP
+
+    http = OllamaHTTP(args.url)
+    options = {'num_predict': args.num_predict} if args.num_predict else None
+    if args.stream:
+        for chunk in http.generate(args.model, args.prompt, stream=True, timeout=args.timeout,
+                                   options=options):
+            print(chunk.get('response', ''), end='', flush=True)
+        print()
+    else:
+        response = http.generate(args.model, args.prompt, timeout=args.timeout, options=options)
+        print(response.get('response', ''))
+    return 0
+
+
+def _parse_weights(text):
+    if os.path.exists(text):
+        import json
+
+        with open(text) as f:
+            return json.load(f)
+    weights = {}
+    for part in text.split(','):
+        name, _, value = part.partition('=')
+        weights[name.strip()] = float(value)
+    return weights
+
+
+def cmd_score(args):
+    from reasoning_models.scoring import ScoringEngine, load_table
+    from reasoning_models.selection import pareto_frontier, top_k_frame
+
+    engine = ScoringEngine()
+    frame = load_table(args.models)
+    weights = engine.weights(_parse_weights(args.weights), normalize=True)
+    results = engine.score_frame(frame, weights, sort=args.top is None)
+    if args.top is not None:
+        results = top_k_frame(results, args.top)
+    columns = [c for c in ('model', *engine.names, 'total_score') if c in results.columns]
+    print(results[columns].to_string(index=False))
+    if args.pareto:
+        frontier = pareto_frontier(frame, engine)
+        label = 'model' if 'model' in frontier.columns else frontier.columns[0]
+        print(f"\n🏁 Pareto frontier: {', '.join(map(str, frontier[label]))}")
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"\n✅ Results written to {args.output}")
+    return 0
+
+
+def cmd_bench(args):
+    from reasoning_models.bench import main as bench_main
+
+    return bench_main(args.bench_args)
+
+
+def import_times(argv=None, python=sys.executable):
+    """``({module: cumulative microseconds} of top-level imports, every module imported)`` when running
+    ``main.py argv`` (with ``argv=None``: a bare interpreter, i.e. the startup cost every script pays)"""
+    import subprocess
+
+    command = ['-c', 'pass'] if argv is None else [os.path.abspath(__file__), *argv]
+    result = subprocess.run([python, '-X', 'importtime', *command], capture_output=True, text=True)
+    times, modules = {}, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.add(name.strip())
+        if not name.startswith('  '):       # nested imports are indented
+            times[name.strip()] = int(cumulative)
+    return times, modules
+
+
+def cmd_import_check(args):
+    argv = args.argv or ['--help']
+    # Interpreter startup (site, encodings, .pth hooks) is the same for every script; leave it out
+    startup, startup_modules = import_times()
+    times, modules = import_times(argv)
+    times = {name: micros for name, micros in times.items() if name not in startup}
+    total_ms = sum(times.values()) / 1000
+    # Any depth counts: a light module that pulls in pandas is as slow as importing pandas
+    heavy = sorted({name.split('.')[0] for name in modules - startup_modules
+                    if name.split('.')[0] in HEAVY_MODULES and name.split('.')[0] not in (args.allow or ())})
+    print(f"⏱️  main.py {' '.join(argv)}: {total_ms:.1f} ms of imports (budget {args.budget_ms:g} ms)")
+    for name, micros in sorted(times.items(), key=lambda item: -item[1])[:args.show]:
+        print(f"   {micros / 1000:8.1f} ms  {name}")
+    failed = False
+    if heavy:
+        print(f"❌ Heavy modules imported at startup: {', '.join(heavy)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"❌ Import time over budget by {total_ms - args.budget_ms:.1f} ms")
+        failed = True
+    if not failed:
+        print("✅ Startup imports within budget")
+    return 1 if failed else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='main.py', description='Reasoning models course helpers')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    health = sub.add_parser('health', help='probe Ollama endpoints (all at once)')
+    health.add_argument('--url', action='append', help='endpoint to probe (repeatable; default OLLAMA_URLS)')
+    health.add_argument('--model', default=None, help='also require this model')
+    health.add_argument('--timeout', type=float, default=3.0)
+    health.set_defaults(func=cmd_health)
+
+    generate = sub.add_parser('generate', help='one /api/generate call')
+    generate.add_argument('prompt')
+    generate.add_argument('--url', default=DEFAULT_URL)
+    generate.add_argument('--model', default=DEFAULT_MODEL)
+    generate.add_argument('--stream', action='store_true')
+    generate.add_argument('--num-predict', type=int)
+    generate.add_argument('--timeout', type=float, default=300.0)
+    generate.set_defaults(func=cmd_generate)
+
+    score = sub.add_parser('score', help='weighted scoring of a model catalog')
+    score.add_argument('models', help='CSV, JSON or ColumnStore directory')
+    score.add_argument('--weights', default='intelligence=1,speed=1,cost=1',
+                       help='name=value,... or a JSON file (normalized to sum to 1)')
+    score.add_argument('--top', type=int, help='only the best N models')
+    score.add_argument('--pareto', action='store_true', help='also print the Pareto frontier')
+    score.add_argument('--output', help='write the scored table as CSV')
+    score.set_defaults(func=cmd_score)
+
+    bench = sub.add_parser('bench', help='run reasoning_models.bench (other arguments are passed on)',
+                           add_help=False)
+    bench.set_defaults(func=cmd_bench)
+
+    check = sub.add_parser('import-check', help='fail if CLI startup imports regress (-X importtime)')
+    check.add_argument('argv', nargs='*', help='main.py arguments to measure (default: --help)')
+    check.add_argument('--budget-ms', type=float, default=IMPORT_BUDGET_MS)
+    check.add_argument('--allow', action='append', help='heavy module this command may import (repeatable)')
+    check.add_argument('--show', type=int, default=5, help='list the N slowest imports')
+    check.set_defaults(func=cmd_import_check)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if args.command == 'bench':
+        args.bench_args = extra
+    elif extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    return args.func(args)
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,61 +1,33 @@
 # I'll create a Python script that calculates normalized scores for LLM models based on your specified ranges. The script will handle data input, calculate normalized values and weighted scores, and visualize the results.
+import argparse
+import json
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
-from tabulate import tabulate
+import sys
 
-# Define normalization ranges
-INTELLIGENCE_MAX = 100  # intelligence index
-SPEED_MAX = 500        # tokens per second
-COST_MAX = 100         # $ per 1M tokens
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from reasoning_models.scoring import DEFAULT_CRITERIA, ScoringEngine, load_table
+from reasoning_models.selection import pareto_frontier, top_k_frame
 
-def normalize_score(value, max_value, higher_is_better=True):
-    """Normalize a value to 0-1 range."""
-    bounded_value = max(0, min(value, max_value))
-    
-    if higher_is_better:
-        return bounded_value / max_value
-    else:
-        # For metrics where lower is better (like cost)
-        return 1 - (bounded_value / max_value)
+# Where results are written (override with --output-dir or LLM_COMPARISON_OUTPUT)
+OUTPUT_FOLDER = os.environ.get('LLM_COMPARISON_OUTPUT', os.path.dirname(os.path.abspath(__file__)))
 
-def calculate_scores(models_data, weights):
+def calculate_scores(models_data, weights, criteria=DEFAULT_CRITERIA, top=None):
     """Calculate normalized scores for LLM models."""
-    # Create a copy to avoid modifying the original
-    results = models_data.copy()
-    
-    # Normalize each factor
-    results['intelligence_norm'] = results['intelligence'].apply(
-        lambda x: normalize_score(x, INTELLIGENCE_MAX)
-    )
-    
-    results['speed_norm'] = results['speed'].apply(
-        lambda x: normalize_score(x, SPEED_MAX)
-    )
-    
-    results['cost_norm'] = results['cost'].apply(
-        lambda x: normalize_score(x, COST_MAX, higher_is_better=False)
-    )
-    
-    # Calculate weighted scores for each factor
-    results['intelligence_score'] = weights['intelligence'] * results['intelligence_norm']
-    results['speed_score'] = weights['speed'] * results['speed_norm'] 
-    results['cost_score'] = weights['cost'] * results['cost_norm']
-    
-    # Calculate total weighted score
-    results['total_score'] = (
-        results['intelligence_score'] +
-        results['speed_score'] +
-        results['cost_score']
-    )
-    
-    # Sort by total score
-    return results.sort_values('total_score', ascending=False)
+    # Normalizes every criterion over the whole catalog at once and sorts by total score
+    engine = ScoringEngine(criteria)
+    if top is None:
+        return engine.score_frame(models_data, weights)
+    # Large catalogs: partial selection of the best `top` rows instead of a full sort
+    return top_k_frame(engine.score_frame(models_data, weights, sort=False), top)
 
 def visualize_results(results, weights, save_path):
     """Create visualizations for model comparison."""
+    # Plotting libraries are only imported when a plot is actually requested
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     sns.set(style="whitegrid")
     
     # Create figure with multiple subplots
@@ -102,7 +74,7 @@ def visualize_results(results, weights, save_path):
     scatter = ax4.scatter(
         results['intelligence'], 
         results['speed'],
-        s=400 * (1 - results['cost']/COST_MAX),  # Size inversely related to cost
+        s=400 * results['cost_norm'],  # Size inversely related to cost
         alpha=0.6
     )
     
@@ -128,11 +100,89 @@ def visualize_results(results, weights, save_path):
     plt.savefig(save_path)
     return fig
 
-def main():
+def load_models(path):
+    """Read model data from a CSV or JSON (list of records or dict of columns) file, or a ColumnStore directory."""
+    return load_table(path)
+
+def load_weight_profiles(path, engine):
+    """Read named weight profiles, each normalized to sum to 1.0.
+
+    JSON: {"balanced": {"intelligence": 1, "speed": 1, "cost": 1}, ...}
+    CSV: one row per profile with a `profile` column plus one column per criterion.
+    """
+    if path.endswith('.json'):
+        with open(path) as f:
+            profiles = json.load(f)
+    else:
+        table = pd.read_csv(path).set_index('profile')
+        missing = [name for name in engine.names if name not in table.columns]
+        if missing:
+            raise ValueError(f"{path}: missing criterion columns: {', '.join(missing)}")
+        profiles = table.to_dict('index')
+    weights = {}
+    for name, profile in profiles.items():
+        vector = engine.weights(profile)
+        if np.isnan(vector).any() or (vector < 0).any() or not vector.sum() > 0:
+            raise ValueError(f"{path}: profile {name!r} needs non-negative weights with a positive sum, "
+                             f"got {dict(zip(engine.names, vector.tolist()))}")
+        weights[name] = vector / vector.sum()
+    return weights
+
+def run_batch(args):
+    """Score every weight profile in one pass and write the results without prompting."""
+    engine = ScoringEngine()
+    models = load_models(args.models)
+    profiles = load_weight_profiles(args.weights, engine)
+    results = engine.score_profiles(models, profiles)
+    if args.top:
+        results = results[results['rank'] <= args.top]
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    csv_path = os.path.join(args.output_dir, 'llm_model_comparison_profiles.csv')
+    results.to_csv(csv_path, index=False)
+    print(f"Scored {len(models)} models x {len(profiles)} weight profiles -> {csv_path}")
+
+    for name, group in results.groupby('profile', sort=False):
+        best = group.iloc[0]
+        print(f"- {name}: {best['model']} ({best['total_score']:.3f})")
+
+    if args.plot:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+
+        for name, group in results.groupby('profile', sort=False):
+            fig_path = os.path.join(args.output_dir, f'llm_model_comparison_{name}.png')
+            weights = dict(zip(engine.names, profiles[name]))
+            fig = visualize_results(group, weights, fig_path)
+            plt.close(fig)
+            print(f"- Visualization: {fig_path}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Compare LLMs by weighted intelligence, speed and cost.')
+    parser.add_argument('--models', help='CSV/JSON file with model, intelligence, speed and cost columns')
+    parser.add_argument('--weights', help='JSON/CSV file with named weight profiles (batch mode)')
+    parser.add_argument('--output-dir', default=OUTPUT_FOLDER, help='where to write results')
+    parser.add_argument('--top', type=int, help='keep only the best N models per profile')
+    parser.add_argument('--plot', action='store_true', help='also render a chart per profile (batch mode)')
+    args = parser.parse_args(argv)
+    if bool(args.models) != bool(args.weights):
+        parser.error('batch mode needs both --models and --weights')
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.models:
+        run_batch(args)
+    else:
+        interactive(args.output_dir)
+
+def interactive(output_folder):
+    from tabulate import tabulate
+
     print("\n=== LLM Model Comparison Tool ===\n")
     
     # Set output folder
-    output_folder = '/Users/greatmaster/Desktop/projects/oreilly-live-trainings/oreilly-reasoning-models/notebooks'
     os.makedirs(output_folder, exist_ok=True)
     
     # Option to use example data or input custom data
@@ -172,14 +222,15 @@ def main():
     else:
         # Get user input for models
         models = []
+        max_values = {c.name: c.max_value for c in DEFAULT_CRITERIA}
         num_models = int(input("Enter number of models to compare: "))
         
         for i in range(num_models):
             print(f"\nModel {i+1} details:")
             model_name = input("Model name: ")
-            intelligence = float(input(f"Intelligence score (0-{INTELLIGENCE_MAX}): "))
-            speed = float(input(f"Speed (tokens/s, 0-{SPEED_MAX}): "))
-            cost = float(input(f"Cost ($/1M tokens, 0-{COST_MAX}): "))
+            intelligence = float(input(f"Intelligence score (0-{max_values['intelligence']:g}): "))
+            speed = float(input(f"Speed (tokens/s, 0-{max_values['speed']:g}): "))
+            cost = float(input(f"Cost ($/1M tokens, 0-{max_values['cost']:g}): "))
             
             models.append({
                 'model': model_name,
@@ -223,7 +274,11 @@ def main():
         tablefmt='grid',
         floatfmt='.3f'
     ))
-    
+
+    # Models no other model beats on intelligence, speed and cost at once
+    frontier = pareto_frontier(results)
+    print(f"\nPareto frontier ({len(frontier)} of {len(results)} models): {', '.join(frontier['model'])}")
+
     # Create visualizations
     fig_path = os.path.join(output_folder, 'llm_model_comparison.png')
     visualize_results(results, weights, fig_path)
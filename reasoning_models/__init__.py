@@ -0,0 +1,6 @@
+"""
+Shared helpers for talking to reasoning models (Ollama, Anthropic, OpenAI)
+from the course scripts and notebooks.
+
+Submodules are imported on demand so that ``import reasoning_models`` stays cheap.
+"""
@@ -0,0 +1,32 @@
+"""
+Run coroutines from synchronous code, including inside a running Jupyter loop
+"""
+import asyncio
+import concurrent.futures
+
+
+async def _closing_pools(coro):
+    # The shared AsyncClients are per event loop; close this loop's before asyncio.run discards it
+    try:
+        return await coro
+    finally:
+        from reasoning_models import transport
+
+        await transport.aclose()
+
+
+def run_sync(coro):
+    """Run ``coro`` to completion and return its result.
+
+    Uses ``asyncio.run`` when no loop is running. Inside Jupyter (where a loop
+    is already running in this thread) the coroutine runs on a worker thread.
+    Either way the loop is new, and its pooled HTTP clients are closed before
+    it ends.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_closing_pools(coro))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, _closing_pools(coro)).result()
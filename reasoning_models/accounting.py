@@ -0,0 +1,268 @@
+"""
+Cost and token accounting over rolling, pre-aggregated time windows
+
+Every call (an Ollama ``CallRecord`` or a provider ``Usage``) adds its input,
+cached, thinking and output tokens, its cost and its latency to one bucket
+per window: per model, per minute for the last hour and per hour for the
+last day by default. Buckets live in fixed ring buffers that are overwritten
+as time moves on, so an update is O(1) and memory does not grow with
+traffic. Sums and percentiles only touch the buckets of the window, never the
+raw call log, which keeps cost dashboards cheap.
+
+Thinking tokens are billed as output tokens. Local Ollama models (``name:tag``)
+cost nothing; other prices come from ``PRICES`` (USD per million tokens),
+overridable with a JSON file in ``REASONING_PRICES_PATH``.
+
+    accounting = Accounting()
+    recorder = MetricsRecorder(accounting=accounting)      # every Ollama call
+    client = ReasoningClient('anthropic', 'claude-sonnet-4-20250514', accounting=accounting)
+    accounting.totals(window='hour')                       # calls, tokens and cost over the last day
+    accounting.percentile(95, 'latency', model='deepseek-r1:14b', last=300)
+"""
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from reasoning_models.histogram import LatencyHistogram
+
+PRICES_PATH = os.environ.get('REASONING_PRICES_PATH')
+# (resolution in seconds, buckets kept): a minute-by-minute hour and an hour-by-hour day
+WINDOWS = {'minute': (60, 60), 'hour': (3600, 24)}
+MAX_LATENCY = 1800.0            # seconds; slower calls land in the last histogram bucket
+MAX_CALL_TOKENS = 1_000_000
+TOTALS = ('calls', 'errors', 'input_tokens', 'cached_tokens', 'thinking_tokens', 'output_tokens', 'cost')
+
+
+@dataclass(frozen=True)
+class Prices:
+    """USD per million tokens; thinking tokens are billed as output"""
+    input: float
+    output: float
+    cached_input: float | None = None       # prompt-cache reads, when the provider discounts them
+
+    def cost(self, input_tokens=0, output_tokens=0, cached_tokens=0):
+        cached = cached_tokens or 0
+        cached_price = self.input if self.cached_input is None else self.cached_input
+        return ((input_tokens or 0) - cached) * self.input / 1e6 + cached * cached_price / 1e6 \
+            + (output_tokens or 0) * self.output / 1e6
+
+
+PRICES = {
+    'claude-opus-4': Prices(15.0, 75.0, 1.5),
+    'claude-sonnet-4': Prices(3.0, 15.0, 0.3),
+    'claude-3-7-sonnet': Prices(3.0, 15.0, 0.3),
+    'claude-3-5-haiku': Prices(0.8, 4.0, 0.08),
+    'o1': Prices(15.0, 60.0, 7.5),
+    'o1-preview': Prices(15.0, 60.0, 7.5),
+    'o1-mini': Prices(3.0, 12.0, 1.5),
+    'o3-mini': Prices(1.1, 4.4, 0.55),
+    'gpt-4o': Prices(2.5, 10.0, 1.25),
+    'gpt-4': Prices(10.0, 30.0),
+    'gpt-3.5-turbo': Prices(0.5, 1.5),
+}
+LOCAL = Prices(0.0, 0.0)
+
+
+def load_prices(path=PRICES_PATH):
+    """``PRICES`` updated from a JSON file of ``{model: {"input": ..., "output": ..., "cached_input": ...}}``"""
+    prices = dict(PRICES)
+    if path:
+        with open(path) as f:
+            prices.update({model: Prices(**fields) for model, fields in json.load(f).items()})
+    return prices
+
+
+def price_for(model, prices=PRICES):
+    """Prices of the longest matching name (``o1-mini-2024-09-12`` -> ``o1-mini``); None if unknown"""
+    matches = [name for name in prices if model == name or model.startswith(name + '-')]
+    if matches:
+        return prices[max(matches, key=len)]
+    if ':' in model:
+        return LOCAL        # Ollama tag: runs locally
+    return None
+
+
+def usage_input_tokens(usage):
+    """Input tokens of a ``providers.Usage``, cache reads included"""
+    if usage.provider == 'anthropic' and usage.cached_tokens:
+        # Anthropic's input_tokens excludes cache reads; OpenAI's prompt_tokens includes them
+        return (usage.input_tokens or 0) + usage.cached_tokens
+    return usage.input_tokens
+
+
+def usage_cost(usage, prices=PRICES):
+    """USD for a ``providers.Usage``; None when the model has no price"""
+    model_prices = price_for(usage.model, prices)
+    if model_prices is None:
+        return None
+    return model_prices.cost(usage_input_tokens(usage), usage.output_tokens, usage.cached_tokens)
+
+
+class Bucket:
+    """Totals and per-call distributions for one model over one time slot"""
+
+    def __init__(self, epoch):
+        self.epoch = epoch
+        self.calls = 0
+        self.errors = 0
+        self.input_tokens = 0           # includes cached tokens
+        self.cached_tokens = 0
+        self.thinking_tokens = 0
+        self.output_tokens = 0          # includes thinking tokens
+        self.cost = 0.0
+        self.latency = None
+        self.tokens = None              # output tokens per call
+
+    def add(self, input_tokens, output_tokens, thinking_tokens, cached_tokens, cost, latency, ok):
+        self.calls += 1
+        self.errors += not ok
+        self.input_tokens += input_tokens or 0
+        self.cached_tokens += cached_tokens or 0
+        self.thinking_tokens += thinking_tokens or 0
+        self.output_tokens += output_tokens or 0
+        self.cost += cost
+        if latency is not None:
+            self.latency = self.latency or LatencyHistogram(MAX_LATENCY)
+            self.latency.record(latency)
+        if output_tokens is not None:
+            self.tokens = self.tokens or LatencyHistogram(MAX_CALL_TOKENS, unit=1)
+            self.tokens.record(output_tokens)
+
+
+class RollingWindow:
+    """Ring buffer of ``slots`` buckets, each ``resolution`` seconds wide"""
+
+    def __init__(self, resolution, slots):
+        self.resolution = resolution
+        self.slots = slots
+        self.buckets = [None] * slots
+
+    def bucket(self, t):
+        """The bucket for time ``t``, recycling the slot if it still holds an older period.
+
+        None when ``t`` is older than the period already in its slot (outside the window).
+        """
+        epoch = int(t // self.resolution)
+        i = epoch % self.slots
+        bucket = self.buckets[i]
+        if bucket is not None and bucket.epoch > epoch:
+            return None
+        if bucket is None or bucket.epoch != epoch:
+            bucket = self.buckets[i] = Bucket(epoch)
+        return bucket
+
+    def live(self, now, last=None):
+        """Buckets inside the window ending at ``now``, covering ``last`` seconds (default: all)"""
+        newest = int(now // self.resolution)
+        count = self.slots if last is None else min(self.slots, max(1, -(-int(last) // self.resolution)))
+        return [b for b in self.buckets if b is not None and newest - count < b.epoch <= newest]
+
+
+class Accounting:
+    """Per-model rolling token, cost and latency aggregates; thread-safe"""
+
+    def __init__(self, windows=None, prices=None, clock=time.time):
+        self.windows = dict(windows or WINDOWS)
+        self.prices = prices if prices is not None else load_prices()
+        self.clock = clock
+        self.unpriced = set()           # models seen without a price (counted at zero cost)
+        self._models = {}               # model -> {window name: RollingWindow}
+        self._lock = threading.Lock()
+
+    def cost(self, model, input_tokens=0, output_tokens=0, cached_tokens=0):
+        prices = price_for(model, self.prices)
+        if prices is None:
+            self.unpriced.add(model)
+            return 0.0
+        return prices.cost(input_tokens, output_tokens, cached_tokens)
+
+    def add(self, model, input_tokens=None, output_tokens=None, thinking_tokens=None, cached_tokens=None,
+            latency=None, ok=True, t=None):
+        """Account one call; O(1): one bucket per window"""
+        t = self.clock() if t is None else t
+        cost = self.cost(model, input_tokens, output_tokens, cached_tokens)
+        with self._lock:
+            windows = self._models.get(model)
+            if windows is None:
+                windows = self._models[model] = {name: RollingWindow(*spec) for name, spec in self.windows.items()}
+            for window in windows.values():
+                bucket = window.bucket(t)
+                if bucket is not None:
+                    bucket.add(input_tokens, output_tokens, thinking_tokens, cached_tokens, cost, latency, ok)
+        return cost
+
+    def record(self, record):
+        """Account a metrics ``CallRecord`` (usable as a ``MetricsRecorder`` sink)"""
+        return self.add(record.model, record.prompt_tokens, record.output_tokens, record.thinking_tokens,
+                        latency=record.wall_time if record.ok else None, ok=record.ok, t=record.timestamp)
+
+    def observe_usage(self, usage, latency=None):
+        """Account a provider ``Usage`` (Anthropic, OpenAI or Ollama via ``ReasoningClient``)"""
+        return self.add(usage.model, usage_input_tokens(usage), usage.output_tokens, usage.thinking_tokens,
+                        usage.cached_tokens, latency=latency)
+
+    def models(self):
+        with self._lock:
+            return sorted(self._models)
+
+    def _buckets(self, model, window, last):
+        now = self.clock()
+        with self._lock:
+            names = [model] if model is not None else list(self._models)
+            return [b for name in names if name in self._models
+                    for b in self._models[name][window].live(now, last)]
+
+    def totals(self, model=None, window='hour', last=None):
+        """Sums over ``last`` seconds (default: the whole window), for one model or all"""
+        totals = dict.fromkeys(TOTALS, 0)
+        for bucket in self._buckets(model, window, last):
+            for name in TOTALS:
+                totals[name] += getattr(bucket, name)
+        return totals
+
+    def percentile(self, q, metric='latency', model=None, window='minute', last=None):
+        """``q``-th percentile of per-call latency (seconds) or output tokens; None without data"""
+        if metric not in ('latency', 'tokens'):
+            raise ValueError("metric must be 'latency' or 'tokens'")
+        merged = None
+        for bucket in self._buckets(model, window, last):
+            histogram = getattr(bucket, metric)
+            if histogram is None:
+                continue
+            if merged is None:
+                merged = LatencyHistogram(MAX_LATENCY) if metric == 'latency' else \
+                    LatencyHistogram(MAX_CALL_TOKENS, unit=1)
+            merged.merge(histogram)
+        return merged.percentile(q) if merged else None
+
+    def series(self, model=None, window='minute'):
+        """``[(bucket start time, totals)]``, oldest first, for plotting"""
+        resolution = self.windows[window][0]
+        by_epoch = {}
+        for bucket in self._buckets(model, window, None):
+            totals = by_epoch.setdefault(bucket.epoch, dict.fromkeys(TOTALS, 0))
+            for name in TOTALS:
+                totals[name] += getattr(bucket, name)
+        return [(epoch * resolution, totals) for epoch, totals in sorted(by_epoch.items())]
+
+    def report(self, window='hour', last=None):
+        """Per-model totals with p50/p95 latency"""
+        report = {}
+        for model in self.models():
+            row = self.totals(model, window, last)
+            row['p50_latency'] = self.percentile(50, 'latency', model, window, last)
+            row['p95_latency'] = self.percentile(95, 'latency', model, window, last)
+            report[model] = row
+        return report
+
+    def print_report(self, window='hour', last=None):
+        print(f"💰 Usage by model ({window} window)")
+        print(f"{'Model':<28} {'Calls':>6} {'Input':>10} {'Thinking':>10} {'Output':>10} {'Cost':>10} {'p95 s':>7}")
+        for model, row in self.report(window, last).items():
+            p95 = f"{row['p95_latency']:.2f}" if row['p95_latency'] is not None else '-'
+            print(f"{model:<28} {row['calls']:>6} {row['input_tokens']:>10,} {row['thinking_tokens']:>10,} "
+                  f"{row['output_tokens']:>10,} ${row['cost']:>9.4f} {p95:>7}")
+        if self.unpriced:
+            print(f"⚠️  No prices for: {', '.join(sorted(self.unpriced))} (counted as $0)")
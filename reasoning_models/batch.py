@@ -0,0 +1,176 @@
+"""
+Async batch runner for prompt suites against Ollama /api/generate and /api/chat
+
+Jobs (prompts x models x options) are fanned out with bounded concurrency:
+one semaphore per model sized to the server's ``OLLAMA_NUM_PARALLEL`` plus a
+global cap. Transient failures are retried with exponential backoff and
+jitter, and results are yielded as soon as each job finishes. Pass a
+``ResponseCache`` to skip jobs whose response is already cached, and
+``coalesce=True`` to send identical concurrent jobs to the server only once.
+With a ``Router`` the jobs are spread over several Ollama hosts.
+"""
+import asyncio
+import itertools
+import os
+import random
+import time
+from dataclasses import dataclass, field
+
+import httpx
+
+from reasoning_models._sync import run_sync
+from reasoning_models.cache import cache_key
+from reasoning_models.coalesce import AsyncSingleFlight
+from reasoning_models.metrics import CallMetrics
+from reasoning_models.transport import AsyncOllamaHTTP
+
+DEFAULT_URL = os.environ.get('OLLAMA_URL', 'http://localhost:11434')
+NUM_PARALLEL = int(os.environ.get('OLLAMA_NUM_PARALLEL', 4))        # slots per loaded model
+MAX_LOADED_MODELS = int(os.environ.get('OLLAMA_MAX_LOADED_MODELS', 3))
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+@dataclass(frozen=True)
+class BatchJob:
+    """One request: ``messages`` goes to /api/chat, otherwise ``prompt`` to /api/generate"""
+    model: str
+    prompt: str | None = None
+    messages: list | None = None
+    options: dict = field(default_factory=dict)
+    tag: object = None      # caller's label, e.g. the prompting approach name
+
+
+@dataclass
+class BatchResult:
+    job: BatchJob
+    index: int
+    response: object = None
+    error: BaseException | None = None
+    attempts: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def expand_jobs(prompts, models, options=(None,), chat=True):
+    """Cartesian product of prompts x models x option sets"""
+    jobs = []
+    for prompt, model, opts in itertools.product(prompts, models, options):
+        if chat:
+            job = BatchJob(model, messages=[{'role': 'user', 'content': prompt}], options=opts or {})
+        else:
+            job = BatchJob(model, prompt=prompt, options=opts or {})
+        jobs.append(job)
+    return jobs
+
+
+def is_transient(error):
+    """Connection problems, timeouts and overload/5xx responses are worth retrying"""
+    if isinstance(error, (httpx.TransportError, asyncio.TimeoutError)):
+        return True
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status in RETRY_STATUSES
+
+
+class BatchRunner:
+    """Run many jobs concurrently against one Ollama server (or any async ``call``)"""
+
+    def __init__(self, base_url=DEFAULT_URL, call=None, concurrency=None,
+                 per_model=NUM_PARALLEL, retries=3, backoff=0.5, max_backoff=8.0,
+                 timeout=None, retry_on=is_transient, cache=None, recorder=None, coalesce=False,
+                 router=None):
+        self.base_url = base_url
+        self.router = router
+        self.cache = cache
+        self.coalesce = coalesce
+        self.recorder = recorder
+        self.call = call or self._call_ollama
+        self.concurrency = concurrency or per_model * MAX_LOADED_MODELS * (len(router.hosts) if router else 1)
+        # Every host behind a router has its own slots for each model
+        self.per_model = per_model * (len(router.hosts) if router else 1)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.retry_on = retry_on
+
+    async def _call_ollama(self, job):
+        client = self._flight if self.coalesce else self.router or AsyncOllamaHTTP(self.base_url)
+        options = job.options or None
+        endpoint = 'chat' if job.messages is not None else 'generate'
+        if job.messages is not None:
+            key = cache_key('chat', job.model, messages=job.messages, options=options)
+            call = client.chat(job.model, job.messages, timeout=self.timeout, options=options)
+        else:
+            key = cache_key('generate', job.model, prompt=job.prompt, options=options)
+            call = client.generate(job.model, job.prompt, timeout=self.timeout, options=options)
+
+        cached = self.cache.get(key) if self.cache else None
+        if cached is not None:
+            call.close()
+            return cached
+        metrics = CallMetrics(endpoint, job.model)
+        try:
+            response = await call
+        except Exception as e:
+            if self.recorder:
+                self.recorder.record(metrics.finish(error=e))
+            raise
+        if self.recorder:
+            self.recorder.record(metrics.finish(response))
+        if self.cache:
+            self.cache.put(key, job.model, response)
+        return response
+
+    async def _run_one(self, index, job, limit, model_limits):
+        result = BatchResult(job, index)
+        async with model_limits[job.model], limit:
+            start = time.perf_counter()
+            for attempt in range(self.retries + 1):
+                result.attempts = attempt + 1
+                try:
+                    result.response = await self.call(job)
+                    result.error = None
+                    break
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    result.error = e
+                    if attempt == self.retries or not self.retry_on(e):
+                        break
+                    delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+                    await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            result.elapsed = time.perf_counter() - start
+        return result
+
+    async def as_completed(self, jobs):
+        """Async generator yielding BatchResults in completion order"""
+        jobs = list(jobs)
+        if self.coalesce:
+            # In-flight requests are tied to this event loop
+            self._flight = AsyncSingleFlight(self.router or self.base_url)
+        limit = asyncio.Semaphore(self.concurrency)
+        model_limits = {job.model: asyncio.Semaphore(self.per_model) for job in jobs}
+        tasks = [asyncio.create_task(self._run_one(i, job, limit, model_limits))
+                 for i, job in enumerate(jobs)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def arun(self, jobs):
+        """All results, in the same order as ``jobs``"""
+        results = [None] * len(jobs)
+        async for result in self.as_completed(jobs):
+            results[result.index] = result
+        return results
+
+    def run(self, jobs):
+        return run_sync(self.arun(list(jobs)))
@@ -0,0 +1,250 @@
+"""
+Reproducible inference benchmark for Ollama (or the bundled fake server)
+
+Runs fixed workloads and reports p50/p95/p99 latency, time to first token
+and tokens/sec as JSON that can be compared against a saved baseline:
+
+    python -m reasoning_models.bench --fake --output bench.json
+    python -m reasoning_models.bench --url http://localhost:11434 --baseline bench.json
+
+Workloads:
+    short_chat          sequential short chat turns (warm model)
+    long_reasoning      a long reasoning prompt with a large num_predict
+    concurrent_streams  N simultaneous streamed chats
+    cold_load           first call after unloading vs the following warm call
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+
+from reasoning_models._sync import run_sync
+from reasoning_models.metrics import CallMetrics
+from reasoning_models.transport import AsyncOllamaHTTP
+
+DEFAULT_MODEL = 'deepseek-r1:14b'
+SHORT_PROMPT = "Hello! What's 2+2? Give a brief answer."
+LONG_PROMPT = """A company has revenue of $500,000, costs of $300,000, and wants to expand.
+The expansion will cost $100,000 and increase revenue by 40% while increasing costs by 25%.
+Think through this step by step: calculate current profit, post-expansion revenue and costs,
+new profit and payback period, then make a recommendation."""
+WORKLOADS = ('short_chat', 'long_reasoning', 'concurrent_streams', 'cold_load')
+
+
+def percentile(values, q):
+    """Linear-interpolated percentile (q in 0-100) of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(records, wall_time):
+    """Aggregate CallRecords of one workload"""
+    ok = [r for r in records if r.ok]
+    latencies = [r.wall_time for r in ok]
+    ttfts = [r.ttft for r in ok if r.ttft is not None]
+    rates = [r.tokens_per_second for r in ok if r.tokens_per_second]
+    tokens = sum(r.output_tokens or 0 for r in ok)
+    summary = {
+        'requests': len(records),
+        'errors': len(records) - len(ok),
+        'wall_time': wall_time,
+        'throughput_tokens_per_second': tokens / wall_time if wall_time else None,
+        'tokens_per_second_mean': sum(rates) / len(rates) if rates else None,
+    }
+    for name, values in (('latency', latencies), ('ttft', ttfts)):
+        for q in (50, 95, 99):
+            summary[f'{name}_p{q}'] = percentile(values, q)
+    return summary
+
+
+class Benchmark:
+    def __init__(self, base_url, model=DEFAULT_MODEL, requests=5, concurrency=4,
+                 long_tokens=1024, timeout=600):
+        self.client = AsyncOllamaHTTP(base_url)
+        self.model = model
+        self.requests = requests
+        self.concurrency = concurrency
+        self.long_tokens = long_tokens
+        self.timeout = timeout
+        self.records = []
+
+    async def _stream(self, prompt, **options):
+        metrics = CallMetrics('chat', self.model, streamed=True)
+        last = None
+        try:
+            messages = [{'role': 'user', 'content': prompt}]
+            async for chunk in self.client.chat_stream(self.model, messages, timeout=self.timeout,
+                                                       options=options or None):
+                metrics.observe_chunk(chunk)
+                last = chunk
+        except Exception as e:
+            return metrics.finish(last, error=e)
+        return metrics.finish(last)
+
+    async def _unload(self):
+        await self.client.generate(self.model, '', keep_alive=0, timeout=self.timeout)
+
+    async def _warm(self):
+        await self.client.generate(self.model, '', timeout=self.timeout)
+
+    async def short_chat(self):
+        await self._warm()
+        return [await self._stream(SHORT_PROMPT, seed=i) for i in range(self.requests)]
+
+    async def long_reasoning(self):
+        await self._warm()
+        return [await self._stream(LONG_PROMPT, num_predict=self.long_tokens, seed=i)
+                for i in range(max(1, self.requests // 2))]
+
+    async def concurrent_streams(self):
+        await self._warm()
+        calls = [self._stream(SHORT_PROMPT, seed=i) for i in range(self.concurrency)]
+        return list(await asyncio.gather(*calls))
+
+    async def cold_load(self):
+        records = []
+        for i in range(max(1, self.requests // 2)):
+            await self._unload()
+            cold = await self._stream(SHORT_PROMPT, seed=i)
+            cold.tags['phase'] = 'cold'
+            warm = await self._stream(SHORT_PROMPT, seed=i + 1000)
+            warm.tags['phase'] = 'warm'
+            records += [cold, warm]
+        return records
+
+    async def run(self, workloads=WORKLOADS):
+        results = {}
+        for name in workloads:
+            start = time.perf_counter()
+            records = await getattr(self, name)()
+            for record in records:
+                record.tags['workload'] = name
+            self.records += records
+            summary = summarize(records, time.perf_counter() - start)
+            if name == 'cold_load':
+                for phase in ('cold', 'warm'):
+                    subset = [r for r in records if r.tags.get('phase') == phase]
+                    summary[f'{phase}_latency_p50'] = percentile([r.wall_time for r in subset if r.ok], 50)
+                    summary[f'{phase}_load_time_p50'] = percentile(
+                        [r.load_time for r in subset if r.ok and r.load_time is not None], 50)
+            results[name] = summary
+        return results
+
+
+# Metrics where a larger value is better; everything else is a latency/time
+HIGHER_IS_BETTER = {'throughput_tokens_per_second', 'tokens_per_second_mean'}
+COMPARED = ('latency_p50', 'latency_p95', 'latency_p99', 'ttft_p50', 'ttft_p95',
+            'throughput_tokens_per_second', 'tokens_per_second_mean')
+
+
+def compare(current, baseline, tolerance=0.10):
+    """List of regressions beyond ``tolerance`` (relative) against a baseline report"""
+    regressions = []
+    for workload, summary in current['workloads'].items():
+        base = baseline.get('workloads', {}).get(workload)
+        if not base:
+            continue
+        for metric in COMPARED:
+            new, old = summary.get(metric), base.get(metric)
+            if not new or not old:
+                continue
+            change = (new - old) / old
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            if worse > tolerance:
+                regressions.append({'workload': workload, 'metric': metric,
+                                    'baseline': old, 'current': new, 'change': change})
+    return regressions
+
+
+def print_report(report, regressions=None):
+    print(f"\n📊 Benchmark: {report['model']} @ {report['base_url']}")
+    print("=" * 78)
+    print(f"{'Workload':<20} | {'p50':>8} | {'p95':>8} | {'p99':>8} | {'TTFT p50':>8} | {'tok/s':>8}")
+    print("-" * 78)
+    fmt = lambda v: f"{v:8.3f}" if v is not None else f"{'-':>8}"
+    for name, s in report['workloads'].items():
+        print(f"{name:<20} | {fmt(s['latency_p50'])} | {fmt(s['latency_p95'])} | "
+              f"{fmt(s['latency_p99'])} | {fmt(s['ttft_p50'])} | {fmt(s['tokens_per_second_mean'])}")
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) vs baseline:")
+        for r in regressions:
+            print(f"   {r['workload']}.{r['metric']}: {r['baseline']:.3f} -> {r['current']:.3f} "
+                  f"({r['change'] * 100:+.1f}%)")
+    elif regressions is not None:
+        print("\n✅ No regressions vs baseline")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark Ollama inference latency and throughput')
+    parser.add_argument('--url', default=os.environ.get('OLLAMA_URL', 'http://localhost:11434'))
+    parser.add_argument('--fake', action='store_true', help='run against a local fake Ollama server')
+    parser.add_argument('--token-rate', type=float, default=200.0, help='fake server tokens/sec')
+    parser.add_argument('--jitter', type=float, default=0.2, help='fake server token jitter fraction')
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--workloads', nargs='+', choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument('--requests', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--long-tokens', type=int, default=1024)
+    parser.add_argument('--output', help='write the JSON report here')
+    parser.add_argument('--baseline', help='compare against a saved JSON report')
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    parser.add_argument('--store', help='append every call record to this columnar store directory')
+    args = parser.parse_args(argv)
+
+    server = None
+    base_url = args.url
+    if args.fake:
+        from reasoning_models.fake_server import FakeOllamaConfig, FakeOllamaServer
+
+        config = FakeOllamaConfig(models=[args.model], token_rate=args.token_rate, jitter=args.jitter)
+        server = FakeOllamaServer(config)
+        base_url = server.start()
+
+    try:
+        bench = Benchmark(base_url, args.model, args.requests, args.concurrency, args.long_tokens)
+        workloads = run_sync(bench.run(args.workloads))
+    finally:
+        if server:
+            server.stop()
+
+    report = {
+        'model': args.model,
+        'base_url': 'fake' if args.fake else base_url,
+        'created_at': time.time(),
+        'python': platform.python_version(),
+        'settings': {k: getattr(args, k) for k in ('requests', 'concurrency', 'long_tokens',
+                                                   'token_rate', 'jitter')},
+        'workloads': workloads,
+    }
+
+    regressions = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        report['regressions'] = regressions
+
+    print_report(report, regressions)
+    if args.store:
+        from reasoning_models.metrics import CallRecord
+        from reasoning_models.store import ColumnStore
+
+        with ColumnStore(args.store, schema=CallRecord) as store:
+            store.append(bench.records)
+        print(f"\n✅ {len(bench.records)} call records appended to {args.store}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report written to {args.output}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Thinking-budget controller for local reasoning models
+
+Claude caps reasoning with ``budget_tokens``; DeepSeek-R1 via Ollama has no
+such knob and can think for 20k tokens while holding a server slot. The
+controller streams the chat, counts thinking tokens live (Ollama sends about
+one token per chunk) and, once the token budget or wall-clock deadline is
+hit, closes the stream so the connection and slot are freed immediately.
+Then it either stops (``on_exceed='abort'``) or asks for the answer by
+continuing the conversation with the thinking so far plus a closing
+``</think>`` as an assistant prefill (``on_exceed='continue'``, which needs an
+Ollama version that continues a trailing assistant message).
+
+    controller = ThinkingBudget(client, max_thinking_tokens=2000, deadline=60)
+    for event in controller.stream('deepseek-r1:14b', messages):
+        ...
+    print(controller.stats)
+"""
+import os
+import time
+from dataclasses import dataclass
+
+from reasoning_models.thinking import (THINK_OPEN, AnswerDelta, ThinkingDelta, ThinkingFinished,
+                                       ThinkParser, chunk_text, collect)
+
+THINKING_BUDGET = int(os.environ.get('REASONING_THINKING_BUDGET', 4096))
+FORCE_ANSWER = "\n\nI have thought about this enough. Time to give the final answer.\n</think>\n\n"
+
+
+@dataclass(frozen=True)
+class BudgetExceeded:
+    """The thinking phase was cut off; ``reason`` is 'tokens' or 'deadline'"""
+    reason: str
+    thinking_tokens: int
+    elapsed: float
+
+
+@dataclass
+class BudgetStats:
+    thinking_tokens: int = 0
+    answer_tokens: int = 0
+    elapsed: float = 0.0
+    exceeded: str | None = None     # 'tokens', 'deadline' or None
+    continued: bool = False         # answer came from a forced continuation
+
+
+class ThinkingBudget:
+    """Enforce a thinking-token budget and deadline on streamed chats.
+
+    ``http`` is anything with ``chat(model, messages, stream=True, **kwargs)``
+    returning an iterator of Ollama chunks: ``OllamaHTTP``, ``CachedOllama``,
+    ``InstrumentedOllama`` or ``ollama.Client``.
+    """
+
+    def __init__(self, http, max_thinking_tokens=THINKING_BUDGET, deadline=None,
+                 on_exceed='continue', answer_tokens=None, force_answer=FORCE_ANSWER, in_thinking=False):
+        if on_exceed not in ('continue', 'abort'):
+            raise ValueError("on_exceed must be 'continue' or 'abort'")
+        self.http = http
+        self.max_thinking_tokens = max_thinking_tokens
+        self.deadline = deadline
+        self.on_exceed = on_exceed
+        self.answer_tokens = answer_tokens
+        self.force_answer = force_answer
+        self.in_thinking = in_thinking
+        self.stats = BudgetStats()
+
+    def _exceeded(self, elapsed):
+        if self.max_thinking_tokens is not None and self.stats.thinking_tokens >= self.max_thinking_tokens:
+            return 'tokens'
+        if self.deadline is not None and elapsed >= self.deadline:
+            return 'deadline'
+        return None
+
+    def stream(self, model, messages, **kwargs):
+        """Generator of thinking/answer events, plus ``BudgetExceeded`` when cut off"""
+        stats = self.stats = BudgetStats()
+        start = time.perf_counter()
+        parser = ThinkParser(in_thinking=self.in_thinking)
+        thinking = []
+        chunks = self.http.chat(model, messages, stream=True, **kwargs)
+        try:
+            for chunk in chunks:
+                text, content = chunk_text(chunk)
+                events = parser.feed_thinking(text) if text else []
+                if content:
+                    events += parser.feed(content)
+                thought = False
+                for event in events:
+                    if isinstance(event, ThinkingDelta):
+                        thinking.append(event.text)
+                        thought = True
+                    elif isinstance(event, AnswerDelta):
+                        stats.answer_tokens += 1
+                    yield event
+                stats.thinking_tokens += thought
+                if parser.in_thinking:
+                    stats.exceeded = self._exceeded(time.perf_counter() - start)
+                    if stats.exceeded:
+                        break
+            else:
+                yield from parser.close()
+        finally:
+            # Closing the stream drops the HTTP connection, which stops generation server-side
+            close = getattr(chunks, 'close', None)
+            if close:
+                close()
+
+        if stats.exceeded:
+            yield BudgetExceeded(stats.exceeded, stats.thinking_tokens, time.perf_counter() - start)
+            yield ThinkingFinished()
+            if self.on_exceed == 'continue':
+                yield from self._continue(model, messages, ''.join(thinking), kwargs)
+        stats.elapsed = time.perf_counter() - start
+
+    def _continue(self, model, messages, thinking, kwargs):
+        """Stream the answer after closing the think block ourselves"""
+        self.stats.continued = True
+        # With ``in_thinking`` the chat template already opened the block
+        opened = self.in_thinking or thinking.lstrip().startswith(THINK_OPEN)
+        prefill = {'role': 'assistant', 'content': ('' if opened else THINK_OPEN) + thinking + self.force_answer}
+        if self.answer_tokens:
+            kwargs = {**kwargs, 'options': {**(kwargs.get('options') or {}), 'num_predict': self.answer_tokens}}
+        parser = ThinkParser()
+        chunks = self.http.chat(model, list(messages) + [prefill], stream=True, **kwargs)
+        for chunk in chunks:
+            _, content = chunk_text(chunk)
+            events = parser.feed(content) if content else []
+            self.stats.answer_tokens += any(isinstance(e, AnswerDelta) for e in events)
+            yield from events
+        yield from parser.close()
+
+    def complete(self, model, messages, **kwargs):
+        """Run the budgeted stream to the end; returns a ThinkingResult (see ``stats``)"""
+        return collect(self.stream(model, messages, **kwargs))
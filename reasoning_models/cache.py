@@ -0,0 +1,223 @@
+"""
+Content-addressed, on-disk response cache for reasoning calls
+
+Responses are stored in SQLite under a SHA-256 of the canonical JSON of
+(endpoint, model, messages/prompt, generation options); transport settings
+(``timeout``, ``keep_alive``, ``stream``) are left out, so every caller of
+``cache_key`` shares entries for the same request. Entries expire after a
+TTL and the least recently used ones are evicted once the store grows past
+its size budget. Streamed responses are stored chunk by chunk, so a cache
+hit can replay the stream and the notebook streaming demos still work.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import partial
+from pathlib import Path
+
+from reasoning_models.transport import OllamaHTTP
+
+CACHE_PATH = Path(os.environ.get(
+    'REASONING_CACHE_PATH',
+    Path.home() / '.cache' / 'oreilly-reasoning-models' / 'responses.sqlite3',
+))
+CACHE_TTL = float(os.environ.get('REASONING_CACHE_TTL', 7 * 24 * 3600))
+CACHE_MAX_BYTES = int(os.environ.get('REASONING_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+CACHE_BYPASS = os.environ.get('REASONING_CACHE_BYPASS', '').lower() in ('1', 'true', 'yes')
+SWEEP_EVERY = 1000          # writes between TTL sweeps while the store is under budget
+EVICT_TO = 0.9              # LRU eviction frees space down to this share of max_bytes
+TRANSPORT_KWARGS = frozenset({'timeout', 'keep_alive', 'stream'})     # do not change the generated text
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    streamed INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+"""
+
+
+def cache_key(endpoint, model, **request):
+    """SHA-256 of the canonical JSON of everything that determines the response (``TRANSPORT_KWARGS`` excluded)"""
+    payload = {'endpoint': endpoint, 'model': model}
+    payload.update({k: v for k, v in request.items() if v is not None and k not in TRANSPORT_KWARGS})
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _row_key(key, streamed):
+    # The key leaves ``stream`` out; a request's chunk list and its single response are separate rows
+    return f'{key}:stream' if streamed else key
+
+
+class ResponseCache:
+    """SQLite-backed store with TTL expiry and LRU eviction by total size"""
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._bytes = None          # running total of body sizes; resynced by every evict()
+        self._writes = 0
+        self._lock = threading.Lock()
+        if str(path) != ':memory:':
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(_SCHEMA)
+
+    def _get(self, key, streamed):
+        now = time.time()
+        key = _row_key(key, streamed)
+        with self._lock:
+            row = self._db.execute(
+                'SELECT body, created FROM responses WHERE key = ? AND streamed = ?',
+                (key, int(streamed)),
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                return None
+            self._db.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def _put(self, key, model, streamed, value):
+        body = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        key = _row_key(key, streamed)
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = self._total()
+            old = self._db.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            self._db.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, model, int(streamed), now, now, len(body), body),
+            )
+            self._bytes += len(body) - (old[0] if old else 0)
+            self._writes += 1
+            # Full-table work only when the tracked size crosses the budget, or now and then for the TTL
+            due = self._bytes > self.max_bytes or self._writes % SWEEP_EVERY == 0
+        if due:
+            self.evict()
+
+    def _total(self):
+        return self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def get(self, key):
+        """Cached non-streamed response dict, or None"""
+        return self._get(key, streamed=False)
+
+    def put(self, key, model, response):
+        self._put(key, model, False, response)
+
+    def get_chunks(self, key):
+        """Cached list of stream chunks, or None"""
+        return self._get(key, streamed=True)
+
+    def put_chunks(self, key, model, chunks):
+        self._put(key, model, True, chunks)
+
+    def evict(self):
+        """Drop expired entries; over max_bytes, drop least recently used ones down to EVICT_TO of it"""
+        with self._lock:
+            self._db.execute('DELETE FROM responses WHERE created < ?', (time.time() - self.ttl,))
+            # Exact total: other processes may share the file
+            total = self._bytes = self._total()
+            if total <= self.max_bytes:
+                return
+            rows = self._db.execute('SELECT key, size FROM responses ORDER BY accessed').fetchall()
+            doomed = []
+            # Headroom below the budget, so the next writes do not each trigger another full scan
+            target = self.max_bytes * EVICT_TO
+            for key, size in rows:
+                if total <= target:
+                    break
+                doomed.append((key,))
+                total -= size
+            self._db.executemany('DELETE FROM responses WHERE key = ?', doomed)
+            self._bytes = total
+
+    def clear(self):
+        with self._lock:
+            self._db.execute('DELETE FROM responses')
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses'
+            ).fetchone()
+        return {'entries': entries, 'bytes': size, 'hits': self.hits, 'misses': self.misses}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class CachedOllama:
+    """Drop-in for the ``ollama.Client`` calls the notebooks make, with a response cache.
+
+    ``chat``/``generate`` return plain dicts (or iterators of chunk dicts when
+    streaming). Pass ``bypass=True`` (or set ``REASONING_CACHE_BYPASS=1``) to
+    force a fresh call; the fresh result still refreshes the cache.
+    ``replay_delay`` spaces out replayed chunks to mimic live streaming.
+    ``http`` swaps in another front end, e.g. ``InstrumentedOllama``.
+    """
+
+    def __init__(self, base_url, cache=None, bypass=CACHE_BYPASS, replay_delay=0.0, http=None):
+        self.http = http or OllamaHTTP(base_url)
+        self.cache = cache or ResponseCache()
+        self.bypass = bypass
+        self.replay_delay = replay_delay
+
+    def list(self):
+        return self.http.tags()
+
+    def chat(self, model, messages, stream=False, bypass=False, **kwargs):
+        key = cache_key('chat', model, messages=messages, **kwargs)
+        call = partial(self.http.chat, model, messages, stream=stream, **kwargs)
+        return self._cached(key, model, stream, bypass, call)
+
+    def generate(self, model, prompt, stream=False, bypass=False, **kwargs):
+        key = cache_key('generate', model, prompt=prompt, **kwargs)
+        call = partial(self.http.generate, model, prompt, stream=stream, **kwargs)
+        return self._cached(key, model, stream, bypass, call)
+
+    def _cached(self, key, model, stream, bypass, call):
+        fresh = bypass or self.bypass
+        if stream:
+            chunks = None if fresh else self.cache.get_chunks(key)
+            if chunks is not None:
+                return self._replay(chunks)
+            return self._record(key, model, call())
+
+        response = None if fresh else self.cache.get(key)
+        if response is None:
+            response = call()
+            self.cache.put(key, model, response)
+        return response
+
+    def _replay(self, chunks):
+        for chunk in chunks:
+            if self.replay_delay:
+                time.sleep(self.replay_delay)
+            yield chunk
+
+    def _record(self, key, model, stream):
+        chunks = []
+        for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+        # Only complete streams are cached; an abandoned stream never gets here
+        if chunks and chunks[-1].get('done'):
+            self.cache.put_chunks(key, model, chunks)
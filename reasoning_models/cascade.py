@@ -0,0 +1,415 @@
+"""
+Adaptive model cascade: small models first, escalate only when unsure
+
+Each prompt goes to the cheapest tier first, e.g. a 1.5B R1 distill with a
+tight token budget and a few self-consistency samples. The tier's answer is
+accepted when it looks trustworthy: it passes the tier's format check
+(``validate``) and enough samples agree (``min_agreement``). Otherwise the
+prompt moves up to the next tier, up to ``deepseek-r1:14b`` or a hosted
+reasoning model, whose answer is always taken. Per-tier stats show where the
+traffic ends up and what each tier costs in latency, tokens and money.
+
+Thresholds are tuned offline. ``collect`` runs every tier on a prompt set
+and logs each tier's answer and confidence to JSONL. ``replay`` then
+simulates any threshold setting on that log without calling a model, and
+``sweep`` finds the cheapest setting whose accuracy (against the reference
+answers, or the top tier's) stays above a target.
+
+    cascade = Cascade([Tier('deepseek-r1:1.5b', samples=3, max_tokens=1024, min_agreement=2/3),
+                       Tier('deepseek-r1:14b')])
+    result = cascade.run([{'role': 'user', 'content': 'What is 27 * 453?'}])
+    cascade.print_stats()
+
+    python -m reasoning_models.cascade collect prompts.txt --fake --output cascade.jsonl
+    python -m reasoning_models.cascade sweep cascade.jsonl --target 0.95
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import sys
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from fractions import Fraction
+
+from reasoning_models._sync import run_sync
+from reasoning_models.accounting import usage_cost
+from reasoning_models.consistency import SelfConsistency, extract_answer
+from reasoning_models.histogram import LatencyHistogram
+from reasoning_models.transport import AsyncOllamaHTTP
+
+DEFAULT_URL = os.environ.get('OLLAMA_URL', 'http://localhost:11434')
+GRID = (0.0, 1/3, 0.5, 2/3, 0.75, 1.0)         # min_agreement values tried by ``sweep``
+_EPSILON = 1e-9                                 # 2/3 of 3 samples meets min_agreement=2/3 despite rounding
+
+
+def agrees(agreement, min_agreement):
+    """Whether a share of agreeing samples meets ``min_agreement``"""
+    return agreement >= min_agreement - _EPSILON
+
+
+def votes_needed(min_agreement, samples):
+    """Smallest number of agreeing samples that meets ``min_agreement`` (at least 1)"""
+    return max(1, math.ceil(min_agreement * samples - _EPSILON))
+
+
+def parse_share(text):
+    """'0.5', '2/3' -> float"""
+    return float(Fraction(text.strip()))
+
+
+def format_share(value):
+    """0.666... -> '2/3'"""
+    return str(Fraction(value).limit_denominator(100))
+
+
+@dataclass
+class Tier:
+    """One step of the cascade; ``provider`` other than 'ollama' goes through ``ReasoningClient``"""
+    model: str
+    provider: str = 'ollama'
+    samples: int = 1
+    min_agreement: float = 0.0      # share of samples that must give the winning answer
+    max_tokens: int | None = None   # tight budget for small tiers (num_predict / max_tokens)
+    timeout: float | None = None
+    validate: object = None         # answer text -> bool; default: any extractable answer
+    name: str | None = None
+    options: dict = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.name = self.name or self.model
+
+
+DEFAULT_TIERS = (
+    Tier('deepseek-r1:1.5b', samples=3, max_tokens=1024, min_agreement=2/3),
+    Tier('deepseek-r1:14b'),
+)
+
+
+@dataclass
+class Attempt:
+    """What one tier said about one prompt"""
+    tier: str
+    answer: str | None = None       # extracted, comparable answer
+    text: str = ''                  # answer text of a winning sample
+    agreement: float = 0.0
+    valid: bool = False
+    latency: float = 0.0
+    tokens: int = 0
+    cost: float = 0.0
+    error: str | None = None
+    accepted: bool = False
+
+    def confident(self, min_agreement):
+        return self.valid and agrees(self.agreement, min_agreement)
+
+
+@dataclass
+class CascadeResult:
+    answer: str | None
+    text: str
+    tier: str | None                # tier whose answer was taken
+    attempts: list
+    elapsed: float = 0.0
+
+    @property
+    def escalations(self):
+        return len(self.attempts) - 1
+
+
+class TierStats:
+    def __init__(self):
+        self.attempts = 0
+        self.accepted = 0
+        self.escalated = 0
+        self.errors = 0
+        self.tokens = 0
+        self.cost = 0.0
+        self.latency = LatencyHistogram()
+
+    def record(self, attempt):
+        self.attempts += 1
+        self.accepted += attempt.accepted
+        self.escalated += not attempt.accepted
+        self.errors += attempt.error is not None
+        self.tokens += attempt.tokens
+        self.cost += attempt.cost
+        self.latency.record(attempt.latency)
+
+    def summary(self):
+        return {'attempts': self.attempts, 'accepted': self.accepted, 'escalated': self.escalated,
+                'errors': self.errors, 'tokens': self.tokens, 'cost': self.cost,
+                'p50_latency': self.latency.percentile(50), 'p95_latency': self.latency.percentile(95)}
+
+
+class Cascade:
+    """Try tiers cheapest first; accept the first confident answer (the last tier always answers)"""
+
+    def __init__(self, tiers=DEFAULT_TIERS, http=DEFAULT_URL, accounting=None, extract=extract_answer):
+        if not tiers:
+            raise ValueError("a cascade needs at least one tier")
+        self.tiers = list(tiers)
+        self.http = AsyncOllamaHTTP(http) if isinstance(http, str) else http
+        self.accounting = accounting
+        self.extract = extract
+        self.stats = {tier.name: TierStats() for tier in self.tiers}
+
+    async def _ollama(self, tier, messages, attempt, full):
+        # Stop sampling as soon as enough samples agree to accept; ``full`` keeps every sample
+        needed = tier.samples if full else votes_needed(tier.min_agreement, tier.samples)
+        engine = SelfConsistency(self.http, n=tier.samples, majority=needed, extract=self.extract,
+                                 temperature=tier.options.get('temperature', 0.7 if tier.samples > 1 else 0.0))
+        kwargs = {'timeout': tier.timeout}
+        options = dict(tier.options)
+        if tier.max_tokens:
+            options['num_predict'] = tier.max_tokens
+        if options:
+            kwargs['options'] = options
+        result = await engine.arun(tier.model, messages, **kwargs)
+        attempt.answer = result.answer
+        attempt.agreement = result.votes[result.answer] / tier.samples if result.answer is not None else 0.0
+        attempt.text = next((s.text for s in result.samples if s.done and s.answer == result.answer), '')
+        attempt.tokens = result.tokens_used
+        if self.accounting is not None:
+            self.accounting.add(tier.model, output_tokens=result.tokens_used, latency=result.elapsed)
+
+    async def _hosted(self, tier, messages, attempt):
+        from reasoning_models.providers import ReasoningClient
+
+        client = ReasoningClient(tier.provider, tier.model, accounting=self.accounting, **tier.options)
+        kwargs = {'max_tokens': tier.max_tokens} if tier.max_tokens else {}
+        responses = await asyncio.gather(*(client.complete(messages, **kwargs) for _ in range(tier.samples)))
+        answers = [self.extract(r.answer) for r in responses]
+        votes = Counter(a for a in answers if a is not None)
+        if votes:
+            attempt.answer, count = votes.most_common(1)[0]
+            attempt.agreement = count / tier.samples
+            attempt.text = next(r.answer for r, a in zip(responses, answers) if a == attempt.answer)
+        for response in responses:
+            usage = response.usage
+            if usage is None:
+                continue
+            attempt.tokens += usage.output_tokens or 0
+            attempt.cost += usage_cost(usage) or 0.0
+
+    async def attempt(self, tier, messages, full=False):
+        """Run one tier on one prompt; errors are reported on the Attempt, not raised"""
+        attempt = Attempt(tier.name)
+        start = time.perf_counter()
+        try:
+            if tier.provider == 'ollama':
+                await self._ollama(tier, messages, attempt, full)
+            else:
+                await self._hosted(tier, messages, attempt)
+        except Exception as e:
+            attempt.error = f"{type(e).__name__}: {e}"
+        attempt.latency = time.perf_counter() - start
+        attempt.valid = attempt.answer is not None and (tier.validate is None or bool(tier.validate(attempt.text)))
+        return attempt
+
+    async def arun(self, messages):
+        start = time.perf_counter()
+        attempts = []
+        for i, tier in enumerate(self.tiers):
+            attempt = await self.attempt(tier, messages)
+            last = i == len(self.tiers) - 1
+            attempt.accepted = attempt.confident(tier.min_agreement) or (last and attempt.answer is not None)
+            self.stats[tier.name].record(attempt)
+            attempts.append(attempt)
+            if attempt.accepted:
+                return CascadeResult(attempt.answer, attempt.text, tier.name, attempts,
+                                     time.perf_counter() - start)
+        return CascadeResult(None, '', None, attempts, time.perf_counter() - start)
+
+    def run(self, messages):
+        return run_sync(self.arun(messages))
+
+    def report(self):
+        return {name: stats.summary() for name, stats in self.stats.items()}
+
+    def print_stats(self):
+        print("🪜 Cascade tiers")
+        print(f"{'Tier':<24} {'Tries':>6} {'Accept':>7} {'Escal.':>7} {'Err':>4} {'p50 s':>7} {'p95 s':>7} "
+              f"{'Tokens':>9} {'Cost':>9}")
+        for name, s in self.report().items():
+            p50 = f"{s['p50_latency']:.2f}" if s['p50_latency'] is not None else '-'
+            p95 = f"{s['p95_latency']:.2f}" if s['p95_latency'] is not None else '-'
+            print(f"{name:<24} {s['attempts']:>6} {s['accepted']:>7} {s['escalated']:>7} {s['errors']:>4} "
+                  f"{p50:>7} {p95:>7} {s['tokens']:>9,} ${s['cost']:>8.4f}")
+
+
+async def acollect(cascade, prompts, references=None, path=None):
+    """Run every tier (all samples) on every prompt; one replay record per prompt"""
+    records = []
+    out = open(path, 'w', encoding='utf-8') if path else None
+    try:
+        for i, prompt in enumerate(prompts):
+            messages = [{'role': 'user', 'content': prompt}]
+            # One tier at a time, so each latency is what that tier costs on its own
+            attempts = [await cascade.attempt(tier, messages, full=True) for tier in cascade.tiers]
+            record = {'prompt': prompt,
+                      'reference': extract_answer(references[i]) if references and references[i] else None,
+                      'tiers': {a.tier: asdict(a) for a in attempts}}
+            records.append(record)
+            if out:
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                out.flush()
+    finally:
+        if out:
+            out.close()
+    return records
+
+
+def collect(cascade, prompts, references=None, path=None):
+    return run_sync(acollect(cascade, list(prompts), references, path))
+
+
+def read_records(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def replay(records, tiers, thresholds):
+    """Simulate the cascade on collected records; ``tiers`` in order, ``thresholds`` {tier: min_agreement}"""
+    accepted = Counter()
+    correct = judged = 0
+    cost = 0.0
+    latency = LatencyHistogram()
+    for record in records:
+        results = record['tiers']
+        reference = record.get('reference') or results[tiers[-1]]['answer']
+        elapsed = 0.0
+        answer = None
+        for i, name in enumerate(tiers):
+            attempt = results[name]
+            elapsed += attempt['latency']
+            cost += attempt['cost']
+            last = i == len(tiers) - 1
+            if (attempt['valid'] and agrees(attempt['agreement'], thresholds.get(name, 0.0))) or last:
+                answer = attempt['answer']
+                accepted[name] += 1
+                break
+        latency.record(elapsed)
+        if reference is not None:
+            judged += 1
+            correct += answer == reference
+    return {
+        'thresholds': {name: thresholds.get(name, 0.0) for name in tiers[:-1]},
+        'accuracy': correct / judged if judged else None,
+        'cost': cost,
+        'mean_latency': latency.mean,
+        'p95_latency': latency.percentile(95),
+        'share': {name: accepted[name] / len(records) if records else 0.0 for name in tiers},
+    }
+
+
+def sweep(records, tiers, grid=GRID, target=0.95):
+    """Replay every threshold combination; returns (best report or None, all reports cheapest first)"""
+    reports = [replay(records, tiers, dict(zip(tiers[:-1], values)))
+               for values in itertools.product(grid, repeat=len(tiers) - 1)]
+    reports.sort(key=lambda r: (r['cost'], r['mean_latency'] or 0.0))
+    best = next((r for r in reports if r['accuracy'] is not None and r['accuracy'] >= target), None)
+    return best, reports
+
+
+_TIER_FIELDS = {'samples': int, 'min_agreement': parse_share, 'max_tokens': int, 'timeout': float, 'name': str}
+
+
+def parse_tier(text):
+    """'deepseek-r1:1.5b,samples=3,max_tokens=1024,min_agreement=2/3' or 'anthropic/claude-sonnet-4-20250514'"""
+    model, *fields = text.split(',')
+    provider, _, name = model.rpartition('/')
+    tier = Tier(name, provider=provider or 'ollama')
+    for item in fields:
+        key, _, value = item.partition('=')
+        key = key.strip()
+        if key not in _TIER_FIELDS:
+            raise argparse.ArgumentTypeError(f"unknown tier setting {key!r}")
+        setattr(tier, key, _TIER_FIELDS[key](value))
+    return tier
+
+
+def read_prompts(path):
+    """One prompt per line, optionally followed by a tab and the reference answer"""
+    prompts, references = [], []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                prompt, _, reference = line.rstrip('\n').partition('\t')
+                prompts.append(prompt)
+                references.append(reference or None)
+    return prompts, references
+
+
+def _thresholds_text(thresholds):
+    return ', '.join(f"{name} >= {format_share(value)}" for name, value in thresholds.items()) or '-'
+
+
+def _print_report(report):
+    accuracy = f"{report['accuracy']:.1%}" if report['accuracy'] is not None else '-'
+    share = ', '.join(f"{name} {value:.0%}" for name, value in report['share'].items())
+    print(f"   {_thresholds_text(report['thresholds'])}  acc {accuracy}  cost ${report['cost']:.4f}  "
+          f"mean {report['mean_latency']:.2f}s  [{share}]")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Collect cascade replay logs and tune thresholds offline')
+    sub = parser.add_subparsers(dest='command', required=True)
+    gather = sub.add_parser('collect', help='run every tier on every prompt and log the answers')
+    gather.add_argument('prompts', help='text file: one prompt per line, optional <TAB>reference answer')
+    gather.add_argument('--tier', action='append', type=parse_tier,
+                        help="cheapest first, e.g. 'deepseek-r1:1.5b,samples=3,max_tokens=1024' (repeatable)")
+    gather.add_argument('--url', default=DEFAULT_URL)
+    gather.add_argument('--fake', action='store_true', help='use a local fake Ollama server')
+    gather.add_argument('--output', default='cascade.jsonl')
+    tune = sub.add_parser('sweep', help='replay a collected log under every threshold combination')
+    tune.add_argument('log')
+    tune.add_argument('--target', type=float, default=0.95, help='minimum accuracy')
+    tune.add_argument('--grid', default=','.join(map(format_share, GRID)),
+                      help="min_agreement values to try, e.g. '0,1/3,2/3,1'")
+    tune.add_argument('--show', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    if args.command == 'collect':
+        tiers = args.tier or list(DEFAULT_TIERS)
+        prompts, references = read_prompts(args.prompts)
+        server = None
+        base_url = args.url
+        if args.fake:
+            from reasoning_models.fake_server import FakeOllamaConfig, FakeOllamaServer
+
+            server = FakeOllamaServer(FakeOllamaConfig(models=sorted({t.model for t in tiers})))
+            base_url = server.start()
+        try:
+            cascade = Cascade(tiers, base_url)
+            print(f"📝 Collecting {len(prompts)} prompts x {len(tiers)} tiers -> {args.output}")
+            records = collect(cascade, prompts, references, args.output)
+        finally:
+            if server:
+                server.stop()
+        report = replay(records, [t.name for t in tiers], {t.name: t.min_agreement for t in tiers})
+        _print_report(report)
+        return 0
+
+    records = read_records(args.log)
+    if not records:
+        print(f"❌ No records in {args.log}")
+        return 1
+    tiers = list(records[0]['tiers'])
+    grid = [parse_share(g) for g in args.grid.split(',')]
+    best, reports = sweep(records, tiers, grid, args.target)
+    print(f"🎛️  {len(reports)} threshold settings over {len(records)} prompts ({' -> '.join(tiers)})")
+    for report in reports[:args.show]:
+        _print_report(report)
+    if best is None:
+        print(f"❌ No setting reaches {args.target:.0%} accuracy")
+        return 1
+    print(f"✅ Cheapest setting with >= {args.target:.0%} accuracy: {_thresholds_text(best['thresholds'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""
+Single-flight coalescing of identical in-flight Ollama requests
+
+When several callers send the same chat/generate request at once, only the
+first one reaches the server. Its upstream stream is buffered and fanned
+out to every waiter; callers that join late first get the buffered prefix
+replayed, then follow along live. Streamed and non-streamed callers share
+one upstream stream (non-streamed callers get the chunks merged into the
+usual single response). If every waiter goes away the upstream request is
+closed, freeing the server slot. Finished requests are not remembered; use
+``ResponseCache`` for that.
+
+    http = SingleFlight(OllamaHTTP(url))            # threads / scripts
+    client = CachedOllama(url, http=http)           # composes with the cache
+    flight = AsyncSingleFlight(url)                 # asyncio (BatchRunner(coalesce=True))
+"""
+import asyncio
+import threading
+
+from reasoning_models.cache import cache_key
+from reasoning_models.transport import AsyncOllamaHTTP, OllamaHTTP
+
+
+def merge_chunks(chunks):
+    """Fold streamed chat/generate chunks into the equivalent non-streamed response"""
+    if not chunks:
+        return {}
+    response = dict(chunks[-1])
+    if 'message' in response:
+        message = dict(response['message'])
+        message['content'] = ''.join((c.get('message') or {}).get('content') or '' for c in chunks)
+        thinking = ''.join((c.get('message') or {}).get('thinking') or '' for c in chunks)
+        if thinking:
+            message['thinking'] = thinking
+        response['message'] = message
+    else:
+        response['response'] = ''.join(c.get('response') or '' for c in chunks)
+        thinking = ''.join(c.get('thinking') or '' for c in chunks)
+        if thinking:
+            response['thinking'] = thinking
+    return response
+
+
+def _request_key(endpoint, model, body, kwargs):
+    # ``cache_key`` leaves out ``stream``, ``timeout`` and ``keep_alive``, which do not change what is generated
+    return cache_key(endpoint, model, body=body, **kwargs)
+
+
+class _Flight:
+    def __init__(self, cond):
+        self.cond = cond
+        self.task = None
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.abandoned = False
+
+
+class SingleFlight:
+    """Thread-safe coalescing front end over ``OllamaHTTP`` (or anything with streaming chat/generate)"""
+
+    def __init__(self, http):
+        self.http = OllamaHTTP(http) if isinstance(http, str) else http
+        self.upstream = 0           # requests actually sent
+        self.coalesced = 0          # requests served by joining an in-flight one
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # tags(), ps() and anything else pass straight through
+        return getattr(self.http, name)
+
+    def chat(self, model, messages, stream=False, **kwargs):
+        key = _request_key('chat', model, messages, kwargs)
+        chunks = self._join(key, lambda: self.http.chat(model, messages, stream=True, **kwargs))
+        return chunks if stream else merge_chunks(list(chunks))
+
+    def generate(self, model, prompt, stream=False, **kwargs):
+        key = _request_key('generate', model, prompt, kwargs)
+        chunks = self._join(key, lambda: self.http.generate(model, prompt, stream=True, **kwargs))
+        return chunks if stream else merge_chunks(list(chunks))
+
+    def _join(self, key, call):
+        """Generator over the shared stream; joins (or starts) the flight on first iteration"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight(threading.Condition())
+                self.upstream += 1
+            else:
+                self.coalesced += 1
+            flight.subscribers += 1
+        if leader:
+            threading.Thread(target=self._produce, args=(key, flight, call), daemon=True).start()
+        yield from self._subscribe(key, flight)
+
+    def _leave(self, key, flight):
+        with self._lock:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # Nobody is listening any more: let the producer stop and start fresh next time
+                flight.abandoned = True
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+    def _produce(self, key, flight, call):
+        stream = None
+        try:
+            stream = call()
+            for chunk in stream:
+                if flight.abandoned:
+                    break
+                with flight.cond:
+                    flight.chunks.append(chunk)
+                    flight.cond.notify_all()
+        except Exception as e:
+            flight.error = e
+        finally:
+            if stream is not None and hasattr(stream, 'close'):
+                stream.close()
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            with flight.cond:
+                flight.done = True
+                flight.cond.notify_all()
+
+    def _subscribe(self, key, flight):
+        position = 0
+        try:
+            while True:
+                with flight.cond:
+                    while position == len(flight.chunks) and not flight.done:
+                        flight.cond.wait()
+                    batch = flight.chunks[position:]
+                    finished = flight.done
+                position += len(batch)
+                yield from batch
+                if finished and position == len(flight.chunks):
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            self._leave(key, flight)
+
+
+class AsyncSingleFlight:
+    """asyncio coalescing front end over ``AsyncOllamaHTTP``; use from a single event loop"""
+
+    def __init__(self, base_url):
+        # A URL, or any async front end with chat_stream/generate_stream (e.g. a Router)
+        self.http = AsyncOllamaHTTP(base_url) if isinstance(base_url, str) else base_url
+        self.upstream = 0
+        self.coalesced = 0
+        self._flights = {}
+
+    def chat_stream(self, model, messages, **kwargs):
+        key = _request_key('chat', model, messages, kwargs)
+        return self._join(key, lambda: self.http.chat_stream(model, messages, **kwargs))
+
+    def generate_stream(self, model, prompt, **kwargs):
+        key = _request_key('generate', model, prompt, kwargs)
+        return self._join(key, lambda: self.http.generate_stream(model, prompt, **kwargs))
+
+    async def chat(self, model, messages, **kwargs):
+        return merge_chunks([c async for c in self.chat_stream(model, messages, **kwargs)])
+
+    async def generate(self, model, prompt, **kwargs):
+        return merge_chunks([c async for c in self.generate_stream(model, prompt, **kwargs)])
+
+    async def _join(self, key, call):
+        """Async generator over the shared stream; joins (or starts) the flight on first iteration"""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight(asyncio.Condition())
+            flight.task = asyncio.create_task(self._produce(key, flight, call))
+            self.upstream += 1
+        else:
+            self.coalesced += 1
+        flight.subscribers += 1
+        position = 0
+        try:
+            while True:
+                async with flight.cond:
+                    await flight.cond.wait_for(lambda: position < len(flight.chunks) or flight.done)
+                    batch = flight.chunks[position:]
+                    finished = flight.done
+                position += len(batch)
+                for chunk in batch:
+                    yield chunk
+                if finished and position == len(flight.chunks):
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+
+    async def _produce(self, key, flight, call):
+        stream = call()
+        try:
+            async for chunk in stream:
+                async with flight.cond:
+                    flight.chunks.append(chunk)
+                    flight.cond.notify_all()
+        except Exception as e:
+            flight.error = e
+        finally:
+            await stream.aclose()
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            async with flight.cond:
+                flight.done = True
+                flight.cond.notify_all()
@@ -0,0 +1,204 @@
+"""
+Self-consistency sampling with early stopping
+
+Asks the same question ``n`` times concurrently (different seeds, non-zero
+temperature), takes the final answer from the text after ``</think>`` and
+returns the majority vote. As soon as one answer has ``majority`` votes the
+other samples are cancelled; closing their streams drops the HTTP
+connections, so Ollama stops generating and frees the slots. The result
+reports how many tokens that saved compared with running every sample to
+the end (estimated from the samples that did finish).
+
+    engine = SelfConsistency('http://localhost:11434', n=5)
+    result = engine.run('deepseek-r1:14b', [{'role': 'user', 'content': 'What is 27 * 453?'}])
+    print(result.answer, result.agreement, result.tokens_saved)
+"""
+import asyncio
+import os
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from fractions import Fraction
+
+from reasoning_models._sync import run_sync
+from reasoning_models.thinking import AnswerDelta, ThinkingDelta, ThinkParser, chunk_text
+from reasoning_models.transport import AsyncOllamaHTTP
+
+SAMPLES = int(os.environ.get('REASONING_SC_SAMPLES', 5))
+TEMPERATURE = float(os.environ.get('REASONING_SC_TEMPERATURE', 0.7))
+
+_BOXED = re.compile(r'\\boxed\{([^{}]*)\}')
+_ANSWER_IS = re.compile(r'(?:final answer|answer)\s*(?:is|:)\s*\**\s*([^\n]+)', re.IGNORECASE)
+_NUMBER = re.compile(r'-?\$?\d[\d,]*(?:\.\d+)?(?:\s*/\s*\d+)?')
+# "... is 42", "... = 42": the number right after the marker
+_STATED = re.compile(r'(?:\bis\b|=)\s*\**\s*(' + _NUMBER.pattern + ')', re.IGNORECASE)
+
+
+def _normalize_number(text):
+    text = text.replace('$', '').replace(',', '').replace(' ', '')
+    if '/' in text:
+        numerator, denominator = text.split('/')
+        if int(denominator) == 0:
+            return text
+        value = Fraction(numerator) / int(denominator)
+        return str(value.numerator) if value.denominator == 1 else f"{value.numerator}/{value.denominator}"
+    value = float(text)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def extract_answer(text):
+    """Comparable final answer: ``\\boxed{}``, else "answer is ...", else the stated or last number, else the last line
+
+    Within a boxed or stated answer the first number counts ("The answer is 12231 (27 × 453)" -> ``12231``).
+    """
+    text = text.strip()
+    if not text:
+        return None
+    boxed = _BOXED.findall(text)
+    stated = _ANSWER_IS.findall(text)
+    scope = boxed[-1] if boxed else stated[-1] if stated else None
+    if scope is not None:
+        numbers = _NUMBER.findall(scope)
+        if numbers:
+            return _normalize_number(numbers[0])
+        text = scope
+    else:
+        lines = [line for line in text.splitlines() if _NUMBER.search(line)]
+        if lines:
+            stated = _STATED.findall(lines[-1])
+            return _normalize_number(stated[-1] if stated else _NUMBER.findall(lines[-1])[-1])
+    lines = [line for line in text.splitlines() if line.strip()]
+    return ' '.join(re.sub(r'[^\w\s]', ' ', lines[-1].lower()).split()) or None
+
+
+@dataclass
+class Sample:
+    index: int
+    seed: int
+    text: str = ''                  # answer text after </think>
+    answer: str | None = None
+    thinking_tokens: int = 0
+    answer_tokens: int = 0
+    elapsed: float = 0.0
+    done: bool = False
+    cancelled: bool = False
+    error: BaseException | None = None
+
+    @property
+    def tokens(self):
+        return self.thinking_tokens + self.answer_tokens
+
+
+@dataclass
+class ConsistencyResult:
+    answer: str | None
+    votes: Counter
+    samples: list = field(default_factory=list)
+    early_stopped: bool = False
+    tokens_used: int = 0
+    tokens_saved: int = 0           # estimate: mean finished sample length minus what cancelled ones used
+    elapsed: float = 0.0
+
+    @property
+    def completed(self):
+        return sum(s.done for s in self.samples)
+
+    @property
+    def agreement(self):
+        """Share of finished samples that gave the winning answer"""
+        return self.votes[self.answer] / self.completed if self.completed else 0.0
+
+
+class SelfConsistency:
+    """Majority vote over ``n`` concurrent samples, stopping once ``majority`` agree.
+
+    ``http`` is a URL or an async front end with ``chat_stream`` (``AsyncOllamaHTTP``,
+    ``Router``). ``majority`` defaults to a strict majority of ``n``.
+    """
+
+    def __init__(self, http, n=SAMPLES, majority=None, concurrency=None, temperature=TEMPERATURE,
+                 seed=0, extract=extract_answer, in_thinking=False):
+        if majority is not None and not 1 <= majority <= n:
+            raise ValueError("majority must be between 1 and n")
+        self.http = AsyncOllamaHTTP(http) if isinstance(http, str) else http
+        self.n = n
+        self.majority = majority or n // 2 + 1
+        self.concurrency = concurrency or n
+        self.temperature = temperature
+        self.seed = seed
+        self.extract = extract
+        self.in_thinking = in_thinking
+
+    async def _sample(self, sample, model, messages, limit, kwargs):
+        options = {**(kwargs.pop('options', None) or {}), 'seed': sample.seed, 'temperature': self.temperature}
+        async with limit:
+            start = time.perf_counter()
+            parser = ThinkParser(in_thinking=self.in_thinking)
+            answer = []
+            stream = self.http.chat_stream(model, messages, options=options, **kwargs)
+            try:
+                async for chunk in stream:
+                    thinking, content = chunk_text(chunk)
+                    events = parser.feed_thinking(thinking) if thinking else []
+                    if content:
+                        events += parser.feed(content)
+                    # Ollama streams about one token per field per chunk
+                    sample.thinking_tokens += any(isinstance(e, ThinkingDelta) for e in events)
+                    sample.answer_tokens += any(isinstance(e, AnswerDelta) for e in events)
+                    answer.extend(e.text for e in events if isinstance(e, AnswerDelta))
+                answer.extend(e.text for e in parser.close() if isinstance(e, AnswerDelta))
+            finally:
+                await stream.aclose()
+                sample.elapsed = time.perf_counter() - start
+        sample.text = ''.join(answer).strip()
+        sample.answer = self.extract(sample.text)
+        sample.done = True
+        return sample
+
+    async def arun(self, model, messages, **kwargs):
+        """Sample concurrently until ``majority`` answers agree or every sample is done"""
+        start = time.perf_counter()
+        samples = [Sample(i, self.seed + i) for i in range(self.n)]
+        limit = asyncio.Semaphore(self.concurrency)
+        tasks = {asyncio.create_task(self._sample(s, model, messages, limit, dict(kwargs))): s for s in samples}
+        tally = Counter()
+        try:
+            for finished in asyncio.as_completed(tasks):
+                try:
+                    sample = await finished
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    continue
+                if sample.answer is not None:
+                    tally[sample.answer] += 1
+                    if tally[sample.answer] >= self.majority:
+                        break
+        finally:
+            for task, sample in tasks.items():
+                if not task.done():
+                    task.cancel()
+                    sample.cancelled = True
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            for sample, outcome in zip(tasks.values(), results):
+                if isinstance(outcome, Exception):
+                    sample.error = outcome
+
+        # Every sample that finished counts, including ones as_completed had not yielded before the break;
+        # counted in sample order, so ties go to the lowest sample index rather than to whichever finished first
+        finished = [s for s in samples if s.done]
+        expected = sum(s.tokens for s in finished) / len(finished) if finished else 0
+        votes = Counter(s.answer for s in finished if s.answer is not None)
+        return ConsistencyResult(
+            answer=votes.most_common(1)[0][0] if votes else None,
+            votes=votes,
+            samples=samples,
+            early_stopped=any(s.cancelled for s in samples),
+            tokens_used=sum(s.tokens for s in samples),
+            tokens_saved=int(sum(max(0.0, expected - s.tokens) for s in samples if s.cancelled)),
+            elapsed=time.perf_counter() - start,
+        )
+
+    def run(self, model, messages, **kwargs):
+        return run_sync(self.arun(model, messages, **kwargs))
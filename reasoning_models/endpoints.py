@@ -0,0 +1,213 @@
+"""
+Concurrent Ollama endpoint discovery with a health-scored, disk-cached pool
+
+Every candidate URL is probed at the same time, so a dead WSL2 IP no longer
+costs a full timeout before the next URL is tried. The winning endpoint is
+cached on disk with a TTL; the next startup only revalidates that one URL.
+"""
+import asyncio
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import httpx
+
+from reasoning_models._sync import run_sync
+from reasoning_models.transport import AsyncOllamaHTTP
+
+DEFAULT_URLS = [
+    'http://localhost:11434',
+    'http://127.0.0.1:11434',
+]
+
+CACHE_PATH = Path(os.environ.get(
+    'OLLAMA_ENDPOINT_CACHE',
+    Path.home() / '.cache' / 'oreilly-reasoning-models' / 'ollama-endpoint.json',
+))
+CACHE_TTL = 300.0       # seconds a cached winner is trusted before a full scan
+PROBE_TIMEOUT = 3.0     # seconds per /api/tags probe
+EWMA_ALPHA = 0.3        # weight of the newest latency sample
+
+
+@dataclass
+class EndpointHealth:
+    """Rolling health record for a single Ollama base URL"""
+    url: str
+    latency: float | None = None    # EWMA of probe/request latency in seconds
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    models: list = field(default_factory=list)
+    last_checked: float = 0.0
+    last_error: str | None = None
+
+    def record_success(self, latency=None, models=None, alpha=EWMA_ALPHA):
+        if latency is None:
+            pass                # success without a sample for the EWMA
+        elif self.latency is None:
+            self.latency = latency
+        else:
+            self.latency = alpha * latency + (1 - alpha) * self.latency
+        if models is not None:
+            self.models = models
+        self.successes += 1
+        self.consecutive_failures = 0
+        self.last_checked = time.time()
+        self.last_error = None
+
+    def record_failure(self, error):
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_checked = time.time()
+        self.last_error = str(error) or type(error).__name__
+
+    @property
+    def healthy(self):
+        return self.latency is not None and self.consecutive_failures == 0
+
+    @property
+    def score(self):
+        """Lower is better; unhealthy endpoints sort last"""
+        if not self.healthy:
+            return float('inf')
+        total = self.successes + self.failures
+        failure_rate = self.failures / total if total else 0.0
+        return self.latency * (1 + failure_rate)
+
+
+class EndpointPool:
+    """Concurrently probe candidate Ollama URLs and keep the healthiest one"""
+
+    def __init__(self, urls=None, model=None, cache_path=CACHE_PATH,
+                 ttl=CACHE_TTL, timeout=PROBE_TIMEOUT):
+        urls = list(urls or DEFAULT_URLS)
+        env_url = os.environ.get('OLLAMA_URL')
+        if env_url and env_url not in urls:
+            urls.insert(0, env_url)
+
+        self.model = model
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.ttl = ttl
+        self.timeout = timeout
+        self.health = {url: EndpointHealth(url) for url in urls}
+
+    @property
+    def urls(self):
+        return list(self.health)
+
+    def _accepts(self, record):
+        """An endpoint is usable if it is healthy and serves the wanted model"""
+        if not record.healthy:
+            return False
+        return self.model is None or self.model in record.models
+
+    async def _probe(self, url):
+        record = self.health[url]
+        start = time.perf_counter()
+        try:
+            tags = await AsyncOllamaHTTP(url).tags(timeout=self.timeout)
+            models = [m.get('name', 'unnamed') for m in tags.get('models', [])]
+        except (httpx.HTTPError, ValueError) as e:
+            record.record_failure(e)
+        else:
+            record.record_success(time.perf_counter() - start, models)
+        return record
+
+    async def aprobe_all(self, first_match=False):
+        """Probe every candidate at once.
+
+        With ``first_match`` the scan stops at the first acceptable endpoint
+        (which is also the fastest to answer) and the other probes are
+        cancelled. Otherwise all probes finish and every record is updated.
+        Returns the probed records sorted best-first.
+        """
+        tasks = [asyncio.create_task(self._probe(url)) for url in self.health]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                record = await finished
+                if first_match and self._accepts(record):
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return self.ranked()
+
+    def probe_all(self, first_match=False):
+        return run_sync(self.aprobe_all(first_match=first_match))
+
+    def ranked(self):
+        """All endpoint records sorted by score, best first"""
+        return sorted(self.health.values(), key=lambda record: record.score)
+
+    def best(self):
+        """Best acceptable endpoint record, or None"""
+        for record in self.ranked():
+            if self._accepts(record):
+                return record
+        return None
+
+    async def aresolve(self, refresh=False):
+        """Return the best base URL, revalidating the disk cache before scanning"""
+        if not refresh:
+            cached = self._load_cache()
+            if cached:
+                record = await self._probe(cached)
+                if self._accepts(record):
+                    self._save_cache(record)
+                    return record.url
+
+        await self.aprobe_all(first_match=True)
+        record = self.best()
+        if record is None:
+            return None
+        self._save_cache(record)
+        return record.url
+
+    def resolve(self, refresh=False):
+        return run_sync(self.aresolve(refresh=refresh))
+
+    def report_success(self, url, latency):
+        """Feed an observed request latency back into the rolling score"""
+        self.health.setdefault(url, EndpointHealth(url)).record_success(latency)
+
+    def report_failure(self, url, error):
+        self.health.setdefault(url, EndpointHealth(url)).record_failure(error)
+
+    def _load_cache(self):
+        if not self.cache_path:
+            return None
+        try:
+            data = json.loads(self.cache_path.read_text())
+        except (OSError, ValueError):
+            return None
+        url = data.get('url')
+        if url not in self.health or data.get('model') != self.model:
+            return None
+        if time.time() - data.get('checked_at', 0) > self.ttl:
+            return None
+        return url
+
+    def _save_cache(self, record):
+        if not self.cache_path:
+            return
+        data = {
+            'url': record.url,
+            'model': self.model,
+            'checked_at': time.time(),
+            'health': [asdict(r) for r in self.ranked()],
+        }
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_suffix('.tmp')
+            tmp_path.write_text(json.dumps(data, indent=2))
+            tmp_path.replace(self.cache_path)
+        except OSError:
+            pass
+
+
+def resolve_base_url(urls=None, model=None, refresh=False, **kwargs):
+    """Convenience wrapper: best Ollama base URL for ``model``, or None"""
+    return EndpointPool(urls, model=model, **kwargs).resolve(refresh=refresh)
@@ -0,0 +1,388 @@
+"""
+Local stand-in for an Ollama server, for benchmarks and CI without a GPU
+
+Serves ``/api/tags``, ``/api/ps``, ``/api/generate`` and ``/api/chat`` (streamed
+NDJSON or single JSON) with a DeepSeek-R1 shaped ``<think>...</think>`` answer.
+Tokens are emitted at a configurable rate with jitter. Cold model loads,
+``keep_alive`` expiry and ``OLLAMA_NUM_PARALLEL`` slots are simulated, and the
+response metadata (``eval_count``, ``eval_duration``, ``load_duration``, ...)
+mirrors what Ollama returns. Like a llama.cpp runner, each model remembers the
+last prompts it evaluated (one per slot) and only evaluates the part after the
+longest shared token prefix; ``/api/generate`` accepts and returns ``context``.
+
+    python -m reasoning_models.fake_server --port 11435 --token-rate 40
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = ('the', 'model', 'should', 'consider', 'first', 'then', 'compute', 'result',
+         'so', 'check', 'again', 'value', 'step', 'answer', 'because', 'therefore')
+
+
+@dataclass
+class FakeOllamaConfig:
+    models: list = field(default_factory=lambda: ['deepseek-r1:14b', 'deepseek-r1:1.5b'])
+    token_rate: float = 50.0        # generated tokens per second per request
+    prompt_rate: float = 2000.0     # prompt tokens evaluated per second
+    jitter: float = 0.2             # +/- fraction applied to every token delay
+    thinking_tokens: int = 48
+    answer_tokens: int = 24
+    load_time: float = 0.5          # seconds for a cold model load
+    keep_alive: float = 300.0       # seconds a model stays loaded after its last use
+    num_parallel: int = 4           # concurrent requests per loaded model
+    model_size: int = 9 * 1024 ** 3  # bytes reported per model by /api/tags and /api/ps
+    seed: int = 0
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d*)?|\.\d+)(ns|us|µs|ms|s|m|h)')
+_DURATION_UNITS = {'ns': 1e-9, 'us': 1e-6, 'µs': 1e-6, 'ms': 1e-3, 's': 1.0, 'm': 60.0, 'h': 3600.0}
+
+
+def parse_duration(value):
+    """Seconds for an Ollama ``keep_alive``: a number of seconds or a Go duration ('5m', '1h30m', '-1')"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, str):
+        raise ValueError(f"invalid duration {value!r}")
+    text = value.strip()
+    sign = -1.0 if text.startswith('-') else 1.0
+    body = text.lstrip('+-')
+    if re.fullmatch(r'\d+(?:\.\d*)?|\.\d+', body):
+        return sign * float(body)           # unitless: seconds, as Ollama accepts
+    parts = _DURATION_PART.findall(body)
+    if not parts or ''.join(number + unit for number, unit in parts) != body:
+        raise ValueError(f"invalid duration {value!r}")
+    return sign * sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def _token_ids(text):
+    return [zlib.crc32(word.encode()) & 0x7fffffff for word in text.split()]
+
+
+def _common_prefix(a, b):
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+class _ModelState:
+    def __init__(self, slots):
+        self.lock = threading.Lock()
+        self.slots = threading.Semaphore(slots)
+        self.loaded_until = 0.0
+        self.prompts = deque(maxlen=slots)  # token ids last evaluated per slot (the KV cache)
+
+
+class FakeOllama:
+    """Model state and token generation shared by all request handler threads"""
+
+    def __init__(self, config=None):
+        self.config = config or FakeOllamaConfig()
+        self.states = {name: _ModelState(self.config.num_parallel) for name in self.config.models}
+        self.requests = 0
+        self.cancelled = 0
+        self._counter_lock = threading.Lock()
+
+    def is_loaded(self, model):
+        return self.states[model].loaded_until > time.time()
+
+    def ensure_loaded(self, model, keep_alive):
+        """Return the simulated load time (0.0 when the model is already warm)"""
+        state = self.states[model]
+        with state.lock:
+            load = 0.0
+            if state.loaded_until <= time.time():
+                load = self.config.load_time
+                state.prompts.clear()
+                time.sleep(load)
+            # Negative keep_alive keeps the model loaded forever, like Ollama
+            state.loaded_until = time.time() + (keep_alive if keep_alive >= 0 else float('inf'))
+        return load
+
+    def unload(self, model):
+        state = self.states[model]
+        state.loaded_until = 0.0
+        state.prompts.clear()
+
+    def reuse_prefix(self, model, ids):
+        """Number of leading prompt tokens already in a slot's cache; ``ids`` takes that slot"""
+        state = self.states[model]
+        with state.lock:
+            best, reused = None, 0
+            for cached in state.prompts:
+                n = _common_prefix(cached, ids)
+                if n > reused:
+                    best, reused = cached, n
+            if best is not None:
+                state.prompts.remove(best)
+            state.prompts.append(ids)
+        return reused
+
+    def tokens_for(self, model, prompt, options, prefill=''):
+        """Deterministic (per prompt and seed) thinking and answer tokens, continuing ``prefill``"""
+        seed = options.get('seed', self.config.seed)
+        digest = hashlib.sha256(f"{seed}:{model}:{prompt}".encode()).digest()
+        rng = random.Random(digest)
+        thinking = [rng.choice(WORDS) + ' ' for _ in range(self.config.thinking_tokens)]
+        answer = [rng.choice(WORDS) + ' ' for _ in range(self.config.answer_tokens)]
+        if '</think>' in prefill:
+            tokens = answer
+        elif '<think>' in prefill:
+            tokens = thinking + ['\n', '</think>', '\n\n'] + answer
+        else:
+            tokens = ['<think>', '\n'] + thinking + ['\n', '</think>', '\n\n'] + answer
+        limit = options.get('num_predict')
+        if limit is not None and limit >= 0:
+            tokens = tokens[:limit]
+        return tokens
+
+    def token_delay(self, rng):
+        base = 1.0 / self.config.token_rate
+        return max(0.0, base * (1 + rng.uniform(-self.config.jitter, self.config.jitter)))
+
+    def count_request(self):
+        with self._counter_lock:
+            self.requests += 1
+
+    def count_cancelled(self):
+        with self._counter_lock:
+            self.cancelled += 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    fake = None     # set on the per-server subclass
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, body):
+        data = json.dumps(body).encode() + b'\n'
+        self.wfile.write(f'{len(data):x}\r\n'.encode() + data + b'\r\n')
+        self.wfile.flush()
+
+    def do_GET(self):
+        config = self.fake.config
+        if self.path == '/api/tags':
+            models = [{'name': m, 'model': m, 'modified_at': _now_iso(), 'size': config.model_size}
+                      for m in config.models]
+            self._send_json(200, {'models': models})
+        elif self.path == '/api/ps':
+            models = [{'name': m, 'model': m, 'size': config.model_size, 'size_vram': config.model_size}
+                      for m in config.models if self.fake.is_loaded(m)]
+            self._send_json(200, {'models': models})
+        elif self.path in ('/', '/api/version'):
+            self._send_json(200, {'version': '0.0.0-fake'})
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send_json(400, {'error': 'invalid JSON'})
+            return
+
+        if self.path not in ('/api/generate', '/api/chat'):
+            self._send_json(404, {'error': 'not found'})
+            return
+        model = request.get('model')
+        if model not in self.fake.states:
+            self._send_json(404, {'error': f"model '{model}' not found"})
+            return
+        try:
+            keep_alive = parse_duration(request.get('keep_alive', self.fake.config.keep_alive))
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        self.fake.count_request()
+        self._generate(request, keep_alive, chat=self.path == '/api/chat')
+
+    def _generate(self, request, keep_alive, chat):
+        fake = self.fake
+        model = request['model']
+        options = request.get('options') or {}
+
+        prefill = ''
+        if chat:
+            messages = request.get('messages') or []
+            prompt = '\n'.join(str(m.get('content', '')) for m in messages)
+            if messages and messages[-1].get('role') == 'assistant':
+                # A trailing assistant message is continued, like Ollama's prefill support
+                prefill = str(messages[-1].get('content', ''))
+        else:
+            prompt = request.get('prompt') or ''
+
+        started = time.perf_counter()
+        state = fake.states[model]
+        with state.slots:
+            if not prompt and keep_alive == 0:
+                fake.unload(model)
+                load = 0.0
+            else:
+                load = fake.ensure_loaded(model, keep_alive)
+
+            if not prompt:
+                # Empty prompt: Ollama just loads (or unloads with keep_alive=0)
+                body = {'model': model, 'created_at': _now_iso(), 'done': True,
+                        'done_reason': 'unload' if keep_alive == 0 else 'load',
+                        'load_duration': int(load * 1e9),
+                        'total_duration': int((time.perf_counter() - started) * 1e9)}
+                body.update({'message': {'role': 'assistant', 'content': ''}} if chat else {'response': ''})
+                self._send_json(200, body)
+                return
+
+            ids = _token_ids(prompt) if chat else list(request.get('context') or []) + _token_ids(prompt)
+            prompt_tokens = max(1, len(ids) - fake.reuse_prefix(model, ids))
+            prompt_eval = prompt_tokens / fake.config.prompt_rate
+            time.sleep(prompt_eval)
+
+            tokens = fake.tokens_for(model, prompt, options, prefill)
+            rng = random.Random()
+            stream = request.get('stream', True)
+            if stream:
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+
+            eval_start = time.perf_counter()
+            try:
+                for token in tokens:
+                    time.sleep(fake.token_delay(rng))
+                    if stream:
+                        self._write_chunk(self._partial(model, token, chat))
+            except (BrokenPipeError, ConnectionResetError):
+                # Client went away: stop generating and free the slot, like Ollama
+                fake.count_cancelled()
+                self.close_connection = True
+                return
+            eval_duration = time.perf_counter() - eval_start
+
+            if keep_alive == 0:
+                fake.unload(model)
+
+        final = {
+            'model': model,
+            'created_at': _now_iso(),
+            'done': True,
+            'done_reason': 'stop',
+            'total_duration': int((time.perf_counter() - started) * 1e9),
+            'load_duration': int(load * 1e9),
+            'prompt_eval_count': prompt_tokens,
+            'prompt_eval_duration': int(prompt_eval * 1e9),
+            'eval_count': len(tokens),
+            'eval_duration': int(eval_duration * 1e9),
+        }
+        text = '' if stream else ''.join(tokens)
+        if chat:
+            final['message'] = {'role': 'assistant', 'content': text}
+        else:
+            final['response'] = text
+            final['context'] = ids + _token_ids(''.join(tokens))
+
+        if stream:
+            self._write_chunk(final)
+            self.wfile.write(b'0\r\n\r\n')
+            self.wfile.flush()
+        else:
+            self._send_json(200, final)
+
+    @staticmethod
+    def _partial(model, token, chat):
+        chunk = {'model': model, 'created_at': _now_iso(), 'done': False}
+        if chat:
+            chunk['message'] = {'role': 'assistant', 'content': token}
+        else:
+            chunk['response'] = token
+        return chunk
+
+
+class FakeOllamaServer:
+    """Run a FakeOllama on a background thread; usable as a context manager"""
+
+    def __init__(self, config=None, host='127.0.0.1', port=0):
+        self.fake = FakeOllama(config)
+        handler = type('FakeOllamaHandler', (_Handler,), {'fake': self.fake})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fake Ollama server for benchmarks and CI')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--models', nargs='+', default=FakeOllamaConfig().models)
+    parser.add_argument('--token-rate', type=float, default=FakeOllamaConfig.token_rate)
+    parser.add_argument('--jitter', type=float, default=FakeOllamaConfig.jitter)
+    parser.add_argument('--thinking-tokens', type=int, default=FakeOllamaConfig.thinking_tokens)
+    parser.add_argument('--answer-tokens', type=int, default=FakeOllamaConfig.answer_tokens)
+    parser.add_argument('--load-time', type=float, default=FakeOllamaConfig.load_time)
+    parser.add_argument('--num-parallel', type=int, default=FakeOllamaConfig.num_parallel)
+    args = parser.parse_args(argv)
+
+    config = FakeOllamaConfig(
+        models=args.models, token_rate=args.token_rate, jitter=args.jitter,
+        thinking_tokens=args.thinking_tokens, answer_tokens=args.answer_tokens,
+        load_time=args.load_time, num_parallel=args.num_parallel,
+    )
+    server = FakeOllamaServer(config, args.host, args.port)
+    print(f"🧪 Fake Ollama listening on {server.base_url} (models: {', '.join(config.models)})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
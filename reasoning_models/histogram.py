@@ -0,0 +1,85 @@
+"""
+Log-linear (HDR-style) histogram for latencies and other per-call values
+
+Recording is O(1) into a fixed list of counters and percentiles are exact
+to the bucket width (at most 1/64, about 1.6%, above the value), so the load
+generator, the rolling cost windows and the cascade stats can keep millions
+of samples in a few kilobytes. Histograms with the same range and unit merge
+by adding counts.
+
+    latency = LatencyHistogram()
+    latency.record(0.042)
+    latency.percentile(99)
+"""
+SUB_BUCKET_BITS = 7             # 64 sub-buckets per power of two: at most 1/64 (~1.6%) relative error
+HALF = 1 << (SUB_BUCKET_BITS - 1)
+
+
+class LatencyHistogram:
+    """Log-linear latency histogram in microseconds, like HdrHistogram.
+
+    Values below ``2 * HALF`` units get a bucket each; above that every power
+    of two is split into ``HALF`` buckets, reported by their upper bound.
+    """
+
+    def __init__(self, max_seconds=3600.0, unit=1e-6):
+        # ``unit`` is the resolution of recorded values, e.g. ``unit=1`` for token counts
+        self.unit = unit
+        self.counts = [0] * self._index(int(max_seconds / unit) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    @staticmethod
+    def _index(micros):
+        if micros < 2 * HALF:
+            return micros
+        shift = micros.bit_length() - SUB_BUCKET_BITS
+        return 2 * HALF + (shift - 1) * HALF + (micros >> shift) - HALF
+
+    def _value(self, index):
+        """Upper bound (seconds) of the values in bucket ``index``"""
+        if index < 2 * HALF:
+            return index * self.unit
+        shift, sub = divmod(index - 2 * HALF, HALF)
+        return (((sub + HALF + 1) << (shift + 1)) - 1) * self.unit
+
+    def record(self, seconds):
+        index = min(self._index(max(0, int(seconds / self.unit))), len(self.counts) - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def merge(self, other):
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, q):
+        if not self.count:
+            return None
+        target = max(1, round(self.count * q / 100))
+        seen = 0
+        last = len(self.counts) - 1     # also holds every value past the range
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return self.max if index == last else min(self._value(index), self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def summary(self, percentiles=(50, 90, 95, 99, 99.9)):
+        summary = {'count': self.count, 'mean': self.mean, 'min': self.min, 'max': self.max}
+        summary.update({f'p{q:g}': self.percentile(q) for q in percentiles})
+        return summary
@@ -0,0 +1,253 @@
+"""
+Open-loop load generator for Ollama deployments
+
+Requests arrive on a schedule (Poisson or a fixed rate) whether or not
+earlier ones have finished, the way real users do, so an overloaded server
+shows up as growing latency and errors instead of a politely slowing client.
+Latency is measured from each request's scheduled arrival, which keeps
+client-side queueing in the numbers (no coordinated omission). The run steps
+through increasing rates and reports, per stage, achieved throughput,
+latency percentiles from a log-linear (HDR-style) histogram and error
+rates, then names the saturation point: the first rate the deployment could
+not sustain.
+
+    python -m reasoning_models.loadgen --fake --rates 2 4 8 16 --duration 10
+    python -m reasoning_models.loadgen --url http://localhost:11434 --rates 0.5 1 2 \\
+        --mix chat=2,generate=1,stream=1 --slo 30 --output load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+from reasoning_models import transport
+from reasoning_models._sync import run_sync
+from reasoning_models.histogram import LatencyHistogram
+from reasoning_models.transport import AsyncOllamaHTTP
+
+DEFAULT_MODEL = 'deepseek-r1:14b'
+PROMPT = "Hello! What's 2+2? Give a brief answer."
+KINDS = ('chat', 'generate', 'stream')
+
+
+def parse_mix(text):
+    """'chat=2,generate=1,stream=1' -> {'chat': 2.0, ...}"""
+    mix = {}
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        kind = kind.strip()
+        if kind not in KINDS:
+            raise ValueError(f"unknown request kind {kind!r} (choose from {', '.join(KINDS)})")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def arrivals(rate, duration, poisson=True, rng=None):
+    """Scheduled start offsets (seconds) for one stage"""
+    rng = rng or random.Random()
+    times, t = [], 0.0
+    while True:
+        t += rng.expovariate(rate) if poisson else 1.0 / rate
+        if t >= duration:
+            return times
+        times.append(t)
+
+
+class LoadGenerator:
+    def __init__(self, base_url, model=DEFAULT_MODEL, mix=None, prompt=PROMPT, num_predict=None,
+                 timeout=120.0, max_outstanding=256, poisson=True, seed=None):
+        self.client = AsyncOllamaHTTP(base_url)
+        self.model = model
+        self.mix = mix or {'chat': 1.0, 'generate': 1.0, 'stream': 1.0}
+        self.prompt = prompt
+        self.options = {'num_predict': num_predict} if num_predict else None
+        self.timeout = timeout
+        self.max_outstanding = max_outstanding
+        self.poisson = poisson
+        self.rng = random.Random(seed)
+
+    async def _call(self, kind):
+        """Run one request; returns time to first token for streams (else None)"""
+        messages = [{'role': 'user', 'content': self.prompt}]
+        if kind == 'chat':
+            await self.client.chat(self.model, messages, timeout=self.timeout, options=self.options)
+        elif kind == 'generate':
+            await self.client.generate(self.model, self.prompt, timeout=self.timeout, options=self.options)
+        else:
+            start, ttft = time.perf_counter(), None
+            async for _ in self.client.chat_stream(self.model, messages, timeout=self.timeout,
+                                                   options=self.options):
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+            return ttft
+
+    async def stage(self, rate, duration):
+        """Offer ``rate`` requests/second for ``duration`` seconds; returns the stage report"""
+        kinds, weights = zip(*self.mix.items())
+        schedule = [(t, self.rng.choices(kinds, weights)[0])
+                    for t in arrivals(rate, duration, self.poisson, self.rng)]
+        latency = LatencyHistogram()
+        by_kind = {kind: LatencyHistogram() for kind in kinds}
+        ttft = LatencyHistogram()
+        errors = Counter()
+        state = {'outstanding': 0, 'peak': 0, 'ok': 0}
+
+        async def one(scheduled, kind):
+            if state['outstanding'] >= self.max_outstanding:
+                errors['dropped'] += 1      # client-side cap reached: the server is not keeping up
+                return
+            state['outstanding'] += 1
+            state['peak'] = max(state['peak'], state['outstanding'])
+            try:
+                first = await self._call(kind)
+            except Exception as e:
+                status = getattr(getattr(e, 'response', None), 'status_code', None)
+                errors[f'http_{status}' if status else type(e).__name__] += 1
+            else:
+                elapsed = time.perf_counter() - scheduled
+                latency.record(elapsed)
+                by_kind[kind].record(elapsed)
+                if first is not None:
+                    ttft.record(first)
+                state['ok'] += 1
+            finally:
+                state['outstanding'] -= 1
+
+        start = time.perf_counter()
+        tasks = []
+        for offset, kind in schedule:
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(start + offset, kind)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+        sent = len(schedule)
+        failed = sum(errors.values())
+        return {
+            'offered_rps': rate,
+            'requests': sent,
+            'completed': state['ok'],
+            'achieved_rps': state['ok'] / elapsed if elapsed else 0.0,
+            'error_rate': failed / sent if sent else 0.0,
+            'errors': dict(errors),
+            'peak_outstanding': state['peak'],
+            'duration': duration,
+            'elapsed': elapsed,
+            'latency': latency.summary(),
+            'ttft': ttft.summary(),
+            'by_kind': {kind: h.summary() for kind, h in by_kind.items()},
+        }
+
+    async def run(self, rates, duration, slo=None, max_error_rate=0.01, min_efficiency=0.9):
+        """Step through ``rates``; stops after the first stage past saturation"""
+        stages = []
+        saturation = None
+        for rate in rates:
+            report = await self.stage(rate, duration)
+            reasons = saturated(report, slo, max_error_rate, min_efficiency)
+            report['saturated'] = reasons
+            stages.append(report)
+            if reasons:
+                saturation = rate
+                break
+        sustained = [s['offered_rps'] for s in stages if not s['saturated']]
+        return {'stages': stages, 'saturation_rps': saturation,
+                'max_sustained_rps': max(sustained) if sustained else None}
+
+
+def saturated(report, slo=None, max_error_rate=0.01, min_efficiency=0.9):
+    """Reasons a stage counts as past saturation (empty when the rate was sustained)"""
+    reasons = []
+    if report['error_rate'] > max_error_rate:
+        reasons.append(f"error rate {report['error_rate']:.1%}")
+    # A backlog drains after the last arrival, stretching the stage and lowering achieved throughput
+    offered = report['requests'] / report['duration'] if report['duration'] else 0.0
+    if report['achieved_rps'] < min_efficiency * offered:
+        reasons.append(f"throughput {report['achieved_rps']:.2f}/{offered:.2f} rps")
+    p99 = report['latency']['p99']
+    if slo is not None and p99 is not None and p99 > slo:
+        reasons.append(f"p99 {p99:.2f}s > SLO {slo:g}s")
+    return reasons
+
+
+def print_report(report):
+    print(f"\n🚦 Load test: {report['model']} @ {report['base_url']}")
+    print("=" * 92)
+    print(f"{'rps':>6} | {'sent':>5} | {'ok':>5} | {'got rps':>7} | {'err%':>5} | "
+          f"{'p50':>7} | {'p95':>7} | {'p99':>7} | {'max':>7} | peak")
+    print("-" * 92)
+    fmt = lambda v: f"{v:7.3f}" if v is not None else f"{'-':>7}"
+    for s in report['stages']:
+        lat = s['latency']
+        flag = '  ⚠️ ' + ', '.join(s['saturated']) if s['saturated'] else ''
+        print(f"{s['offered_rps']:6g} | {s['requests']:5d} | {s['completed']:5d} | {s['achieved_rps']:7.2f} | "
+              f"{s['error_rate'] * 100:5.1f} | {fmt(lat['p50'])} | {fmt(lat['p95'])} | {fmt(lat['p99'])} | "
+              f"{fmt(lat['max'])} | {s['peak_outstanding']}{flag}")
+        if s['errors']:
+            print(f"{'':>6}   errors: {s['errors']}")
+    if report['saturation_rps'] is not None:
+        print(f"\n📈 Saturated at {report['saturation_rps']:g} rps; "
+              f"max sustained: {report['max_sustained_rps'] or 0:g} rps")
+    else:
+        print(f"\n✅ No saturation up to {report['stages'][-1]['offered_rps']:g} rps")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Open-loop load generator for Ollama')
+    parser.add_argument('--url', default=os.environ.get('OLLAMA_URL', 'http://localhost:11434'))
+    parser.add_argument('--fake', action='store_true', help='run against a local fake Ollama server')
+    parser.add_argument('--token-rate', type=float, default=200.0, help='fake server tokens/sec')
+    parser.add_argument('--num-parallel', type=int, default=4, help='fake server slots per model')
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--rates', type=float, nargs='+', default=[1, 2, 4, 8], help='requests/second per stage')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds per stage')
+    parser.add_argument('--arrivals', choices=('poisson', 'fixed'), default='poisson')
+    parser.add_argument('--mix', default='chat=1,generate=1,stream=1')
+    parser.add_argument('--prompt', default=PROMPT)
+    parser.add_argument('--num-predict', type=int, help='cap generated tokens per request')
+    parser.add_argument('--timeout', type=float, default=120.0)
+    parser.add_argument('--max-outstanding', type=int, default=256)
+    parser.add_argument('--slo', type=float, help='p99 latency (s) above which a stage counts as saturated')
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--output', help='write the JSON report here')
+    args = parser.parse_args(argv)
+
+    server = None
+    base_url = args.url
+    if args.fake:
+        from reasoning_models.fake_server import FakeOllamaConfig, FakeOllamaServer
+
+        config = FakeOllamaConfig(models=[args.model], token_rate=args.token_rate,
+                                  num_parallel=args.num_parallel)
+        server = FakeOllamaServer(config)
+        base_url = server.start()
+
+    # Open loop: connections must not be the bottleneck, the server should be
+    transport.configure(max_connections=args.max_outstanding, max_keepalive=args.max_outstanding)
+    try:
+        generator = LoadGenerator(base_url, args.model, parse_mix(args.mix), args.prompt, args.num_predict,
+                                  args.timeout, args.max_outstanding, args.arrivals == 'poisson', args.seed)
+        result = run_sync(generator.run(args.rates, args.duration, args.slo, args.max_error_rate))
+    finally:
+        if server:
+            server.stop()
+
+    report = {'model': args.model, 'base_url': 'fake' if args.fake else base_url, 'created_at': time.time(),
+              'arrivals': args.arrivals, 'mix': parse_mix(args.mix), 'duration': args.duration, **result}
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,286 @@
+"""
+Token throughput and latency instrumentation from Ollama response metadata
+
+Every chat/generate call produces a ``CallRecord`` combining client-side
+timings (time to first token, time to first answer token after ``</think>``,
+wall time) with the server's own counters (``eval_count``, ``eval_duration``,
+``prompt_eval_count``, ``prompt_eval_duration``, ``load_duration``).
+Records are appended to a JSONL file and can be exported in the Prometheus
+text exposition format.
+"""
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from reasoning_models.thinking import AnswerDelta, ThinkingDelta, ThinkParser, chunk_text, split_thinking
+from reasoning_models.transport import OllamaHTTP
+
+METRICS_PATH = os.environ.get('REASONING_METRICS_PATH')    # JSONL sink, off when unset
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+NS = 1e9
+
+
+@dataclass
+class CallRecord:
+    """Metrics for one model call; durations in seconds, None when unknown"""
+    timestamp: float
+    endpoint: str
+    model: str
+    ok: bool = True
+    error: str | None = None
+    streamed: bool = False
+    wall_time: float = 0.0
+    ttft: float | None = None               # first token of any kind
+    ttfa: float | None = None               # first answer token (after </think>)
+    prompt_tokens: int | None = None
+    output_tokens: int | None = None
+    thinking_tokens: int | None = None
+    answer_tokens: int | None = None
+    load_time: float | None = None
+    prompt_eval_time: float | None = None
+    eval_time: float | None = None
+    tokens_per_second: float | None = None
+    prompt_tokens_per_second: float | None = None
+    tags: dict = field(default_factory=dict)
+
+
+class CallMetrics:
+    """Tracks a single call: feed it stream chunks, then ``finish()``"""
+
+    def __init__(self, endpoint, model, streamed=False, **tags):
+        self.record = CallRecord(time.time(), endpoint, model, streamed=streamed, tags=tags)
+        self._start = time.perf_counter()
+        self._parser = ThinkParser()
+        self._thinking_chunks = 0
+        self._answer_chunks = 0
+
+    def _elapsed(self):
+        return time.perf_counter() - self._start
+
+    def observe_chunk(self, chunk):
+        thinking, content = chunk_text(chunk)
+        if not (thinking or content):
+            return
+        if self.record.ttft is None:
+            self.record.ttft = self._elapsed()
+
+        events = self._parser.feed_thinking(thinking) if thinking else []
+        if content:
+            events += self._parser.feed(content)
+        # Ollama streams roughly one token per chunk
+        if any(isinstance(e, ThinkingDelta) for e in events):
+            self._thinking_chunks += 1
+        if any(isinstance(e, AnswerDelta) for e in events):
+            self._answer_chunks += 1
+            if self.record.ttfa is None:
+                self.record.ttfa = self._elapsed()
+
+    def finish(self, response=None, error=None):
+        """Close the record using the final response / last stream chunk"""
+        record = self.record
+        record.wall_time = self._elapsed()
+        if error is not None:
+            record.ok = False
+            record.error = str(error) or type(error).__name__
+        if response:
+            self._apply_server_counters(response)
+            if not record.streamed:
+                self._split_unstreamed(response)
+        return record
+
+    def _apply_server_counters(self, response):
+        record = self.record
+        record.prompt_tokens = response.get('prompt_eval_count')
+        record.output_tokens = response.get('eval_count')
+        for name, key in (('load_time', 'load_duration'),
+                          ('prompt_eval_time', 'prompt_eval_duration'),
+                          ('eval_time', 'eval_duration')):
+            value = response.get(key)
+            setattr(record, name, value / NS if value is not None else None)
+
+        if record.output_tokens and record.eval_time:
+            record.tokens_per_second = record.output_tokens / record.eval_time
+        if record.prompt_tokens and record.prompt_eval_time:
+            record.prompt_tokens_per_second = record.prompt_tokens / record.prompt_eval_time
+
+        total = self._thinking_chunks + self._answer_chunks
+        if record.streamed and total and record.output_tokens is not None:
+            record.thinking_tokens = round(record.output_tokens * self._thinking_chunks / total)
+            record.answer_tokens = record.output_tokens - record.thinking_tokens
+
+    def _split_unstreamed(self, response):
+        """Without chunks, apportion eval_count by thinking/answer text length"""
+        record = self.record
+        if record.output_tokens is None:
+            return
+        parsed = split_thinking(response)
+        chars = len(parsed.thinking) + len(parsed.answer)
+        share = len(parsed.thinking) / chars if chars else 0.0
+        record.thinking_tokens = round(record.output_tokens * share)
+        record.answer_tokens = record.output_tokens - record.thinking_tokens
+
+
+class MetricsRecorder:
+    """Collects CallRecords, appends them to JSONL and renders Prometheus text"""
+
+    def __init__(self, path=METRICS_PATH, keep=10_000, store=None, accounting=None):
+        self.path = Path(path) if path else None
+        self.store = store                  # optional ColumnStore for long-term, queryable history
+        self.accounting = accounting        # optional Accounting for rolling token/cost windows
+        self.records = deque(maxlen=keep)
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._histograms = defaultdict(lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+
+    def record(self, record):
+        labels = (record.model, record.endpoint)
+        with self._lock:
+            self.records.append(record)
+            self._counters[('calls', labels + ('ok' if record.ok else 'error',))] += 1
+            for name in ('prompt_tokens', 'output_tokens', 'thinking_tokens', 'answer_tokens',
+                         'load_time', 'prompt_eval_time', 'eval_time', 'wall_time'):
+                value = getattr(record, name)
+                if value is not None:
+                    self._counters[(name, labels)] += value
+            for name in ('wall_time', 'ttft', 'ttfa'):
+                value = getattr(record, name)
+                if value is not None and record.ok:
+                    self._observe(name, labels, value)
+            if self.path:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with self.path.open('a', encoding='utf-8') as f:
+                    f.write(json.dumps(asdict(record), ensure_ascii=False) + '\n')
+        if self.store is not None:
+            self.store.append(record)
+        if self.accounting is not None:
+            self.accounting.record(record)
+        return record
+
+    def _observe(self, name, labels, value):
+        buckets = self._histograms[(name, labels)]
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                buckets[i] += 1
+                break
+        else:
+            buckets[-1] += 1
+        self._counters[(name + '_obs_sum', labels)] += value
+
+    def prometheus_text(self):
+        """Metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {k: list(v) for k, v in self._histograms.items()}
+
+        def fmt(labels):
+            model, endpoint = labels[:2]
+            text = f'model="{model}",endpoint="{endpoint}"'
+            if len(labels) > 2:
+                text += f',status="{labels[2]}"'
+            return text
+
+        families = {
+            'calls': ('ollama_calls_total', 'counter', 'Model calls by outcome'),
+            'prompt_tokens': ('ollama_prompt_tokens_total', 'counter', 'Prompt tokens evaluated'),
+            'output_tokens': ('ollama_output_tokens_total', 'counter', 'Tokens generated'),
+            'thinking_tokens': ('ollama_thinking_tokens_total', 'counter', 'Generated tokens inside <think>'),
+            'answer_tokens': ('ollama_answer_tokens_total', 'counter', 'Generated tokens after </think>'),
+            'load_time': ('ollama_load_seconds_total', 'counter', 'Time spent loading models'),
+            'prompt_eval_time': ('ollama_prompt_eval_seconds_total', 'counter', 'Time spent evaluating prompts'),
+            'eval_time': ('ollama_eval_seconds_total', 'counter', 'Time spent generating tokens'),
+            'wall_time': ('ollama_wall_seconds_total', 'counter', 'Client-side wall time'),
+        }
+        for key, (metric, kind, help_text) in families.items():
+            samples = [(labels, v) for (name, labels), v in sorted(counters.items()) if name == key]
+            if not samples:
+                continue
+            lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} {kind}']
+            lines += [f'{metric}{{{fmt(labels)}}} {value:g}' for labels, value in samples]
+
+        for key, metric, help_text in (('wall_time', 'ollama_request_seconds', 'Request latency'),
+                                       ('ttft', 'ollama_ttft_seconds', 'Time to first token'),
+                                       ('ttfa', 'ollama_ttfa_seconds', 'Time to first answer token')):
+            samples = [(labels, v) for (name, labels), v in sorted(histograms.items()) if name == key]
+            if not samples:
+                continue
+            lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} histogram']
+            for labels, buckets in samples:
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, buckets):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{{fmt(labels)},le="{bound:g}"}} {cumulative}')
+                cumulative += buckets[-1]
+                lines.append(f'{metric}_bucket{{{fmt(labels)},le="+Inf"}} {cumulative}')
+                lines.append(f'{metric}_sum{{{fmt(labels)}}} {counters[(key + "_obs_sum", labels)]:g}')
+                lines.append(f'{metric}_count{{{fmt(labels)}}} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Write a node_exporter textfile-collector file atomically"""
+        path = Path(path)
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_text(self.prometheus_text())
+        tmp_path.replace(path)
+
+
+_default_recorder = None
+
+
+def get_recorder():
+    """Process-wide recorder (JSONL sink from ``REASONING_METRICS_PATH``)"""
+    global _default_recorder
+    if _default_recorder is None:
+        _default_recorder = MetricsRecorder()
+    return _default_recorder
+
+
+class InstrumentedOllama(OllamaHTTP):
+    """OllamaHTTP that records a CallRecord for every chat/generate call"""
+
+    def __init__(self, base_url, recorder=None):
+        super().__init__(base_url)
+        self.recorder = recorder or get_recorder()
+
+    def chat(self, model, messages, stream=False, timeout=None, **kwargs):
+        metrics = CallMetrics('chat', model, streamed=stream)
+        try:
+            result = super().chat(model, messages, stream=stream, timeout=timeout, **kwargs)
+        except Exception as e:
+            self.recorder.record(metrics.finish(error=e))
+            raise
+        return self._finish(metrics, result)
+
+    def generate(self, model, prompt, stream=False, timeout=None, **kwargs):
+        metrics = CallMetrics('generate', model, streamed=stream)
+        try:
+            result = super().generate(model, prompt, stream=stream, timeout=timeout, **kwargs)
+        except Exception as e:
+            self.recorder.record(metrics.finish(error=e))
+            raise
+        return self._finish(metrics, result)
+
+    def _finish(self, metrics, result):
+        if metrics.record.streamed:
+            return self._observe_stream(metrics, result)
+        self.recorder.record(metrics.finish(result))
+        return result
+
+    def _observe_stream(self, metrics, chunks):
+        last = None
+        try:
+            for chunk in chunks:
+                metrics.observe_chunk(chunk)
+                last = chunk
+                yield chunk
+        except GeneratorExit:
+            self.recorder.record(metrics.finish(error='cancelled'))
+            raise
+        except Exception as e:
+            self.recorder.record(metrics.finish(last, error=e))
+            raise
+        self.recorder.record(metrics.finish(last))
@@ -0,0 +1,349 @@
+"""
+Parallel, cached notebook execution harness
+
+Runs the course notebooks headlessly, one Jupyter kernel per notebook in a
+pool of worker processes, so the suite takes as long as the slowest notebook
+instead of the sum. Every kernel gets its own response cache
+(``REASONING_CACHE_PATH``), and with ``--fake`` every ``OLLAMA_URL`` points at
+a local fake Ollama server. Reruns are therefore deterministic and mostly
+cache hits. Each cell's wall time is reported so slow cells stand out.
+
+Outputs are normalized (timings, addresses and timestamps masked, images
+reduced to their type) and compared against a snapshot per notebook; any
+difference fails the run. The first run writes the snapshots, and
+``--update`` rewrites them. Tag a cell ``ignore-output`` to skip its
+comparison. Notebooks that read an ``*_API_KEY`` which is not set are
+skipped.
+
+    python -m reasoning_models.notebooks --fake --jobs 4
+    python -m reasoning_models.notebooks notebooks/Ollama-Deepseek-R1.ipynb --update
+"""
+import argparse
+import json
+import os
+import queue
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+NOTEBOOK_DIR = Path(__file__).resolve().parent.parent / 'notebooks'
+SNAPSHOT_DIR = Path(os.environ.get('REASONING_NOTEBOOK_SNAPSHOTS', NOTEBOOK_DIR / 'snapshots'))
+CACHE_DIR = Path(os.environ.get(
+    'REASONING_NOTEBOOK_CACHE',
+    Path.home() / '.cache' / 'oreilly-reasoning-models' / 'notebooks',
+))
+CELL_TIMEOUT = float(os.environ.get('REASONING_CELL_TIMEOUT', 600))
+KERNEL_NAME = 'python3'
+IGNORE_TAG = 'ignore-output'
+SKIP_PREFIXES = ('!pip', '%pip', '!conda', '%conda')     # installs are not part of the suite
+FAKE_MODELS = ('deepseek-r1:14b', 'deepseek-r1:7b', 'deepseek-r1:1.5b')
+
+_API_KEY = re.compile(r"""os\.(?:getenv|environ\.get)\(\s*['"](\w+_API_KEY)['"]""")
+_MODEL = re.compile(r"""['"]((?:deepseek|qwen|llama|mistral|phi|gemma)[\w.-]*:[\w.-]+)['"]""")
+_MASKS = (
+    (re.compile(r'\b0x[0-9a-fA-F]+\b'), '0x…'),
+    (re.compile(r'\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(?:\.\d+)?(?:Z|[+-]\d\d:\d\d)?'), '<timestamp>'),
+    (re.compile(r'/tmp/[\w./-]+'), '<tmp>'),
+    # Server addresses: the fake server listens on a random port
+    (re.compile(r'(?<![\w.])(?:https?://)?(?:localhost|\d{1,3}(?:\.\d{1,3}){3}|\[[0-9a-fA-F:]+\]):\d+'), '<host>'),
+    (re.compile(r'\d+\.\d+'), '<n>'),         # timings, rates and other measured decimals
+)
+
+
+@dataclass
+class CellResult:
+    index: int
+    source: str
+    elapsed: float = 0.0
+    outputs: list = field(default_factory=list)
+    error: str | None = None
+    skipped: bool = False
+    ignore_output: bool = False
+
+
+@dataclass
+class NotebookResult:
+    path: str
+    status: str = 'ok'              # ok, failed, drift, new, skipped
+    elapsed: float = 0.0
+    cells: list = field(default_factory=list)
+    error: str | None = None
+    drift: list = field(default_factory=list)   # indices of cells whose output changed
+
+    @property
+    def ok(self):
+        return self.status in ('ok', 'new', 'skipped')
+
+
+def read_notebook(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def try_read_notebook(path):
+    """``(notebook, None)``, or ``(None, reason)`` for an empty, unreadable or invalid file"""
+    try:
+        if Path(path).stat().st_size == 0:
+            return None, 'empty file'
+        notebook = read_notebook(path)
+    except (OSError, UnicodeDecodeError, json.JSONDecodeError) as e:
+        return None, f"unreadable: {type(e).__name__}: {e}"
+    if not isinstance(notebook, dict):
+        return None, 'unreadable: not a notebook'
+    return notebook, None
+
+
+def _source(cell):
+    source = cell.get('source', '')
+    return ''.join(source) if isinstance(source, list) else source
+
+
+def code_cells(notebook):
+    return [(i, cell) for i, cell in enumerate(notebook.get('cells', [])) if cell.get('cell_type') == 'code']
+
+
+def required_keys(notebook):
+    """``*_API_KEY`` environment variables the notebook reads"""
+    return sorted({key for _, cell in code_cells(notebook) for key in _API_KEY.findall(_source(cell))})
+
+
+def models_used(notebook):
+    return {model for _, cell in code_cells(notebook) for model in _MODEL.findall(_source(cell))}
+
+
+def _mask(text):
+    for pattern, replacement in _MASKS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def normalize_output(output):
+    """Comparable form of one output: masked text for text types, only the type for binary data"""
+    if output['output_type'] == 'stream':
+        return {'stream': output['name'], 'text': _mask(output['text'])}
+    if output['output_type'] == 'error':
+        return {'error': output['ename'], 'text': _mask(output['evalue'])}
+    data = {}
+    for mime, value in sorted(output.get('data', {}).items()):
+        if mime.startswith('text/') or mime.endswith('json'):
+            value = ''.join(value) if isinstance(value, list) else value
+            data[mime] = _mask(value if isinstance(value, str) else json.dumps(value, sort_keys=True))
+        else:
+            data[mime] = None
+    return {output['output_type']: data}
+
+
+def _run_cell(kc, source, timeout):
+    """Execute ``source``; returns (outputs, error) as Jupyter sends them on iopub"""
+    msg_id = kc.execute(source, store_history=True, allow_stdin=False, stop_on_error=True)
+    outputs, error = [], None
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"cell did not finish within {timeout:g}s")
+        try:
+            msg = kc.get_iopub_msg(timeout=remaining)
+        except queue.Empty:
+            continue
+        if msg['parent_header'].get('msg_id') != msg_id:
+            continue
+        kind, content = msg['msg_type'], msg['content']
+        if kind == 'status' and content['execution_state'] == 'idle':
+            return outputs, error
+        if kind == 'stream':
+            if outputs and outputs[-1]['output_type'] == 'stream' and outputs[-1]['name'] == content['name']:
+                outputs[-1]['text'] += content['text']
+            else:
+                outputs.append({'output_type': 'stream', 'name': content['name'], 'text': content['text']})
+        elif kind in ('execute_result', 'display_data'):
+            outputs.append({'output_type': kind, 'data': content['data']})
+        elif kind == 'error':
+            error = f"{content['ename']}: {content['evalue']}"
+            outputs.append({'output_type': 'error', 'ename': content['ename'], 'evalue': content['evalue']})
+        elif kind == 'clear_output':
+            outputs.clear()
+
+
+def execute_notebook(path, env=None, timeout=CELL_TIMEOUT, kernel_name=KERNEL_NAME):
+    """Run every code cell in a fresh kernel (cwd: the notebook's directory); stops at the first error"""
+    from jupyter_client import KernelManager
+
+    path = Path(path)
+    result = NotebookResult(str(path))
+    cells = code_cells(read_notebook(path))
+    km = KernelManager(kernel_name=kernel_name)
+    start = time.perf_counter()
+    # Kernel log noise stays out of the report; cell errors arrive as iopub messages
+    km.start_kernel(cwd=str(path.parent), env={**os.environ, **(env or {})}, stderr=subprocess.DEVNULL)
+    kc = km.client()
+    kc.start_channels()
+    try:
+        kc.wait_for_ready(timeout=60)
+        for index, cell in cells:
+            source = _source(cell)
+            tags = cell.get('metadata', {}).get('tags', [])
+            cell_result = CellResult(index, source, ignore_output=IGNORE_TAG in tags)
+            result.cells.append(cell_result)
+            if not source.strip() or source.lstrip().startswith(SKIP_PREFIXES):
+                cell_result.skipped = True
+                continue
+            cell_start = time.perf_counter()
+            try:
+                cell_result.outputs, cell_result.error = _run_cell(kc, source, timeout)
+            except TimeoutError as e:
+                km.interrupt_kernel()
+                cell_result.error = str(e)
+            cell_result.elapsed = time.perf_counter() - cell_start
+            if cell_result.error:
+                result.status, result.error = 'failed', f"cell {index}: {cell_result.error}"
+                break
+    except Exception as e:
+        result.status, result.error = 'failed', f"{type(e).__name__}: {e}"
+    finally:
+        kc.stop_channels()
+        km.shutdown_kernel(now=True)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def _worker(path, env, timeout, kernel_name):
+    # Runs in a worker process; plain dicts cross the process boundary
+    return asdict(execute_notebook(path, env, timeout, kernel_name))
+
+
+def snapshot(result):
+    """``{cell index: normalized outputs}`` for the cells that are compared"""
+    return {str(cell.index): [normalize_output(o) for o in cell.outputs]
+            for cell in result.cells if not cell.skipped and not cell.ignore_output}
+
+
+def check_drift(result, snapshot_dir=SNAPSHOT_DIR, update=False):
+    """Compare with the stored snapshot (writing it when missing or ``update``); sets status and drift"""
+    path = Path(snapshot_dir) / f"{Path(result.path).stem}.json"
+    current = snapshot(result)
+    if update or not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(current, indent=1, ensure_ascii=False) + '\n', encoding='utf-8')
+        result.status = 'new'
+        return result
+    expected = json.loads(path.read_text(encoding='utf-8'))
+    result.drift = sorted(int(i) for i in set(current) | set(expected) if current.get(i) != expected.get(i))
+    if result.drift:
+        result.status = 'drift'
+    return result
+
+
+def run_notebooks(paths, jobs=None, env=None, cache_dir=CACHE_DIR, snapshot_dir=SNAPSHOT_DIR, update=False,
+                  timeout=CELL_TIMEOUT, kernel_name=KERNEL_NAME, cache_suffix=''):
+    """Execute notebooks in parallel worker processes; yields NotebookResults as they finish"""
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    pending = []
+    for path in map(Path, paths):
+        notebook, problem = try_read_notebook(path)
+        if notebook is None:
+            # Empty placeholders are skipped; corrupt notebooks fail the run
+            yield NotebookResult(str(path), status='skipped' if problem == 'empty file' else 'failed',
+                                 error=problem)
+            continue
+        missing = [key for key in required_keys(notebook) if not os.environ.get(key)]
+        if not code_cells(notebook) or missing:
+            reason = f"needs {', '.join(missing)}" if missing else 'no code cells'
+            yield NotebookResult(str(path), status='skipped', error=reason)
+            continue
+        # One cache per notebook: parallel kernels never contend for the same SQLite file
+        cache = cache_dir / f"{path.stem}{cache_suffix}.sqlite3"
+        pending.append((path, {**(env or {}), 'REASONING_CACHE_PATH': str(cache)}))
+
+    if not pending:
+        return
+    with ProcessPoolExecutor(max_workers=min(jobs or os.cpu_count() or 1, len(pending))) as pool:
+        futures = {pool.submit(_worker, str(path), cell_env, timeout, kernel_name): path
+                   for path, cell_env in pending}
+        for future in as_completed(futures):
+            try:
+                data = future.result()
+            except Exception as e:
+                yield NotebookResult(str(futures[future]), status='failed', error=f"{type(e).__name__}: {e}")
+                continue
+            result = NotebookResult(**{**data, 'cells': [CellResult(**c) for c in data['cells']]})
+            if result.status == 'ok':
+                check_drift(result, snapshot_dir, update)
+            yield result
+
+
+def print_result(result):
+    marks = {'ok': '✅', 'new': '📸', 'drift': '❌', 'failed': '❌', 'skipped': '⏭️ '}
+    detail = {'new': ' (snapshot written)', 'skipped': f" ({result.error})",
+              'failed': f": {result.error}", 'drift': f": output drift in cells {result.drift}"}
+    print(f"{marks[result.status]} {Path(result.path).name} {result.elapsed:.1f}s{detail.get(result.status, '')}")
+
+
+def print_slowest(results, count):
+    cells = [(cell, result) for result in results for cell in result.cells if not cell.skipped]
+    if not cells or count <= 0:
+        return
+    print("\n🐢 Slowest cells")
+    for cell, result in sorted(cells, key=lambda item: -item[0].elapsed)[:count]:
+        first_line = next((line for line in cell.source.splitlines() if line.strip()), '')[:60]
+        print(f"   {cell.elapsed:8.2f}s  {Path(result.path).name} [{cell.index}]  {first_line}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Execute the course notebooks in parallel and check their outputs')
+    parser.add_argument('notebooks', nargs='*', help=f"default: every .ipynb in {NOTEBOOK_DIR}")
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--fake', action='store_true', help='point OLLAMA_URL at a local fake Ollama server')
+    parser.add_argument('--url', help='OLLAMA_URL for the kernels (default: inherited)')
+    parser.add_argument('--token-rate', type=float, default=2000.0, help='fake server tokens per second')
+    parser.add_argument('--cache-dir', default=str(CACHE_DIR))
+    parser.add_argument('--snapshots', default=str(SNAPSHOT_DIR))
+    parser.add_argument('--update', action='store_true', help='rewrite output snapshots instead of comparing')
+    parser.add_argument('--timeout', type=float, default=CELL_TIMEOUT, help='seconds per cell')
+    parser.add_argument('--kernel', default=KERNEL_NAME)
+    parser.add_argument('--slowest', type=int, default=10, help='list the N slowest cells')
+    parser.add_argument('--output', help='write the JSON report here')
+    args = parser.parse_args(argv)
+
+    paths = args.notebooks or sorted(str(p) for p in NOTEBOOK_DIR.glob('*.ipynb'))
+    env = {}
+    server = None
+    if args.fake:
+        from reasoning_models.fake_server import FakeOllamaConfig, FakeOllamaServer
+
+        notebooks = [try_read_notebook(p)[0] for p in paths]
+        models = sorted(set(FAKE_MODELS).union(*(models_used(nb) for nb in notebooks if nb is not None)))
+        server = FakeOllamaServer(FakeOllamaConfig(models=models, token_rate=args.token_rate, load_time=0.0))
+        args.url = server.start()
+    if args.url:
+        env.update({'OLLAMA_URL': args.url, 'OLLAMA_URLS': args.url, 'OLLAMA_HOST': args.url})
+
+    print(f"📓 Running {len(paths)} notebooks with {args.jobs or os.cpu_count()} workers"
+          f"{' against a fake Ollama server' if args.fake else ''}")
+    start = time.perf_counter()
+    results = []
+    try:
+        for result in run_notebooks(paths, args.jobs, env, args.cache_dir, args.snapshots, args.update,
+                                    args.timeout, args.kernel, '-fake' if args.fake else ''):
+            print_result(result)
+            results.append(result)
+    finally:
+        if server:
+            server.stop()
+    print_slowest(results, args.slowest)
+    failed = [r for r in results if not r.ok]
+    print(f"\n{'❌' if failed else '✅'} {len(results) - len(failed)}/{len(results)} notebooks passed "
+          f"in {time.perf_counter() - start:.1f}s")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump([asdict(r) for r in results], f, indent=2, default=str)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""
+Prompt-prefix reuse for shared-context and multi-turn calls
+
+Brief-style prompts send a large fixed context followed by a small varying
+question, and every call pays ``prompt_eval_duration`` for the whole context
+again unless the server can reuse it. Reuse only happens when the shared part
+comes first and is byte-identical between calls, so ``PromptPrefix`` freezes
+the shared blocks once (dicts and lists are serialized with sorted keys) and
+always puts them before the question:
+
+    prefix = PromptPrefix([context])
+    session = PrefixSession(url, 'deepseek-r1:14b', prefix)
+    session.ask('Which service should we migrate first?')
+    session.ask('What is the rollback plan?')
+    print(session.stats)
+
+For Ollama, ``PrefixSession`` either evaluates the prefix once and passes the
+returned ``context`` with every ``/api/generate`` call (``mode='context'``) or
+sends full chats and relies on the runner's own KV-cache reuse
+(``mode='chat'``). Both only pay off while the same runner stays loaded, so a
+session keeps one server, one fixed ``options`` dict (changing ``num_ctx``
+reloads the model) and a long ``keep_alive``. For Anthropic,
+``PromptPrefix.anthropic()`` marks the prefix with ``cache_control``; OpenAI
+caches identical prefixes of 1024+ tokens on its own. ``PrefixStats`` counts
+the prompt tokens each call did not have to evaluate.
+"""
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+
+from reasoning_models.coalesce import merge_chunks
+from reasoning_models.transport import OllamaHTTP
+
+KEEP_ALIVE = os.environ.get('OLLAMA_PREFIX_KEEP_ALIVE', '30m')
+SEPARATOR = '\n\n'
+TOKENS_PER_CHAR = 0.25          # rough English average, until the server tells us better
+NS = 1e9
+
+
+def _freeze(block):
+    if isinstance(block, str):
+        return block.replace('\r\n', '\n').strip()
+    return json.dumps(block, sort_keys=True, ensure_ascii=False, indent=2)
+
+
+@dataclass(frozen=True)
+class PromptPrefix:
+    """Shared prompt blocks, frozen so every call sends exactly the same bytes first"""
+    blocks: tuple
+
+    def __init__(self, blocks):
+        if isinstance(blocks, (str, dict)):
+            blocks = [blocks]
+        object.__setattr__(self, 'blocks', tuple(_freeze(b) for b in blocks if b))
+
+    @classmethod
+    def from_template(cls, template, **fields):
+        """A prefix from a ``str.format`` template such as the notebook's context template"""
+        return cls([template.format(**fields)])
+
+    @property
+    def text(self):
+        return SEPARATOR.join(self.blocks)
+
+    @property
+    def fingerprint(self):
+        return hashlib.sha256(self.text.encode()).hexdigest()[:16]
+
+    def render(self, question):
+        """Single prompt string: the prefix, then the question"""
+        return self.text + SEPARATOR + question.strip()
+
+    def messages(self, question=None, history=(), system_role='system'):
+        """Chat messages with the prefix as the first (system) message.
+
+        Use ``system_role='developer'`` for o1/o3, or ``'user'`` for models
+        that take no system message (the question is then a second user turn).
+        """
+        messages = [{'role': system_role, 'content': self.text}, *history]
+        if question is not None:
+            messages.append({'role': 'user', 'content': question.strip()})
+        return messages
+
+    def anthropic(self, question, history=(), ttl=None):
+        """``system``/``messages`` kwargs for the Messages API with the prefix cached.
+
+        Blocks shorter than the model's minimum cacheable length (1024 tokens
+        for Sonnet/Opus) are sent normally and simply not cached.
+        """
+        cache_control = {'type': 'ephemeral'}
+        if ttl:
+            cache_control['ttl'] = ttl
+        system = [{'type': 'text', 'text': block} for block in self.blocks]
+        if system:
+            system[-1]['cache_control'] = cache_control
+        return {'system': system,
+                'messages': [*history, {'role': 'user', 'content': question.strip()}]}
+
+
+@dataclass
+class PrefixStats:
+    """Prompt tokens evaluated vs. reused from a cache, across calls"""
+    calls: int = 0
+    prompt_tokens: int = 0          # tokens the server actually evaluated
+    reused_tokens: int = 0          # prompt tokens served from the KV / prompt cache
+    prompt_eval_time: float = 0.0
+
+    @property
+    def reuse_ratio(self):
+        total = self.prompt_tokens + self.reused_tokens
+        return self.reused_tokens / total if total else 0.0
+
+    def observe(self, evaluated, reused, prompt_eval_time=0.0):
+        self.calls += 1
+        self.prompt_tokens += evaluated or 0
+        self.reused_tokens += reused or 0
+        self.prompt_eval_time += prompt_eval_time or 0.0
+
+    def observe_usage(self, usage):
+        """Count a ``providers.Usage``; Anthropic's ``input_tokens`` already excludes cache reads"""
+        cached = usage.cached_tokens or 0
+        evaluated = usage.input_tokens or 0
+        if usage.provider != 'anthropic':
+            evaluated = max(0, evaluated - cached)
+        self.observe(evaluated, cached)
+
+
+class PrefixSession:
+    """Ask many questions against one shared prefix on one Ollama runner.
+
+    ``mode='context'`` evaluates the prefix once (``prime``) and sends its
+    token ``context`` with each ``/api/generate``; ``mode='chat'`` sends the
+    prefix as the leading system message of every ``/api/chat``. With
+    ``remember=True`` a question and its answer become part of the reused
+    prefix for the following calls (a multi-turn conversation).
+
+    Ollama only reports the tokens it evaluated, so reuse is estimated as the
+    expected prompt length (known prefix tokens plus the question, sized with
+    the prefix's tokens-per-character) minus ``prompt_eval_count``.
+    """
+
+    def __init__(self, http, model, prefix, mode='context', keep_alive=KEEP_ALIVE, options=None):
+        if mode not in ('context', 'chat'):
+            raise ValueError("mode must be 'context' or 'chat'")
+        self.http = OllamaHTTP(http) if isinstance(http, str) else http
+        self.model = model
+        self.prefix = prefix if isinstance(prefix, PromptPrefix) else PromptPrefix(prefix)
+        self.mode = mode
+        self.keep_alive = keep_alive
+        self.options = dict(options or {})
+        self.stats = PrefixStats()
+        self.context = None
+        self.history = []
+        self.primed = False
+        self._known_tokens = 0          # prompt tokens the runner should already hold
+        self._tokens_per_char = TOKENS_PER_CHAR
+
+    def prime(self):
+        """Evaluate the prefix without generating; returns the prefix token count"""
+        options = {**self.options, 'num_predict': 0}
+        if self.mode == 'context':
+            response = self.http.generate(self.model, self.prefix.text, keep_alive=self.keep_alive,
+                                          options=options)
+            self.context = response.get('context') or []
+            tokens = len(self.context) or response.get('prompt_eval_count') or 0
+        else:
+            response = self.http.chat(self.model, self.prefix.messages(), keep_alive=self.keep_alive,
+                                      options=options)
+            tokens = response.get('prompt_eval_count') or 0
+            if tokens < len(self.prefix.text) * TOKENS_PER_CHAR / 2:
+                # Either token-dense text or a runner that already held the prefix (then the count
+                # is not its length); /api/generate's context is the exact length either way
+                tokens = max(tokens, self._measure(options))
+        self.history = []
+        self.primed = True
+        self._known_tokens = tokens
+        if tokens and self.prefix.text:
+            self._tokens_per_char = tokens / len(self.prefix.text)
+        return tokens
+
+    def _measure(self, options):
+        """Token count of the prefix text (without the chat template), from a raw /api/generate"""
+        response = self.http.generate(self.model, self.prefix.text, raw=True, keep_alive=self.keep_alive,
+                                      options=options)
+        return len(response.get('context') or [])
+
+    def reset(self):
+        """Forget remembered turns (the prefix itself stays primed)"""
+        self.prime()
+
+    def ask(self, question, stream=False, remember=False, **kwargs):
+        """Generate/chat with the shared prefix; returns the response (or a chunk iterator)"""
+        if not self.primed:
+            self.prime()
+        options = {**self.options, **(kwargs.pop('options', None) or {})}
+        if self.mode == 'context':
+            result = self.http.generate(self.model, question, stream=stream, context=self.context,
+                                        keep_alive=self.keep_alive, options=options or None, **kwargs)
+        else:
+            messages = self.prefix.messages(question, history=self.history)
+            result = self.http.chat(self.model, messages, stream=stream, keep_alive=self.keep_alive,
+                                    options=options or None, **kwargs)
+        expected = self._known_tokens + round(len(question) * self._tokens_per_char)
+        if stream:
+            return self._observe_stream(result, question, expected, remember)
+        self._observe(result, question, expected, remember)
+        return result
+
+    def _observe_stream(self, chunks, question, expected, remember):
+        seen = []
+        for chunk in chunks:
+            seen.append(chunk)
+            yield chunk
+        self._observe(merge_chunks(seen), question, expected, remember)
+
+    def _observe(self, response, question, expected, remember):
+        evaluated = response.get('prompt_eval_count') or 0
+        reused = min(self._known_tokens, max(0, expected - evaluated))
+        self.stats.observe(evaluated, reused, (response.get('prompt_eval_duration') or 0) / NS)
+        if not remember:
+            return
+        if self.mode == 'context':
+            self.context = response.get('context') or self.context
+            self._known_tokens = len(self.context)
+        else:
+            answer = (response.get('message') or {}).get('content', '')
+            self.history += [{'role': 'user', 'content': question.strip()},
+                             {'role': 'assistant', 'content': answer}]
+            self._known_tokens = expected + (response.get('eval_count') or 0)
@@ -0,0 +1,318 @@
+"""
+One async streaming interface for Anthropic, OpenAI and Ollama reasoning models
+
+Every backend yields the same events: ``ThinkingStarted``, ``ThinkingDelta``,
+``ThinkingFinished`` and ``AnswerDelta`` from ``reasoning_models.thinking``,
+then a single ``Usage``. Claude's extended-thinking blocks, o1/o3 (and
+``reasoning_content`` from OpenAI-compatible servers) and DeepSeek-R1's
+``<think>`` text all go through one loop:
+
+    client = ReasoningClient('anthropic', 'claude-sonnet-4-20250514', thinking_budget=4000)
+    async for event in client.stream([{'role': 'user', 'content': 'Why is the sky blue?'}]):
+        ...
+
+Each backend is split into ``raw_stream`` (the network call, yielding plain
+dicts) and ``normalize`` (a pure translation of those dicts), so recorded
+streams can be replayed through ``normalize`` with ``replay_fixture``.
+"""
+import json
+import os
+import time
+from dataclasses import dataclass
+
+from reasoning_models.thinking import (AnswerDelta, ThinkingDelta, ThinkingFinished, ThinkingStarted,
+                                       ThinkParser, chunk_text, collect)
+from reasoning_models.transport import AsyncOllamaHTTP
+
+DEFAULT_MAX_TOKENS = 16000
+OLLAMA_URL = os.environ.get('OLLAMA_URL', 'http://localhost:11434')
+
+
+@dataclass(frozen=True)
+class Usage:
+    """Token usage reported at the end of a stream.
+
+    ``thinking_tokens`` comes from the provider when it reports it (OpenAI
+    ``reasoning_tokens``); otherwise it is apportioned from ``output_tokens`` by
+    the share of thinking text (Anthropic) or thinking chunks (Ollama).
+    """
+    provider: str
+    model: str
+    input_tokens: int | None = None
+    output_tokens: int | None = None
+    thinking_tokens: int | None = None
+    cached_tokens: int | None = None
+    stop_reason: str | None = None
+
+
+@dataclass
+class ReasoningResponse:
+    thinking: str
+    answer: str
+    usage: Usage | None
+
+
+def _as_dict(event):
+    """SDK objects (pydantic models) as plain dicts; dicts pass through"""
+    if isinstance(event, dict):
+        return event
+    return event.model_dump()
+
+
+def _split_tokens(total, thinking_share):
+    if total is None:
+        return None
+    return round(total * thinking_share)
+
+
+class Backend:
+    provider = None
+
+    def __init__(self, model):
+        self.model = model
+
+    def raw_stream(self, messages, **options):
+        """Async iterator of provider events as plain dicts"""
+        raise NotImplementedError
+
+    def normalize(self, events):
+        """Async iterator of normalized events for an (async) iterable of raw dicts"""
+        raise NotImplementedError
+
+
+class AnthropicBackend(Backend):
+    """Messages API streaming with ``thinking={'type': 'enabled', 'budget_tokens': N}``"""
+    provider = 'anthropic'
+
+    def __init__(self, model, client=None, api_key=None):
+        super().__init__(model)
+        self._client = client
+        self._api_key = api_key
+
+    @property
+    def client(self):
+        if self._client is None:
+            import anthropic
+
+            self._client = anthropic.AsyncAnthropic(api_key=self._api_key)
+        return self._client
+
+    async def raw_stream(self, messages, max_tokens=DEFAULT_MAX_TOKENS, thinking_budget=None, **options):
+        if thinking_budget:
+            options['thinking'] = {'type': 'enabled', 'budget_tokens': thinking_budget}
+        stream = await self.client.messages.create(
+            model=self.model, max_tokens=max_tokens, messages=messages, stream=True, **options)
+        async for event in stream:
+            yield _as_dict(event)
+
+    async def normalize(self, events):
+        input_tokens = cached = output_tokens = stop_reason = None
+        block_types = {}
+        thinking_chars = answer_chars = 0
+        async for event in _aiter(events):
+            kind = event['type']
+            if kind == 'content_block_delta':
+                delta = event['delta']
+                if delta['type'] == 'thinking_delta':
+                    thinking_chars += len(delta['thinking'])
+                    yield ThinkingDelta(delta['thinking'])
+                elif delta['type'] == 'text_delta':
+                    answer_chars += len(delta['text'])
+                    yield AnswerDelta(delta['text'])
+            elif kind == 'content_block_start':
+                block_type = event['content_block']['type']
+                block_types[event['index']] = block_type
+                if block_type in ('thinking', 'redacted_thinking'):
+                    yield ThinkingStarted()
+            elif kind == 'content_block_stop':
+                if block_types.get(event['index']) in ('thinking', 'redacted_thinking'):
+                    yield ThinkingFinished()
+            elif kind == 'message_start':
+                usage = event['message'].get('usage') or {}
+                input_tokens = usage.get('input_tokens')
+                cached = usage.get('cache_read_input_tokens')
+                output_tokens = usage.get('output_tokens')
+            elif kind == 'message_delta':
+                usage = event.get('usage') or {}
+                output_tokens = usage.get('output_tokens') or output_tokens
+                stop_reason = (event.get('delta') or {}).get('stop_reason', stop_reason)
+
+        chars = thinking_chars + answer_chars
+        yield Usage(self.provider, self.model, input_tokens, output_tokens,
+                    _split_tokens(output_tokens, thinking_chars / chars if chars else 0.0),
+                    cached, stop_reason)
+
+
+class OpenAIBackend(Backend):
+    """Chat Completions streaming for o-series models and OpenAI-compatible servers.
+
+    o1/o3 do not stream their reasoning, so only the answer and the reported
+    ``reasoning_tokens`` come through; servers that send ``reasoning_content``
+    deltas (DeepSeek, vLLM) also produce thinking events.
+    """
+    provider = 'openai'
+
+    def __init__(self, model, client=None, api_key=None, base_url=None):
+        super().__init__(model)
+        self._client = client
+        self._api_key = api_key
+        self._base_url = base_url
+
+    @property
+    def client(self):
+        if self._client is None:
+            import openai
+
+            self._client = openai.AsyncOpenAI(api_key=self._api_key, base_url=self._base_url)
+        return self._client
+
+    async def raw_stream(self, messages, max_tokens=DEFAULT_MAX_TOKENS, reasoning_effort=None, **options):
+        if reasoning_effort:
+            options['reasoning_effort'] = reasoning_effort
+        stream = await self.client.chat.completions.create(
+            model=self.model, messages=messages, max_completion_tokens=max_tokens, stream=True,
+            stream_options={'include_usage': True}, **options)
+        async for chunk in stream:
+            yield _as_dict(chunk)
+
+    async def normalize(self, events):
+        parser = ThinkParser()
+        usage = {}
+        stop_reason = None
+        async for chunk in _aiter(events):
+            for choice in chunk.get('choices') or ():
+                delta = choice.get('delta') or {}
+                reasoning = delta.get('reasoning_content')
+                if reasoning:
+                    for event in parser.feed_thinking(reasoning):
+                        yield event
+                if delta.get('content'):
+                    for event in parser.feed(delta['content']):
+                        yield event
+                stop_reason = choice.get('finish_reason') or stop_reason
+            if chunk.get('usage'):
+                usage = chunk['usage']
+        for event in parser.close():
+            yield event
+
+        details = usage.get('completion_tokens_details') or {}
+        prompt_details = usage.get('prompt_tokens_details') or {}
+        yield Usage(self.provider, self.model, usage.get('prompt_tokens'), usage.get('completion_tokens'),
+                    details.get('reasoning_tokens'), prompt_details.get('cached_tokens'), stop_reason)
+
+
+class OllamaBackend(Backend):
+    """/api/chat streaming; reasoning comes from ``<think>`` text or the ``thinking`` field"""
+    provider = 'ollama'
+
+    def __init__(self, model, base_url=OLLAMA_URL, in_thinking=False):
+        super().__init__(model)
+        self.http = AsyncOllamaHTTP(base_url)
+        self.in_thinking = in_thinking
+
+    def raw_stream(self, messages, max_tokens=None, think=None, timeout=None, **options):
+        if max_tokens:
+            options['num_predict'] = max_tokens
+        return self.http.chat_stream(self.model, messages, timeout=timeout, think=think,
+                                     options=options or None)
+
+    async def normalize(self, events):
+        parser = ThinkParser(in_thinking=self.in_thinking)
+        last = {}
+        thinking_chunks = answer_chunks = 0
+        async for chunk in _aiter(events):
+            last = chunk
+            thinking, content = chunk_text(chunk)
+            out = parser.feed_thinking(thinking) if thinking else []
+            if content:
+                out += parser.feed(content)
+            # Ollama streams roughly one token per chunk
+            thinking_chunks += any(isinstance(e, ThinkingDelta) for e in out)
+            answer_chunks += any(isinstance(e, AnswerDelta) for e in out)
+            for event in out:
+                yield event
+        for event in parser.close():
+            yield event
+
+        output_tokens = last.get('eval_count')
+        chunks = thinking_chunks + answer_chunks
+        yield Usage(self.provider, self.model, last.get('prompt_eval_count'), output_tokens,
+                    _split_tokens(output_tokens, thinking_chunks / chunks if chunks else 0.0),
+                    None, last.get('done_reason'))
+
+
+BACKENDS = {
+    'anthropic': AnthropicBackend,
+    'openai': OpenAIBackend,
+    'ollama': OllamaBackend,
+}
+
+
+async def _aiter(events):
+    """Iterate sync or async iterables alike"""
+    if hasattr(events, '__aiter__'):
+        async for event in events:
+            yield event
+    else:
+        for event in events:
+            yield event
+
+
+class ReasoningClient:
+    """Provider-agnostic reasoning client: ``stream()`` yields normalized events.
+
+    ``options`` given here are defaults for every call (e.g. ``thinking_budget``
+    for Anthropic, ``reasoning_effort`` for OpenAI, ``think`` for Ollama);
+    ``backend_kwargs`` go to the backend (``client``, ``api_key``, ``base_url``).
+    Pass an ``accounting.Accounting`` to account every call's ``Usage``.
+    """
+
+    def __init__(self, provider, model, backend_kwargs=None, accounting=None, **options):
+        self.backend = BACKENDS[provider](model, **(backend_kwargs or {}))
+        self.accounting = accounting
+        self.options = options
+
+    @property
+    def provider(self):
+        return self.backend.provider
+
+    @property
+    def model(self):
+        return self.backend.model
+
+    def stream(self, messages, **options):
+        """Async iterator of thinking/answer events followed by one ``Usage``"""
+        raw = self.backend.raw_stream(messages, **{**self.options, **options})
+        events = self.backend.normalize(raw)
+        return events if self.accounting is None else self._account(events)
+
+    async def _account(self, events):
+        start = time.perf_counter()
+        async for event in events:
+            if isinstance(event, Usage):
+                self.accounting.observe_usage(event, latency=time.perf_counter() - start)
+            yield event
+
+    async def complete(self, messages, **options):
+        """Consume the stream into a ReasoningResponse"""
+        events = [event async for event in self.stream(messages, **options)]
+        usage = next((e for e in reversed(events) if isinstance(e, Usage)), None)
+        result = collect(events)
+        return ReasoningResponse(result.thinking, result.answer, usage)
+
+
+def replay_fixture(path, provider, model='fixture'):
+    """Normalized events for a recorded stream: a JSONL file with one raw event dict per line"""
+    def events():
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    return BACKENDS[provider](model).normalize(events())
+
+
+async def record_fixture(client, messages, path, **options):
+    """Write the raw provider events of one live call to ``path`` for later replay"""
+    with open(path, 'w', encoding='utf-8') as f:
+        async for event in client.backend.raw_stream(messages, **{**client.options, **options}):
+            f.write(json.dumps(event, default=str) + '\n')
@@ -0,0 +1,297 @@
+"""
+Latency-aware request router across several Ollama hosts
+
+``Router`` spreads chat/generate calls over every healthy host instead of the
+first one that answers. Each host gets ``slots`` concurrent requests (its
+``OLLAMA_NUM_PARALLEL``); extra requests wait in the router's queue, not on a
+particular host, and take the first slot that frees up anywhere. Hosts are
+picked by least outstanding requests or by EWMA request latency times queue
+depth (kept apart from the millisecond ``/api/tags`` probes),
+only among hosts that have the model (``/api/tags``), preferring hosts that
+already have it loaded (``/api/ps``) so nobody pays a cold load while a warm
+box is free.
+
+A host that fails is benched for ``cooldown`` seconds and the request is
+retried on another host, so nothing queued is lost. A chat stream that
+breaks mid-answer is resumed elsewhere by sending the text so far as an
+assistant prefill; callers just see the rest of the stream.
+
+    router = Router(['http://gpu1:11434', 'http://gpu2:11434'])
+    router.refresh()
+    response = await router.chat('deepseek-r1:14b', messages)
+    BatchRunner(router=router).run(jobs)        # fan a batch out over all hosts
+"""
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+
+from reasoning_models._sync import run_sync
+from reasoning_models.batch import NUM_PARALLEL, is_transient
+from reasoning_models.endpoints import EWMA_ALPHA, PROBE_TIMEOUT, EndpointHealth
+from reasoning_models.thinking import THINK_CLOSE, THINK_OPEN, chunk_text
+from reasoning_models.transport import AsyncOllamaHTTP
+
+POLICIES = ('least_outstanding', 'ewma')
+COOLDOWN = float(os.environ.get('OLLAMA_ROUTER_COOLDOWN', 15.0))    # seconds a failed host is benched
+REFRESH_INTERVAL = 30.0
+DEFAULT_LATENCY = 1.0       # assumed for hosts without a latency sample yet
+
+
+class NoHostAvailable(RuntimeError):
+    """No host serves the model, or every candidate failed for this request"""
+
+
+@dataclass
+class Host:
+    url: str
+    health: EndpointHealth = None
+    available: set = field(default_factory=set)     # models from /api/tags
+    loaded: set = field(default_factory=set)        # models from /api/ps
+    outstanding: int = 0
+    served: int = 0
+    failovers: int = 0          # requests that failed here and moved on
+    down_until: float = 0.0
+    request_latency: float | None = None    # EWMA of served requests; ``health.latency`` is the probes'
+
+    def record_request(self, latency, alpha=EWMA_ALPHA):
+        if self.request_latency is None:
+            self.request_latency = latency
+        else:
+            self.request_latency = alpha * latency + (1 - alpha) * self.request_latency
+
+    def __post_init__(self):
+        self.health = self.health or EndpointHealth(self.url)
+        self.http = AsyncOllamaHTTP(self.url)
+
+    @property
+    def up(self):
+        return time.time() >= self.down_until
+
+    def has(self, model):
+        # Before the first refresh nothing is known; let the request find out
+        return not self.available or model in self.available
+
+
+def _resume_text(thinking, content):
+    """Assistant prefill for a resumed chat: thinking from a separate field goes back inside ``<think>``.
+
+    The block stays open when no answer text followed yet, so the next host keeps thinking from there.
+    """
+    answer = ''.join(content)
+    if not thinking:
+        return answer
+    return THINK_OPEN + ''.join(thinking) + (THINK_CLOSE + answer if answer else '')
+
+
+class Router:
+    """Route Ollama calls over many hosts; same call signatures as ``AsyncOllamaHTTP``"""
+
+    def __init__(self, urls, policy='least_outstanding', slots=NUM_PARALLEL, cooldown=COOLDOWN,
+                 refresh_interval=REFRESH_INTERVAL, queue_timeout=None):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {', '.join(POLICIES)}")
+        self.hosts = {url.rstrip('/'): Host(url.rstrip('/')) for url in urls}
+        self.policy = policy
+        self.slots = slots
+        self.cooldown = cooldown
+        self.refresh_interval = refresh_interval
+        self.queue_timeout = queue_timeout
+        self.refreshed_at = 0.0
+        self._cond = None
+        self._loop = None
+
+    def _condition(self):
+        # asyncio primitives belong to one event loop; BatchRunner.run starts a new one each time
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._cond = loop, asyncio.Condition()
+        return self._cond
+
+    async def _refresh_host(self, host):
+        start = time.perf_counter()
+        try:
+            tags, ps = await asyncio.gather(host.http.tags(timeout=PROBE_TIMEOUT),
+                                            host.http.ps(timeout=PROBE_TIMEOUT))
+        except Exception as e:
+            host.health.record_failure(e)
+            host.down_until = time.time() + self.cooldown
+            return host
+        host.available = {m.get('name') for m in tags.get('models', [])}
+        host.loaded = {m.get('name') for m in ps.get('models', [])}
+        host.health.record_success(time.perf_counter() - start, sorted(host.available))
+        host.down_until = 0.0
+        return host
+
+    async def arefresh(self):
+        """Re-read models and loaded state from every host at once"""
+        await asyncio.gather(*(self._refresh_host(host) for host in self.hosts.values()))
+        self.refreshed_at = time.time()
+        return self.report()
+
+    def refresh(self):
+        return run_sync(self.arefresh())
+
+    def _key(self, host, model):
+        cold = model not in host.loaded
+        latency = host.request_latency or DEFAULT_LATENCY
+        if self.policy == 'ewma':
+            return cold, latency * (host.outstanding + 1)
+        return cold, host.outstanding, latency, host.health.latency or DEFAULT_LATENCY
+
+    def pick(self, model, exclude=()):
+        """Best host with a free slot for ``model`` right now, or None"""
+        free = [h for h in self.hosts.values()
+                if h.url not in exclude and h.up and h.has(model) and h.outstanding < self.slots]
+        return min(free, key=lambda h: self._key(h, model), default=None)
+
+    def _candidates(self, model, exclude):
+        """Hosts that could still take the request once they free up or come back"""
+        return [h for h in self.hosts.values() if h.url not in exclude and h.has(model)]
+
+    async def _acquire(self, model, exclude):
+        if time.time() - self.refreshed_at > self.refresh_interval:
+            self.refreshed_at = time.time()     # one refresh at a time, not one per queued request
+            await self.arefresh()
+        cond = self._condition()
+        deadline = None if self.queue_timeout is None else time.monotonic() + self.queue_timeout
+        async with cond:
+            while True:
+                host = self.pick(model, exclude)
+                if host is not None:
+                    host.outstanding += 1
+                    return host
+                candidates = self._candidates(model, exclude)
+                if not candidates:
+                    raise NoHostAvailable(f"no host left for {model!r}")
+                # Wake up on a released slot, or when the next benched host comes back
+                waits = [h.down_until - time.time() for h in candidates if not h.up]
+                wait = min(waits) if waits else None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise NoHostAvailable(f"timed out waiting for a host for {model!r}")
+                    wait = remaining if wait is None else min(wait, remaining)
+                try:
+                    await asyncio.wait_for(cond.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _release(self, host, model, latency=None, error=None):
+        """Free the slot; a latency marks success, an error benches the host, neither just frees it"""
+        cond = self._condition()
+        async with cond:
+            host.outstanding -= 1
+            if latency is not None:
+                host.served += 1
+                host.loaded.add(model)
+                host.record_request(latency)
+                host.health.record_success()
+            elif error is not None:
+                host.failovers += 1
+                host.health.record_failure(error)
+                host.down_until = time.time() + self.cooldown
+            cond.notify_all()
+
+    async def _call(self, model, call):
+        tried = set()
+        while True:
+            host = await self._acquire(model, tried)
+            start = time.perf_counter()
+            try:
+                result = await call(host.http)
+            except Exception as e:
+                if not is_transient(e):
+                    await self._release(host, model)
+                    raise
+                await self._release(host, model, error=e)
+                tried.add(host.url)
+                if not self._candidates(model, tried):
+                    raise
+                continue
+            await self._release(host, model, time.perf_counter() - start)
+            return result
+
+    async def chat(self, model, messages, **kwargs):
+        return await self._call(model, lambda http: http.chat(model, messages, **kwargs))
+
+    async def generate(self, model, prompt, **kwargs):
+        return await self._call(model, lambda http: http.generate(model, prompt, **kwargs))
+
+    async def chat_stream(self, model, messages, **kwargs):
+        """Streamed chat; a host failure mid-stream continues on another host from the text so far"""
+        tried = set()
+        thought, sent = [], []
+        while True:
+            host = await self._acquire(model, tried)
+            request = list(messages)
+            if thought or sent:
+                request.append({'role': 'assistant', 'content': _resume_text(thought, sent)})
+            start, error, ok = time.perf_counter(), None, False
+            stream = host.http.chat_stream(model, request, **kwargs)
+            try:
+                async for chunk in stream:
+                    thinking, content = chunk_text(chunk)
+                    if thinking:
+                        thought.append(thinking)
+                    if content:
+                        sent.append(content)
+                    yield chunk
+                ok = True
+                return
+            except Exception as e:
+                if not is_transient(e):
+                    raise
+                error = e
+                tried.add(host.url)
+                if not self._candidates(model, tried):
+                    raise
+            finally:
+                await stream.aclose()
+                await self._release(host, model, time.perf_counter() - start if ok else None, error)
+
+    async def generate_stream(self, model, prompt, **kwargs):
+        """Streamed generate; fails over only before the first chunk (raw text cannot be resumed)"""
+        tried = set()
+        while True:
+            host = await self._acquire(model, tried)
+            start, error, ok, started = time.perf_counter(), None, False, False
+            stream = host.http.generate_stream(model, prompt, **kwargs)
+            try:
+                async for chunk in stream:
+                    started = True
+                    yield chunk
+                ok = True
+                return
+            except Exception as e:
+                if started or not is_transient(e):
+                    raise
+                error = e
+                tried.add(host.url)
+                if not self._candidates(model, tried):
+                    raise
+            finally:
+                await stream.aclose()
+                await self._release(host, model, time.perf_counter() - start if ok else None, error)
+
+    async def tags(self, timeout=None):
+        """Union of /api/tags across hosts (as of the last refresh)"""
+        names = sorted(set().union(*(h.available for h in self.hosts.values())))
+        return {'models': [{'name': name, 'model': name} for name in names]}
+
+    def report(self):
+        """Per-host state: up, outstanding, served, failovers, probe and request latency, and models"""
+        return {
+            url: {
+                'up': h.up,
+                'outstanding': h.outstanding,
+                'served': h.served,
+                'failovers': h.failovers,
+                'latency': h.health.latency,
+                'request_latency': h.request_latency,
+                'loaded': sorted(h.loaded),
+                'available': sorted(h.available),
+                'last_error': h.health.last_error,
+            }
+            for url, h in self.hosts.items()
+        }
@@ -0,0 +1,161 @@
+"""
+Vectorized weighted scoring for model catalogs
+
+Each criterion is clipped to ``[min_value, max_value]`` and scaled to 0-1
+(inverted when lower is better), for the whole catalog at once. Any number of
+criteria can be scored, and a grid of weight profiles is evaluated in a
+single matrix product:
+
+    engine = ScoringEngine()                         # intelligence, speed, cost
+    results = engine.score_frame(df, {'intelligence': 0.4, 'speed': 0.4, 'cost': 0.2})
+    grid = weight_grid(engine.names, steps=10)       # every profile on a 0.1 simplex grid
+    totals = engine.sensitivity(df, grid)            # (profiles, models)
+"""
+import itertools
+import json
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class Criterion:
+    name: str
+    max_value: float
+    higher_is_better: bool = True
+    min_value: float = 0.0
+
+
+# Normalization ranges used by the decision chart
+DEFAULT_CRITERIA = (
+    Criterion('intelligence', 100),     # intelligence index
+    Criterion('speed', 500),            # tokens per second
+    Criterion('cost', 100, higher_is_better=False),     # $ per 1M tokens
+)
+
+
+def weight_grid(names, steps=10):
+    """All weight profiles on the simplex with increments of ``1/steps``, shape (profiles, k)"""
+    k = len(names)
+    rows = [combo for combo in itertools.product(range(steps + 1), repeat=k - 1)
+            if sum(combo) <= steps]
+    grid = np.array([list(combo) + [steps - sum(combo)] for combo in rows], dtype=float)
+    return grid / steps
+
+
+class ScoringEngine:
+    """Normalize and weight an arbitrary set of criteria with NumPy array operations"""
+
+    def __init__(self, criteria=DEFAULT_CRITERIA):
+        self.criteria = tuple(criteria)
+        self.names = [c.name for c in self.criteria]
+        self._low = np.array([c.min_value for c in self.criteria], dtype=float)
+        self._span = np.array([c.max_value - c.min_value for c in self.criteria], dtype=float)
+        self._invert = np.array([not c.higher_is_better for c in self.criteria])
+
+    def matrix(self, data):
+        """(n, k) float array of raw criterion values from a DataFrame or array-like"""
+        if hasattr(data, 'columns'):
+            return data[self.names].to_numpy(dtype=float)
+        values = np.asarray(data, dtype=float)
+        return values.reshape(-1, len(self.criteria))
+
+    def normalize(self, data):
+        """(n, k) array of 0-1 scores: clip-and-divide, inverted where lower is better"""
+        norm = np.clip(self.matrix(data) - self._low, 0, self._span) / self._span
+        return np.where(self._invert, 1 - norm, norm)
+
+    def weights(self, weights, normalize=False):
+        """Weight vector(s) in criterion order from a dict, array (k,) or array (profiles, k)"""
+        if isinstance(weights, dict):
+            unknown = set(weights) - set(self.names)
+            if unknown:
+                raise ValueError(f"Unknown criteria: {', '.join(sorted(unknown))}")
+            weights = [weights.get(name, 0.0) for name in self.names]
+        weights = np.asarray(weights, dtype=float)
+        if weights.shape[-1] != len(self.criteria):
+            raise ValueError(f"Expected {len(self.criteria)} weights, got {weights.shape[-1]}")
+        if normalize:
+            weights = weights / weights.sum(axis=-1, keepdims=True)
+        return weights
+
+    def score(self, data, weights):
+        """Total weighted score per row, shape (n,)"""
+        return self.normalize(data) @ self.weights(weights)
+
+    def sensitivity(self, data, grid):
+        """Total scores for every weight profile in ``grid`` at once, shape (profiles, n)"""
+        return self.weights(grid) @ self.normalize(data).T
+
+    def score_frame(self, frame, weights, sort=True):
+        """Copy of ``frame`` with ``<name>_norm``, ``<name>_score`` and ``total_score`` columns"""
+        norm = self.normalize(frame)
+        contributions = norm * self.weights(weights)
+        columns = {}
+        for i, name in enumerate(self.names):
+            columns[f'{name}_norm'] = norm[:, i]
+        for i, name in enumerate(self.names):
+            columns[f'{name}_score'] = contributions[:, i]
+        columns['total_score'] = contributions.sum(axis=1)
+        results = frame.assign(**columns)
+        if sort:
+            results = results.sort_values('total_score', ascending=False)
+        return results
+
+    def score_profiles(self, frame, profiles):
+        """Score several named weight profiles in one batched pass.
+
+        Returns ``frame`` repeated once per profile (long format) with a ``profile``
+        column, the usual ``_norm``/``_score``/``total_score`` columns and a 1-based
+        ``rank`` within each profile, ordered by profile then rank.
+        """
+        names = list(profiles)
+        grid = np.stack([self.weights(profiles[name]) for name in names])   # (p, k)
+        norm = self.normalize(frame)                                        # (n, k)
+        contributions = grid[:, None, :] * norm[None, :, :]                 # (p, n, k)
+        totals = contributions.sum(axis=2)                                  # (p, n)
+        p, n = totals.shape
+
+        order = np.argsort(-totals, axis=1, kind='stable')
+        ranks = np.empty_like(order)
+        ranks[np.arange(p)[:, None], order] = np.arange(1, n + 1)
+
+        flat = contributions.reshape(p * n, -1)
+        columns = {'profile': np.repeat(names, n)}
+        tiled = np.tile(norm, (p, 1))
+        for i, name in enumerate(self.names):
+            columns[f'{name}_norm'] = tiled[:, i]
+        for i, name in enumerate(self.names):
+            columns[f'{name}_score'] = flat[:, i]
+        columns['total_score'] = totals.ravel()
+        columns['rank'] = ranks.ravel()
+
+        results = frame.iloc[np.tile(np.arange(n), p)].reset_index(drop=True).assign(**columns)
+        # Row index (profile, rank) -> position in the long frame
+        return results.iloc[(np.arange(p)[:, None] * n + order).ravel()].reset_index(drop=True)
+
+    def sensitivity_frame(self, frame, grid, label='model'):
+        """One row per weight profile: the weights, the winning ``label`` and its score"""
+        import pandas as pd
+
+        grid = self.weights(grid)
+        totals = self.sensitivity(frame, grid)
+        best = totals.argmax(axis=1)
+        table = pd.DataFrame(grid, columns=[f'w_{name}' for name in self.names])
+        table['winner'] = frame[label].to_numpy()[best]
+        table['winner_score'] = totals[np.arange(len(grid)), best]
+        return table
+
+
+def load_table(path):
+    """Model catalog as a DataFrame from CSV, JSON (records or columns) or a ColumnStore directory"""
+    import pandas as pd
+
+    if os.path.isdir(path):
+        from reasoning_models.store import ColumnStore
+        return ColumnStore(path).to_frame()
+    if path.endswith('.json'):
+        with open(path) as f:
+            return pd.DataFrame(json.load(f))
+    return pd.read_csv(path)
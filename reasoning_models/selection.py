@@ -0,0 +1,132 @@
+"""
+Top-k and Pareto-frontier selection over large model catalogs
+
+``top_k`` uses ``np.argpartition`` so only the k winners get sorted.
+``pareto_frontier`` returns the non-dominated rows over the scoring criteria
+(e.g. intelligence up, speed up, cost down) with a sort-and-sweep that is
+O(n log n) for two or three criteria. ``stream_top_k`` ranks CSV files that
+do not fit in memory by keeping a running top-k while reading chunks.
+"""
+import bisect
+
+import numpy as np
+
+from reasoning_models.scoring import ScoringEngine
+
+CHUNK_SIZE = 100_000
+
+
+def top_k(scores, k):
+    """Indices of the ``k`` largest scores, best first"""
+    scores = np.asarray(scores, dtype=float)
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.array([], dtype=int)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+def top_k_frame(frame, k, column='total_score'):
+    """The ``k`` rows of ``frame`` with the highest ``column``, best first"""
+    return frame.iloc[top_k(frame[column].to_numpy(), k)]
+
+
+def _oriented(data, engine):
+    """Raw criterion values with lower-is-better columns negated, so larger is always better"""
+    values = engine.matrix(data)
+    signs = np.array([1.0 if c.higher_is_better else -1.0 for c in engine.criteria])
+    return values * signs
+
+
+def _frontier_2d(points):
+    order = np.lexsort((-points[:, 1], -points[:, 0]))
+    keep = []
+    best_y = -np.inf
+    for i in order:
+        if points[i, 1] > best_y:
+            keep.append(i)
+            best_y = points[i, 1]
+    return keep
+
+
+def _frontier_3d(points):
+    # Sweep x descending; a point survives unless an earlier survivor has y' >= y and z' >= z.
+    # The survivors' (y, z) staircase is kept sorted by y ascending / z descending.
+    order = np.lexsort((-points[:, 2], -points[:, 1], -points[:, 0]))
+    keep = []
+    stair_y, stair_z = [], []
+    for i in order:
+        y, z = points[i, 1], points[i, 2]
+        j = bisect.bisect_left(stair_y, y)
+        if j < len(stair_y) and stair_z[j] >= z:
+            continue
+        keep.append(i)
+        # Drop staircase points now dominated in (y, z): y' <= y and z' <= z, just left of j
+        start = j
+        while start > 0 and stair_z[start - 1] <= z:
+            start -= 1
+        end = j + 1 if j < len(stair_y) and stair_y[j] == y else j
+        stair_y[start:end] = [y]
+        stair_z[start:end] = [z]
+    return keep
+
+
+def _frontier_nd(points, block=1024):
+    keep = []
+    for start in range(0, len(points), block):
+        chunk = points[start:start + block]
+        dominated = np.zeros(len(chunk), dtype=bool)
+        for other in range(0, len(points), block):
+            others = points[other:other + block]
+            ge = (others[None, :, :] >= chunk[:, None, :]).all(axis=2)
+            gt = (others[None, :, :] > chunk[:, None, :]).any(axis=2)
+            dominated |= (ge & gt).any(axis=1)
+        keep.extend(start + np.flatnonzero(~dominated))
+    return keep
+
+
+def pareto_mask(data, engine=None):
+    """Boolean mask of non-dominated rows; identical rows are kept together"""
+    engine = engine or ScoringEngine()
+    points = _oriented(data, engine)
+    unique, inverse = np.unique(points, axis=0, return_inverse=True)
+    dims = unique.shape[1]
+    if dims == 1:
+        keep = [int(np.argmax(unique[:, 0]))]
+    elif dims == 2:
+        keep = _frontier_2d(unique)
+    elif dims == 3:
+        keep = _frontier_3d(unique)
+    else:
+        keep = _frontier_nd(unique)
+    on_frontier = np.zeros(len(unique), dtype=bool)
+    on_frontier[keep] = True
+    return on_frontier[inverse.ravel()]
+
+
+def pareto_frontier(frame, engine=None):
+    """Rows of ``frame`` that no other row beats on every criterion"""
+    return frame[pareto_mask(frame, engine)]
+
+
+def stream_top_k(path, k, weights=None, engine=None, column='total_score',
+                 chunksize=CHUNK_SIZE, **read_csv_kwargs):
+    """Top ``k`` rows of a CSV too large for memory, read ``chunksize`` rows at a time.
+
+    With ``weights`` every chunk is scored by the engine (adding ``total_score``);
+    without, the existing ``column`` is ranked. Memory stays O(k + chunksize).
+    """
+    import pandas as pd
+
+    engine = engine or ScoringEngine()
+    best = None
+    for chunk in pd.read_csv(path, chunksize=chunksize, **read_csv_kwargs):
+        if weights is not None:
+            chunk = chunk.assign(**{column: engine.score(chunk, weights)})
+        chunk = top_k_frame(chunk, k, column)
+        best = chunk if best is None else pd.concat([best, chunk], ignore_index=True)
+        best = top_k_frame(best, k, column).reset_index(drop=True)
+    return best
@@ -0,0 +1,346 @@
+"""
+Append-only columnar store for per-call metrics and benchmark results
+
+Rows are buffered and written in immutable segments, one directory per
+segment with one ``.npy`` file per column and a ``meta.json`` holding the row
+count, column dtypes and each column's min/max. Reads memory-map the column
+files, so loading costs nothing until values are touched; time-range and
+value-range queries skip whole segments using the min/max index and slice
+time-sorted segments with a binary search instead of a mask. Strings are
+dictionary-encoded per segment and come back as pandas categoricals.
+
+Without an explicit schema, dtypes are inferred per segment and widened as
+data arrives (int -> float when a later value is fractional or missing,
+anything -> str when types mix); keys first seen in a later segment become
+new columns, missing from (NaN in) older segments. With a schema, rows that
+do not fit it raise ``ValueError``, as do rows with a missing or NaN time.
+
+    with ColumnStore('results/calls') as store:
+        store.append(records)                   # CallRecords, dicts or a DataFrame
+    frame = ColumnStore('results/calls').to_frame(start=time.time() - 3600)
+
+Segments are written to a temporary directory and renamed into place, so a
+crashed writer never leaves a half-written segment behind; a writer whose
+rename finds the segment number taken by another process takes the next one.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import types
+import typing
+from dataclasses import asdict, fields, is_dataclass
+from pathlib import Path
+
+import numpy as np
+
+SEGMENT_ROWS = int(os.environ.get('REASONING_STORE_SEGMENT_ROWS', 65536))
+TIME_COLUMN = 'timestamp'
+
+
+def _dtype_for(annotation):
+    """Column dtype for a dataclass field annotation; optional numbers become float64 (NaN)"""
+    if isinstance(annotation, types.UnionType) or typing.get_origin(annotation) is typing.Union:
+        args = [a for a in typing.get_args(annotation) if a is not type(None)]
+        annotation = args[0] if len(args) == 1 else str
+        if annotation is int:
+            return 'float64'
+    return {bool: 'bool', int: 'int64', float: 'float64'}.get(annotation, 'str')
+
+
+def schema_for(cls):
+    """{column: dtype} for a dataclass such as ``metrics.CallRecord``"""
+    hints = typing.get_type_hints(cls)
+    return {f.name: _dtype_for(hints[f.name]) for f in fields(cls)}
+
+
+def _infer_dtype(values):
+    """dtype that holds every value; None when there are only Nones"""
+    sample = [v for v in values if v is not None]
+    if not sample:
+        return None
+    if all(isinstance(v, (bool, np.bool_)) for v in sample):
+        return 'bool' if len(sample) == len(values) else 'float64'
+    if all(isinstance(v, (int, np.integer)) and not isinstance(v, bool) for v in sample):
+        return 'int64' if len(sample) == len(values) else 'float64'
+    if all(isinstance(v, (int, float, np.number)) for v in sample):
+        return 'float64'
+    return 'str'
+
+
+_NUMERIC = ('bool', 'int64', 'float64')     # narrowest first
+
+
+def _widen(current, new):
+    """Narrowest dtype holding values of both; a None (all-missing) side forces a NaN-capable dtype"""
+    if current is None or new is None:
+        dtype = current or new
+        return 'float64' if dtype in ('bool', 'int64') and current != new else dtype
+    if current == new:
+        return current
+    if current in _NUMERIC and new in _NUMERIC:
+        return max(current, new, key=_NUMERIC.index)
+    return 'str'
+
+
+def _as_str(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True, ensure_ascii=False)
+    return str(value)
+
+
+def _encode(values, dtype):
+    """(array, dictionary or None) for one column of a segment"""
+    if dtype == 'str':
+        dictionary, codes = np.unique(np.array([_as_str(v) for v in values], dtype=object),
+                                      return_inverse=True)
+        return codes.astype(np.int32), [str(d) for d in dictionary]
+    if dtype == 'float64':
+        values = [np.nan if v is None else v for v in values]
+    return np.asarray(values, dtype=dtype), None
+
+
+def _bounds(array, dtype):
+    if dtype == 'str' or not len(array):
+        return None, None
+    if dtype == 'float64':
+        finite = array[~np.isnan(array)]
+        if not len(finite):
+            return None, None
+        return float(finite.min()), float(finite.max())
+    return array.min().item(), array.max().item()
+
+
+class Segment:
+    """One immutable, memory-mapped segment"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path / 'meta.json', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.rows = self.meta['rows']
+        self._arrays = {}
+
+    def overlaps(self, column, low=None, high=None):
+        """False when the min/max index proves no row has ``low <= column <= high``"""
+        info = self.meta['columns'].get(column)
+        if info is None:
+            return False
+        if info['min'] is None:
+            # Strings are not indexed; an all-NaN column matches only an open range
+            return info['dtype'] == 'str' or (low is None and high is None)
+        return (low is None or info['max'] >= low) and (high is None or info['min'] <= high)
+
+    def array(self, column):
+        """Column values as a read-only memmap (dictionary codes for strings)"""
+        array = self._arrays.get(column)
+        if array is None:
+            array = self._arrays[column] = np.load(self.path / f'{column}.npy', mmap_mode='r')
+        return array
+
+    def rows_between(self, column, low=None, high=None):
+        """Slice (sorted column) or boolean mask of the rows within [low, high]"""
+        values = self.array(column)
+        if self.meta['columns'][column].get('sorted'):
+            start = 0 if low is None else int(np.searchsorted(values, low, side='left'))
+            stop = self.rows if high is None else int(np.searchsorted(values, high, side='right'))
+            return slice(start, stop)
+        mask = np.ones(self.rows, dtype=bool)
+        if low is not None:
+            mask &= values >= low
+        if high is not None:
+            mask &= values <= high
+        return mask
+
+
+class ColumnStore:
+    """Directory of columnar segments; ``append`` rows, query with ``scan``/``to_frame``"""
+
+    def __init__(self, path, schema=None, segment_rows=SEGMENT_ROWS, time_column=TIME_COLUMN):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        if is_dataclass(schema):
+            schema = schema_for(schema)
+        self.schema = dict(schema) if schema else None
+        self.infer = self.schema is None     # widen dtypes and add columns as data arrives
+        self.segment_rows = segment_rows
+        self.time_column = time_column
+        self._buffer = []
+        self._lock = threading.Lock()
+        if self.infer:
+            for segment in self.segments():
+                self.schema = self.schema or {}
+                for name, info in segment.meta['columns'].items():
+                    self.schema[name] = _widen(self.schema[name], info['dtype']) if name in self.schema \
+                        else info['dtype']
+        self._timed = self.schema is not None and time_column in self.schema     # rows must carry a time
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    def __len__(self):
+        return sum(segment.rows for segment in self.segments()) + len(self._buffer)
+
+    def segments(self):
+        return [Segment(p) for p in sorted(self.path.glob('seg-*')) if (p / 'meta.json').exists()]
+
+    def append(self, rows):
+        """Buffer dataclass instances, dicts or DataFrame rows; full segments are written out"""
+        if hasattr(rows, 'to_dict') and hasattr(rows, 'columns'):
+            rows = rows.to_dict('records')
+        elif is_dataclass(rows) or isinstance(rows, dict):
+            rows = [rows]
+        rows = [asdict(row) if is_dataclass(row) else dict(row) for row in rows]
+        with self._lock:
+            self._check_times(rows)
+            self._buffer += rows
+            while len(self._buffer) >= self.segment_rows:
+                batch, self._buffer = self._buffer[:self.segment_rows], self._buffer[self.segment_rows:]
+                self._write(batch)
+
+    def _check_times(self, rows):
+        """Once the store has a time column every row needs a value; NaN would break the sort and range search"""
+        checked = rows
+        if not self._timed:
+            if not any(self.time_column in row for row in rows):
+                return
+            checked = self._buffer + rows   # rows buffered before the column first appeared
+        for row in checked:
+            value = row.get(self.time_column)
+            if value is None or (isinstance(value, (float, np.floating)) and np.isnan(value)):
+                raise ValueError(f"row without a {self.time_column!r} value: {row!r}")
+        self._timed = True
+
+    def flush(self):
+        """Write buffered rows as a (possibly short) segment"""
+        with self._lock:
+            if self._buffer:
+                batch, self._buffer = self._buffer, []
+                self._write(batch)
+
+    def _dtypes(self, rows):
+        """This segment's {column: dtype}; widens the inferred schema or checks rows against a given one"""
+        names = list(dict.fromkeys(name for row in rows for name in row))
+        if not self.infer:
+            extra = [name for name in names if name not in self.schema]
+            if extra:
+                raise ValueError(f"columns not in the store schema: {', '.join(extra)}")
+            return self.schema
+        schema = dict(self.schema or {})
+        for name in names:
+            inferred = _infer_dtype([row.get(name) for row in rows])
+            # A column missing from some rows of this batch needs room for NaN
+            if inferred in ('bool', 'int64') and any(name not in row for row in rows):
+                inferred = 'float64'
+            schema[name] = _widen(schema[name], inferred) if name in schema else inferred or 'str'
+        for name in schema.keys() - set(names):
+            schema[name] = _widen(schema[name], None)     # column absent from the whole batch
+        self.schema = schema
+        return schema
+
+    def _write(self, rows):
+        schema = self._dtypes(rows)
+        if self.time_column in schema:
+            rows = sorted(rows, key=lambda row: row[self.time_column])
+
+        existing = sorted(self.path.glob('seg-*'))
+        number = int(existing[-1].name.split('-')[1]) + 1 if existing else 0
+        tmp = Path(tempfile.mkdtemp(prefix='.tmp-seg-', dir=self.path))
+        columns = {}
+        try:
+            for name, dtype in schema.items():
+                try:
+                    array, dictionary = _encode([row.get(name) for row in rows], dtype)
+                except (TypeError, ValueError) as e:
+                    raise ValueError(f"column {name!r} does not fit dtype {dtype}: {e}") from None
+                np.save(tmp / f'{name}.npy', array)
+                low, high = _bounds(array, dtype)
+                columns[name] = {'dtype': dtype, 'min': low, 'max': high,
+                                 'sorted': name == self.time_column}
+                if dictionary is not None:
+                    columns[name]['dictionary'] = dictionary
+            with open(tmp / 'meta.json', 'w', encoding='utf-8') as f:
+                json.dump({'rows': len(rows), 'columns': columns}, f)
+            # rename never replaces a written (non-empty) segment: another writer got this number first
+            while True:
+                final = self.path / f'seg-{number:08d}'
+                try:
+                    os.rename(tmp, final)
+                    break
+                except OSError:
+                    if not final.exists():
+                        raise
+                    number += 1
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+    def scan(self, columns=None, start=None, end=None, ranges=None):
+        """Yield ``(segment, {column: array})`` for rows with ``start <= time <= end``.
+
+        ``ranges`` adds ``{column: (low, high)}`` filters. Segments whose
+        min/max rule them out are never opened; arrays are memmap views unless
+        an unsorted column filter forces a mask. Columns a segment predates
+        are left out of its dict.
+        """
+        ranges = dict(ranges or {})
+        if start is not None or end is not None:
+            ranges[self.time_column] = (start, end)
+        for segment in self.segments():
+            if not all(segment.overlaps(column, low, high) for column, (low, high) in ranges.items()):
+                continue
+            selection = None
+            for column, (low, high) in ranges.items():
+                rows = segment.rows_between(column, low, high)
+                selection = rows if selection is None else _combine(selection, rows, segment.rows)
+            if selection is None:
+                selection = slice(None)
+            matched = len(range(segment.rows)[selection]) if isinstance(selection, slice) else selection.sum()
+            if matched:
+                names = [name for name in columns or segment.meta['columns'] if name in segment.meta['columns']]
+                yield segment, {name: segment.array(name)[selection] for name in names}
+
+    def to_frame(self, columns=None, start=None, end=None, ranges=None):
+        """Query results as a DataFrame; numeric columns of a single-segment result are not copied"""
+        import pandas as pd
+
+        frames = []
+        for segment, arrays in self.scan(columns, start, end, ranges):
+            data = {}
+            for name, array in arrays.items():
+                info = segment.meta['columns'][name]
+                if info['dtype'] == 'str':
+                    data[name] = pd.Categorical.from_codes(np.asarray(array), info['dictionary'])
+                else:
+                    data[name] = array
+            frames.append(pd.DataFrame(data, copy=False))
+        if not frames:
+            return pd.DataFrame({name: pd.Series(dtype='category' if dtype == 'str' else dtype)
+                                 for name, dtype in (self.schema or {}).items()
+                                 if columns is None or name in columns})
+        if len(frames) == 1 and (columns is None or len(frames[0].columns) == len(columns)):
+            return frames[0]
+        frame = pd.concat(frames, ignore_index=True)
+        for name in frame.columns:
+            parts = [f[name] for f in frames if name in f]
+            # Segments that predate a string column leave gaps; those stay as concat made them
+            if len(parts) == len(frames) and all(isinstance(p.dtype, pd.CategoricalDtype) for p in parts):
+                frame[name] = pd.api.types.union_categoricals(parts)
+        if columns is not None:
+            frame = frame.reindex(columns=list(columns))
+        return frame
+
+
+def _combine(a, b, rows):
+    """Intersection of two row selections (slices or boolean masks) as a mask"""
+    mask = np.zeros(rows, dtype=bool)
+    mask[a] = True
+    keep = np.zeros(rows, dtype=bool)
+    keep[b] = True
+    return mask & keep
@@ -0,0 +1,172 @@
+"""
+Incremental parser for DeepSeek-R1 style ``<think>...</think>`` output
+
+Each chunk is scanned once. The only state carried between chunks is the
+current mode plus at most ``len('</think>') - 1`` characters of a tag that may
+be split across a chunk boundary. Per-chunk work therefore does not depend on
+how long the response already is, unlike re-running ``find()`` over the whole
+concatenated buffer.
+"""
+from dataclasses import dataclass
+
+THINK_OPEN = '<think>'
+THINK_CLOSE = '</think>'
+
+
+@dataclass(frozen=True)
+class ThinkingStarted:
+    """The model opened a ``<think>`` block"""
+
+
+@dataclass(frozen=True)
+class ThinkingDelta:
+    """A piece of text from inside the ``<think>`` block"""
+    text: str
+
+
+@dataclass(frozen=True)
+class ThinkingFinished:
+    """The model closed the ``<think>`` block; answer text follows"""
+
+
+@dataclass(frozen=True)
+class AnswerDelta:
+    """A piece of the final answer (text outside the ``<think>`` block)"""
+    text: str
+
+
+def _partial_tag_length(text, tag):
+    """Length of the longest suffix of ``text`` that is a proper prefix of ``tag``"""
+    for size in range(min(len(tag) - 1, len(text)), 0, -1):
+        if tag.startswith(text[-size:]):
+            return size
+    return 0
+
+
+class ThinkParser:
+    """Push-style state machine turning text chunks into thinking/answer events.
+
+    ``feed()`` returns the events produced by one chunk; call ``close()`` at
+    the end of the stream to flush any text held back as a possible tag.
+    Set ``in_thinking=True`` for chat templates that put the opening
+    ``<think>`` in the prompt, so the output starts mid-block.
+    """
+
+    def __init__(self, in_thinking=False):
+        self.in_thinking = in_thinking
+        self.seen_thinking = in_thinking
+        self._pending = ''
+        self._split_fields = False
+
+    def feed_thinking(self, text):
+        """Events for reasoning text the server already separated from the answer"""
+        events = []
+        if not self.in_thinking:
+            self.in_thinking = self.seen_thinking = True
+            events.append(ThinkingStarted())
+        self._split_fields = True
+        self._emit(events, text)
+        return events
+
+    def feed(self, chunk):
+        events = []
+        if self._split_fields and self.in_thinking:
+            # Answer content after a separate thinking field closes the block
+            self.in_thinking = False
+            events.append(ThinkingFinished())
+        text = self._pending + chunk
+        self._pending = ''
+
+        while text:
+            tag = THINK_CLOSE if self.in_thinking else THINK_OPEN
+            index = text.find(tag)
+            if index == -1:
+                held = _partial_tag_length(text, tag)
+                if held:
+                    self._pending = text[-held:]
+                    text = text[:-held]
+                self._emit(events, text)
+                break
+
+            self._emit(events, text[:index])
+            text = text[index + len(tag):]
+            if self.in_thinking:
+                self.in_thinking = False
+                events.append(ThinkingFinished())
+            else:
+                self.in_thinking = True
+                self.seen_thinking = True
+                events.append(ThinkingStarted())
+
+        return events
+
+    def close(self):
+        events = []
+        self._emit(events, self._pending)
+        self._pending = ''
+        return events
+
+    def _emit(self, events, text):
+        if text:
+            events.append(ThinkingDelta(text) if self.in_thinking else AnswerDelta(text))
+
+
+@dataclass
+class ThinkingResult:
+    """Thinking and answer text of a complete response, whitespace-stripped"""
+    thinking: str
+    answer: str
+    has_thinking: bool
+
+
+def parse_chunks(chunks, in_thinking=False):
+    """Generator of events for an iterable of text chunks"""
+    parser = ThinkParser(in_thinking=in_thinking)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def chunk_text(chunk):
+    """Text carried by one Ollama /api/chat or /api/generate chunk.
+
+    Returns ``(thinking, content)``; ``thinking`` is only set by Ollama builds
+    that split reasoning into its own field (``think=True``).
+    """
+    message = chunk.get('message')
+    if message is not None:
+        return message.get('thinking') or '', message.get('content') or ''
+    return chunk.get('thinking') or '', chunk.get('response') or ''
+
+
+def parse_ollama_stream(stream, in_thinking=False):
+    """Generator of events for a streamed Ollama chat/generate response"""
+    parser = ThinkParser(in_thinking=in_thinking)
+    for chunk in stream:
+        thinking, content = chunk_text(chunk)
+        if thinking:
+            yield from parser.feed_thinking(thinking)
+        if content:
+            yield from parser.feed(content)
+    yield from parser.close()
+
+
+def collect(events):
+    """Fold an event stream into a ThinkingResult"""
+    thinking, answer = [], []
+    has_thinking = False
+    for event in events:
+        if isinstance(event, ThinkingDelta):
+            thinking.append(event.text)
+        elif isinstance(event, AnswerDelta):
+            answer.append(event.text)
+        elif isinstance(event, ThinkingStarted):
+            has_thinking = True
+    return ThinkingResult(''.join(thinking).strip(), ''.join(answer).strip(), has_thinking)
+
+
+def split_thinking(response):
+    """Split a complete response (text, or Ollama chat/generate dict) into thinking and answer"""
+    if isinstance(response, str):
+        return collect(parse_chunks([response]))
+    return collect(parse_ollama_stream([response]))
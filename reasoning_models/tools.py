@@ -0,0 +1,385 @@
+"""
+Tool-call execution loop with parallel tool dispatch
+
+The model proposes tool calls, we run them and send the results back until
+it answers in plain text. All tool calls from one model turn are independent,
+so they are dispatched together on a thread pool (or a process pool for
+CPU-bound tools) and the turn waits only for the slowest one instead of the
+sum. Results stream out as each call finishes. Pure tools (same arguments,
+same result, no side effects, like ``calculator``) are memoized, so repeated
+expressions across turns and runs skip the executor entirely.
+
+    executor = ToolExecutor([CALCULATOR])
+    agent = OllamaAgent('http://localhost:11434', 'deepseek-r1:14b', executor)
+    result = agent.run([{'role': 'user', 'content': 'What is 27 * 453 + 12?'}])
+    print(result.answer, executor.stats)
+
+``AnthropicAgent`` runs the same loop against Claude (``tool_use`` blocks,
+thinking blocks passed back unchanged).
+"""
+import ast
+import asyncio
+import json
+import math
+import operator
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from reasoning_models._sync import run_sync
+from reasoning_models.thinking import split_thinking
+from reasoning_models.transport import AsyncOllamaHTTP
+
+MAX_WORKERS = int(os.environ.get('REASONING_TOOL_WORKERS', 8))
+CACHE_SIZE = 4096           # memoized pure-tool results
+MAX_TURNS = 8               # model turns before giving up on a final answer
+MAX_EXPONENT = 10_000
+MAX_POWER_BITS = 100_000     # size bound for integer powers (about 30,000 digits)
+
+_OPERATORS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow,
+    ast.USub: operator.neg, ast.UAdd: operator.pos,
+}
+_FUNCTIONS = {'abs': abs, 'round': round, 'min': min, 'max': max, 'sqrt': math.sqrt,
+              'ceil': math.ceil, 'floor': math.floor}
+
+
+def _check_power(base, exponent):
+    # The exponent alone is not enough: ((10**9999)**9999)**99 has small exponents
+    if abs(exponent) > MAX_EXPONENT:
+        raise ValueError("exponent too large")
+    if isinstance(base, int) and exponent > 0 and abs(base).bit_length() * exponent > MAX_POWER_BITS:
+        raise ValueError("result too large")
+
+
+def _evaluate(node):
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+        left, right = _evaluate(node.left), _evaluate(node.right)
+        if isinstance(node.op, ast.Pow):
+            _check_power(left, right)
+        return _OPERATORS[type(node.op)](left, right)
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _OPERATORS:
+        return _OPERATORS[type(node.op)](_evaluate(node.operand))
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in _FUNCTIONS:
+        return _FUNCTIONS[node.func.id](*(_evaluate(arg) for arg in node.args))
+    raise ValueError(f"unsupported expression: {ast.dump(node)[:60]}")
+
+
+def calculator(expression):
+    """Evaluate an arithmetic expression (no names, attributes or imports)"""
+    value = _evaluate(ast.parse(expression.replace('^', '**').replace(',', ''), mode='eval'))
+    return int(value) if isinstance(value, float) and value.is_integer() else value
+
+
+@dataclass(frozen=True)
+class Tool:
+    """A callable the model may use; ``parameters`` is a JSON schema for its keyword arguments.
+
+    ``pure`` tools are memoized; ``process`` tools run on a process pool (the
+    function must be importable at module level so it can be pickled).
+    """
+    name: str
+    func: object
+    description: str = ''
+    parameters: dict = field(default_factory=lambda: {'type': 'object', 'properties': {}})
+    pure: bool = False
+    process: bool = False
+
+    def ollama(self):
+        """Tool definition for Ollama /api/chat and OpenAI chat completions"""
+        return {'type': 'function',
+                'function': {'name': self.name, 'description': self.description, 'parameters': self.parameters}}
+
+    def anthropic(self):
+        """Tool definition for the Anthropic Messages API"""
+        return {'name': self.name, 'description': self.description, 'input_schema': self.parameters}
+
+
+CALCULATOR = Tool(
+    'calculator', calculator, 'Perform mathematical calculations',
+    {'type': 'object',
+     'properties': {'expression': {'type': 'string', 'description': 'Mathematical expression to evaluate'}},
+     'required': ['expression']},
+    pure=True,
+)
+
+
+@dataclass(frozen=True)
+class ToolCall:
+    id: str
+    name: str
+    arguments: dict
+    error: str | None = None        # the model sent arguments that could not be parsed
+
+
+@dataclass
+class ToolResult:
+    call: ToolCall
+    output: object = None
+    error: str | None = None
+    elapsed: float = 0.0
+    cached: bool = False
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def content(self):
+        """Text sent back to the model"""
+        if self.error is not None:
+            return f"Error: {self.error}"
+        return self.output if isinstance(self.output, str) else json.dumps(self.output, default=str)
+
+
+@dataclass
+class ToolStats:
+    calls: int = 0
+    cache_hits: int = 0
+    errors: int = 0
+    tool_time: float = 0.0      # summed time of executed calls
+    wall_time: float = 0.0      # time turns actually waited for their tools
+
+
+class ToolExecutor:
+    """Runs the tool calls of one turn in parallel and memoizes pure tools"""
+
+    def __init__(self, tools, max_workers=MAX_WORKERS, cache_size=CACHE_SIZE):
+        self.tools = {tool.name: tool for tool in tools}
+        self.max_workers = max_workers
+        self.cache_size = cache_size
+        self.stats = ToolStats()
+        self._cache = OrderedDict()         # (name, arguments json) -> output
+        self._threads = None
+        self._processes = None
+
+    def definitions(self, provider='ollama'):
+        return [getattr(tool, provider)() for tool in self.tools.values()]
+
+    def _pool(self, tool):
+        if tool.process:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(max_workers=min(self.max_workers, os.cpu_count() or 1))
+            return self._processes
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='tool')
+        return self._threads
+
+    async def _run_one(self, call):
+        result = ToolResult(call)
+        self.stats.calls += 1
+        tool = self.tools.get(call.name)
+        if tool is None or call.error is not None:
+            result.error = call.error or f"unknown tool {call.name!r}"
+            self.stats.errors += 1
+            return result
+        key = (call.name, json.dumps(call.arguments, sort_keys=True, default=str))
+        if tool.pure and key in self._cache:
+            self._cache.move_to_end(key)
+            result.output, result.cached = self._cache[key], True
+            self.stats.cache_hits += 1
+            return result
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            if tool.process:
+                result.output = await loop.run_in_executor(self._pool(tool), _call, tool.func, call.arguments)
+            else:
+                result.output = await loop.run_in_executor(self._pool(tool), lambda: tool.func(**call.arguments))
+            result.content()        # an output that cannot be sent back is the tool's error, not the loop's
+        except Exception as e:
+            result.output = None
+            result.error = f"{type(e).__name__}: {e}"
+            self.stats.errors += 1
+        result.elapsed = time.perf_counter() - start
+        self.stats.tool_time += result.elapsed
+        if tool.pure and result.ok:
+            self._cache[key] = result.output
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    async def as_completed(self, calls):
+        """Async generator of ToolResults, each as soon as its call finishes"""
+        start = time.perf_counter()
+        tasks = [asyncio.create_task(self._run_one(call)) for call in calls]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.stats.wall_time += time.perf_counter() - start
+
+    async def arun(self, calls):
+        """All results, in the same order as ``calls``"""
+        order = {id(call): i for i, call in enumerate(calls)}
+        results = [None] * len(calls)
+        async for result in self.as_completed(calls):
+            results[order[id(result.call)]] = result
+        return results
+
+    def run(self, calls):
+        return run_sync(self.arun(list(calls)))
+
+    def close(self):
+        for pool in (self._threads, self._processes):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._threads = self._processes = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _call(func, arguments):
+    return func(**arguments)
+
+
+@dataclass
+class AgentResult:
+    answer: str
+    thinking: str = ''
+    messages: list = field(default_factory=list)
+    tool_results: list = field(default_factory=list)
+    turns: int = 0
+    elapsed: float = 0.0
+    finished: bool = True           # False when MAX_TURNS ran out while tools were still being called
+
+
+@dataclass(frozen=True)
+class TurnFinished:
+    """A model turn and its tool calls are done; ``results`` are in call order"""
+    turn: int
+    results: list
+
+
+class _AgentLoop:
+    """Model turn -> parallel tool calls -> results back, until the model stops calling tools"""
+
+    def __init__(self, executor, max_turns=MAX_TURNS):
+        self.executor = executor
+        self.max_turns = max_turns
+
+    async def _complete(self, messages):
+        """One model turn: ``(assistant message, [ToolCall], answer text, thinking text)``"""
+        raise NotImplementedError
+
+    def _tool_messages(self, results):
+        raise NotImplementedError
+
+    async def stream(self, messages):
+        """Async generator of ToolResults as tools finish, TurnFinished per turn, then the AgentResult"""
+        start = time.perf_counter()
+        messages = list(messages)
+        all_results = []
+        for turn in range(1, self.max_turns + 1):
+            assistant, calls, answer, thinking = await self._complete(messages)
+            messages.append(assistant)
+            if not calls:
+                yield AgentResult(answer, thinking, messages, all_results, turn, time.perf_counter() - start)
+                return
+            order = {id(call): i for i, call in enumerate(calls)}
+            results = [None] * len(calls)
+            async for result in self.executor.as_completed(calls):
+                results[order[id(result.call)]] = result
+                yield result
+            all_results += results
+            messages += self._tool_messages(results)
+            yield TurnFinished(turn, results)
+        yield AgentResult(answer, thinking, messages, all_results, self.max_turns,
+                          time.perf_counter() - start, finished=False)
+
+    async def arun(self, messages):
+        async for event in self.stream(messages):
+            if isinstance(event, AgentResult):
+                return event
+
+    def run(self, messages):
+        return run_sync(self.arun(messages))
+
+
+class OllamaAgent(_AgentLoop):
+    """Tool loop over Ollama /api/chat (``tools=``); ``http`` is a URL, ``AsyncOllamaHTTP`` or ``Router``"""
+
+    def __init__(self, http, model, executor, max_turns=MAX_TURNS, **chat_kwargs):
+        super().__init__(executor, max_turns)
+        self.http = AsyncOllamaHTTP(http) if isinstance(http, str) else http
+        self.model = model
+        self.chat_kwargs = chat_kwargs
+
+    async def _complete(self, messages):
+        response = await self.http.chat(self.model, messages, tools=self.executor.definitions('ollama'),
+                                        **self.chat_kwargs)
+        message = response.get('message') or {}
+        calls = []
+        for i, call in enumerate(message.get('tool_calls') or []):
+            function = call.get('function') or {}
+            arguments, error = function.get('arguments') or {}, None
+            if isinstance(arguments, str):
+                try:
+                    arguments = json.loads(arguments)
+                except json.JSONDecodeError as e:
+                    arguments, error = {}, f"invalid JSON arguments: {e}"
+            if not isinstance(arguments, dict):
+                arguments, error = {}, f"arguments must be a JSON object, got {type(arguments).__name__}"
+            calls.append(ToolCall(call.get('id') or f"call_{i}", function.get('name'), arguments, error))
+        parsed = split_thinking(response)
+        return message, calls, parsed.answer, parsed.thinking
+
+    def _tool_messages(self, results):
+        return [{'role': 'tool', 'tool_name': r.call.name, 'content': r.content()} for r in results]
+
+
+class AnthropicAgent(_AgentLoop):
+    """Tool loop over the Anthropic Messages API; thinking blocks are passed back unchanged"""
+
+    def __init__(self, model, executor, client=None, api_key=None, max_tokens=16000, thinking_budget=None,
+                 max_turns=MAX_TURNS, **create_kwargs):
+        super().__init__(executor, max_turns)
+        self.model = model
+        self._client = client
+        self._api_key = api_key
+        self.max_tokens = max_tokens
+        self.create_kwargs = create_kwargs
+        if thinking_budget:
+            self.create_kwargs['thinking'] = {'type': 'enabled', 'budget_tokens': thinking_budget}
+
+    @property
+    def client(self):
+        if self._client is None:
+            import anthropic
+
+            self._client = anthropic.AsyncAnthropic(api_key=self._api_key)
+        return self._client
+
+    async def _complete(self, messages):
+        response = await self.client.messages.create(
+            model=self.model, max_tokens=self.max_tokens, messages=messages,
+            tools=self.executor.definitions('anthropic'), **self.create_kwargs)
+        calls, answer, thinking = [], [], []
+        for block in response.content:
+            if block.type == 'tool_use':
+                calls.append(ToolCall(block.id, block.name, dict(block.input)))
+            elif block.type == 'text':
+                answer.append(block.text)
+            elif block.type == 'thinking':
+                thinking.append(block.thinking)
+        assistant = {'role': 'assistant', 'content': response.content}
+        return assistant, calls, '\n'.join(answer).strip(), '\n'.join(thinking).strip()
+
+    def _tool_messages(self, results):
+        return [{'role': 'user', 'content': [
+            {'type': 'tool_result', 'tool_use_id': r.call.id, 'content': r.content(), 'is_error': not r.ok}
+            for r in results
+        ]}]
@@ -0,0 +1,384 @@
+"""
+Request/response traffic log (JSONL) and a replay tool
+
+``LoggedOllama`` / ``AsyncLoggedOllama`` wrap an Ollama front end and append
+every outgoing request, each streamed chunk and the end of the call to a
+``TrafficLog`` (by default the process-wide ``get_traffic_log()``). Lines are
+buffered in memory and written in batches (on size or age, never one write
+or fsync per chunk), and the file rotates by size like
+``logging.handlers.RotatingFileHandler`` (``traffic.jsonl.1`` is the previous
+file). Each line is one of:
+
+    {"type": "request", "id": ..., "t": <epoch>, "endpoint": "chat", "model": ..., "body": {...}}
+    {"type": "chunk", "id": ..., "dt": <seconds since the request>, "chunk": {...}}
+    {"type": "end", "id": ..., "dt": ..., "error": null}
+
+The replay tool re-issues a captured log against any endpoint, at the
+original pacing or sped up, streamed or not as captured, and reports latency
+like the benchmark:
+
+    python -m reasoning_models.traffic replay traffic.jsonl --url http://gpu-box:11434 --speed 4
+    python -m reasoning_models.traffic replay traffic.jsonl --fake --speed 0     # as fast as possible
+"""
+import argparse
+import asyncio
+import atexit
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import weakref
+from pathlib import Path
+
+from reasoning_models._sync import run_sync
+from reasoning_models.transport import AsyncOllamaHTTP, OllamaHTTP
+
+TRAFFIC_LOG = Path(os.environ.get(
+    'REASONING_TRAFFIC_LOG',
+    Path.home() / '.cache' / 'oreilly-reasoning-models' / 'traffic.jsonl',
+))
+MAX_BYTES = int(os.environ.get('REASONING_TRAFFIC_MAX_BYTES', 64 * 1024 * 1024))
+BACKUPS = 5
+BUFFER_BYTES = 256 * 1024
+FLUSH_INTERVAL = 1.0
+
+_open_logs = weakref.WeakSet()      # flushed at exit without keeping the logs alive
+
+
+@atexit.register
+def _flush_open_logs():
+    for log in list(_open_logs):
+        log.flush()
+
+
+def log_files(path, backups=BACKUPS):
+    """Existing log files oldest first (rotated backups, then the live file)"""
+    path = Path(path)
+    rotated = [path.with_name(f'{path.name}.{n}') for n in range(backups, 0, -1)]
+    return [p for p in rotated + [path] if p.exists()]
+
+
+class TrafficLog:
+    """Thread-safe, buffered, size-rotated JSONL writer for request traffic"""
+
+    def __init__(self, path=TRAFFIC_LOG, max_bytes=MAX_BYTES, backups=BACKUPS,
+                 buffer_bytes=BUFFER_BYTES, flush_interval=FLUSH_INTERVAL):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.buffer_bytes = buffer_bytes
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._ids = itertools.count(1)
+        self._prefix = f'{os.getpid():x}-{int(time.time()):x}'
+        self._lock = threading.Lock()
+        _open_logs.add(self)
+
+    def _append(self, record):
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._buffer.append(line)
+            self._pending += len(line)
+            due = (self._pending >= self.buffer_bytes
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+            if due:
+                self._flush_locked()
+
+    def request(self, endpoint, model, body):
+        """Log an outgoing request; returns its id and start time for ``chunk``/``end``"""
+        request_id = f'{self._prefix}-{next(self._ids)}'
+        start = time.time()
+        self._append({'type': 'request', 'id': request_id, 't': start, 'endpoint': endpoint,
+                      'model': model, 'body': body})
+        return request_id, time.perf_counter()
+
+    def chunk(self, request_id, start, chunk):
+        self._append({'type': 'chunk', 'id': request_id, 'dt': time.perf_counter() - start,
+                      'chunk': chunk})
+
+    def end(self, request_id, start, error=None):
+        self._append({'type': 'end', 'id': request_id, 'dt': time.perf_counter() - start,
+                      'error': None if error is None else str(error) or type(error).__name__})
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        data = ''.join(self._buffer).encode('utf-8')
+        self._buffer, self._pending = [], 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists() and self.path.stat().st_size + len(data) > self.max_bytes:
+            self._rotate()
+        with open(self.path, 'ab') as f:
+            f.write(data)
+
+    def _rotate(self):
+        for n in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f'{self.path.name}.{n}')
+            if older.exists():
+                os.replace(older, self.path.with_name(f'{self.path.name}.{n + 1}'))
+        if self.backups:
+            os.replace(self.path, self.path.with_name(f'{self.path.name}.1'))
+        else:
+            self.path.unlink()
+
+    def files(self):
+        """Log files oldest first (rotated backups, then the live file)"""
+        return log_files(self.path, self.backups)
+
+    def close(self):
+        self.flush()
+        _open_logs.discard(self)
+
+    def __del__(self):
+        try:
+            self.flush()
+        except Exception:
+            pass
+
+
+_default_log = None
+
+
+def get_traffic_log():
+    """Process-wide log (``REASONING_TRAFFIC_LOG``) shared by every wrapper created without ``log=``"""
+    global _default_log
+    if _default_log is None:
+        _default_log = TrafficLog()
+    return _default_log
+
+
+def _request_body(payload, kwargs):
+    return {**payload, **{k: v for k, v in kwargs.items() if k != 'timeout' and v is not None}}
+
+
+class LoggedOllama:
+    """Front end over ``OllamaHTTP`` (or anything with chat/generate) that logs all traffic"""
+
+    def __init__(self, http, log=None):
+        self.http = OllamaHTTP(http) if isinstance(http, str) else http
+        self.log = log or get_traffic_log()
+
+    def __getattr__(self, name):
+        return getattr(self.http, name)
+
+    def chat(self, model, messages, stream=False, **kwargs):
+        body = _request_body({'messages': messages, 'stream': stream}, kwargs)
+        return self._logged('chat', model, body, stream, lambda: self.http.chat(model, messages, stream=stream,
+                                                                                  **kwargs))
+
+    def generate(self, model, prompt, stream=False, **kwargs):
+        body = _request_body({'prompt': prompt, 'stream': stream}, kwargs)
+        return self._logged('generate', model, body, stream, lambda: self.http.generate(model, prompt,
+                                                                                          stream=stream, **kwargs))
+
+    def _logged(self, endpoint, model, body, stream, call):
+        request_id, start = self.log.request(endpoint, model, body)
+        try:
+            result = call()
+        except Exception as e:
+            self.log.end(request_id, start, e)
+            raise
+        if stream:
+            return self._stream(request_id, start, result)
+        self.log.chunk(request_id, start, result)
+        self.log.end(request_id, start)
+        return result
+
+    def _stream(self, request_id, start, chunks):
+        error = None
+        try:
+            for chunk in chunks:
+                self.log.chunk(request_id, start, chunk)
+                yield chunk
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            # GeneratorExit means the caller stopped reading early
+            self.log.end(request_id, start, 'abandoned' if isinstance(error, GeneratorExit) else error)
+
+
+class AsyncLoggedOllama:
+    """``AsyncOllamaHTTP`` that logs all traffic"""
+
+    def __init__(self, base_url, log=None):
+        self.http = AsyncOllamaHTTP(base_url)
+        self.log = log or get_traffic_log()
+
+    def __getattr__(self, name):
+        return getattr(self.http, name)
+
+    async def chat(self, model, messages, **kwargs):
+        body = _request_body({'messages': messages, 'stream': False}, kwargs)
+        return await self._logged('chat', model, body, self.http.chat(model, messages, **kwargs))
+
+    async def generate(self, model, prompt, **kwargs):
+        body = _request_body({'prompt': prompt, 'stream': False}, kwargs)
+        return await self._logged('generate', model, body, self.http.generate(model, prompt, **kwargs))
+
+    def chat_stream(self, model, messages, **kwargs):
+        body = _request_body({'messages': messages, 'stream': True}, kwargs)
+        return self._stream('chat', model, body, self.http.chat_stream(model, messages, **kwargs))
+
+    def generate_stream(self, model, prompt, **kwargs):
+        body = _request_body({'prompt': prompt, 'stream': True}, kwargs)
+        return self._stream('generate', model, body, self.http.generate_stream(model, prompt, **kwargs))
+
+    async def _logged(self, endpoint, model, body, call):
+        request_id, start = self.log.request(endpoint, model, body)
+        try:
+            result = await call
+        except asyncio.CancelledError:
+            self.log.end(request_id, start, 'abandoned')
+            raise
+        except Exception as e:
+            self.log.end(request_id, start, e)
+            raise
+        self.log.chunk(request_id, start, result)
+        self.log.end(request_id, start)
+        return result
+
+    async def _stream(self, endpoint, model, body, chunks):
+        request_id, start = self.log.request(endpoint, model, body)
+        error = None
+        try:
+            async for chunk in chunks:
+                self.log.chunk(request_id, start, chunk)
+                yield chunk
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            await chunks.aclose()
+            abandoned = isinstance(error, (GeneratorExit, asyncio.CancelledError))
+            self.log.end(request_id, start, 'abandoned' if abandoned else error)
+
+
+def read_log(paths):
+    """Captured requests in start order: dicts with ``t``, ``endpoint``, ``model``, ``body``,
+    ``chunks`` (list of (dt, chunk)), ``duration`` and ``error``. Accepts rotated files."""
+    if isinstance(paths, (str, Path)):
+        paths = log_files(paths) or [Path(paths)]
+    requests = {}
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                kind, request_id = record['type'], record['id']
+                if kind == 'request':
+                    requests[request_id] = {**record, 'chunks': [], 'duration': None, 'error': None}
+                elif request_id in requests:
+                    if kind == 'chunk':
+                        requests[request_id]['chunks'].append((record['dt'], record['chunk']))
+                    else:
+                        requests[request_id].update(duration=record['dt'], error=record['error'])
+    return sorted(requests.values(), key=lambda r: r['t'])
+
+
+async def replay(requests, base_url, speed=1.0, model=None, concurrency=64, timeout=600):
+    """Re-issue captured requests with their original relative timing divided by ``speed``
+    (``speed=0``: back to back), streamed only if they were. Returns one ``CallRecord`` per request."""
+    from reasoning_models.metrics import CallMetrics
+
+    client = AsyncOllamaHTTP(base_url)
+    slots = asyncio.Semaphore(concurrency)
+    t0 = requests[0]['t'] if requests else 0.0
+
+    async def one(captured):
+        endpoint = captured['endpoint']
+        target = model or captured['model']
+        body = {k: v for k, v in captured['body'].items() if k != 'stream'}
+        streamed = captured['body'].get('stream', True)
+        metrics = CallMetrics(endpoint, target, streamed=streamed, original_duration=captured['duration'])
+        last = None
+        async with slots:
+            try:
+                first = body.pop('messages' if endpoint == 'chat' else 'prompt')
+                if streamed:
+                    call = client.chat_stream if endpoint == 'chat' else client.generate_stream
+                    async for chunk in call(target, first, timeout=timeout, **body):
+                        metrics.observe_chunk(chunk)
+                        last = chunk
+                else:
+                    call = client.chat if endpoint == 'chat' else client.generate
+                    last = await call(target, first, timeout=timeout, **body)
+            except Exception as e:
+                return metrics.finish(last, error=e)
+        return metrics.finish(last)
+
+    start = time.perf_counter()
+    tasks = []
+    for captured in requests:
+        if speed:
+            delay = start + (captured['t'] - t0) / speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(captured)))
+    return list(await asyncio.gather(*tasks))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay captured Ollama traffic')
+    sub = parser.add_subparsers(dest='command', required=True)
+    play = sub.add_parser('replay', help='re-issue a captured traffic log against an endpoint')
+    play.add_argument('log', nargs='?', default=str(TRAFFIC_LOG))
+    play.add_argument('--url', default=os.environ.get('OLLAMA_URL', 'http://localhost:11434'))
+    play.add_argument('--fake', action='store_true', help='replay against a local fake Ollama server')
+    play.add_argument('--speed', type=float, default=1.0, help='timing speed-up (0: no pauses)')
+    play.add_argument('--model', help='send every request to this model instead of the captured one')
+    play.add_argument('--limit', type=int, help='only the first N captured requests')
+    play.add_argument('--concurrency', type=int, default=64)
+    play.add_argument('--output', help='write the JSON summary here')
+    args = parser.parse_args(argv)
+
+    from reasoning_models.bench import summarize
+
+    requests = read_log(args.log)[:args.limit]
+    if not requests:
+        print(f"❌ No captured requests in {args.log}")
+        return 1
+
+    server = None
+    base_url = args.url
+    if args.fake:
+        from reasoning_models.fake_server import FakeOllamaConfig, FakeOllamaServer
+
+        models = sorted({args.model} if args.model else {r['model'] for r in requests})
+        server = FakeOllamaServer(FakeOllamaConfig(models=models))
+        base_url = server.start()
+
+    print(f"🔁 Replaying {len(requests)} requests at {'max' if not args.speed else f'{args.speed:g}x'} speed")
+    start = time.perf_counter()
+    try:
+        records = run_sync(replay(requests, base_url, args.speed, args.model, args.concurrency))
+    finally:
+        if server:
+            server.stop()
+    summary = summarize(records, time.perf_counter() - start)
+    captured = [r['duration'] for r in requests if r['duration'] is not None and not r['error']]
+    summary['captured_latency_mean'] = sum(captured) / len(captured) if captured else None
+
+    fmt = lambda v: f"{v:.3f}" if v is not None else '-'
+    print(f"   errors: {summary['errors']}/{summary['requests']}  "
+          f"p50 {fmt(summary['latency_p50'])}s  p95 {fmt(summary['latency_p95'])}s  "
+          f"p99 {fmt(summary['latency_p99'])}s  (captured mean {fmt(summary['captured_latency_mean'])}s)")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"✅ Summary written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,253 @@
+"""
+Shared, pooled keep-alive HTTP layer for all Ollama calls
+
+One connection pool is kept per Ollama host (scheme, host, port), so every
+call to the same server reuses warm TCP connections instead of paying a new
+handshake. The limits apply per host. ``OllamaHTTP`` and ``AsyncOllamaHTTP``
+are thin sync/async front ends over the REST API. ``ollama_client()`` builds an
+``ollama.Client`` that shares the same pool.
+"""
+import asyncio
+import json
+import os
+import threading
+import weakref
+
+import httpx
+
+MAX_CONNECTIONS = int(os.environ.get('OLLAMA_MAX_CONNECTIONS', 8))     # per host
+MAX_KEEPALIVE = int(os.environ.get('OLLAMA_MAX_KEEPALIVE', 8))         # idle connections kept per host
+KEEPALIVE_EXPIRY = float(os.environ.get('OLLAMA_KEEPALIVE_EXPIRY', 120))
+TIMEOUT = float(os.environ.get('OLLAMA_TIMEOUT', 30))
+CONNECT_TIMEOUT = 5.0
+
+_settings = {
+    'max_connections': MAX_CONNECTIONS,
+    'max_keepalive': MAX_KEEPALIVE,
+    'keepalive_expiry': KEEPALIVE_EXPIRY,
+    'timeout': TIMEOUT,
+}
+_lock = threading.Lock()
+_sync_transports = {}                           # host key -> httpx.HTTPTransport
+_sync_clients = {}                              # host key -> httpx.Client
+_async_clients = weakref.WeakKeyDictionary()    # event loop -> {host key: httpx.AsyncClient}
+_retired = weakref.WeakSet()                    # pools replaced by configure(), still used by older clients
+
+
+def configure(max_connections=None, max_keepalive=None, keepalive_expiry=None, timeout=None):
+    """Change pool settings for pools created from now on.
+
+    Existing sync pools stay open for the clients already holding them (an
+    ``ollama_client()`` keeps its transport); new lookups get fresh pools.
+    """
+    updates = {
+        'max_connections': max_connections,
+        'max_keepalive': max_keepalive,
+        'keepalive_expiry': keepalive_expiry,
+        'timeout': timeout,
+    }
+    with _lock:
+        _settings.update({k: v for k, v in updates.items() if v is not None})
+        _retired.update(_sync_clients.values())
+        _retired.update(_sync_transports.values())
+        _sync_clients.clear()
+        _sync_transports.clear()
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=_settings['max_connections'],
+        max_keepalive_connections=_settings['max_keepalive'],
+        keepalive_expiry=_settings['keepalive_expiry'],
+    )
+
+
+def _timeout():
+    return httpx.Timeout(_settings['timeout'], connect=CONNECT_TIMEOUT)
+
+
+def _host_key(base_url):
+    url = httpx.URL(base_url)
+    return url.scheme, url.host, url.port
+
+
+def sync_transport(base_url):
+    """Shared ``httpx.HTTPTransport`` (the connection pool) for this host"""
+    key = _host_key(base_url)
+    with _lock:
+        transport = _sync_transports.get(key)
+        if transport is None:
+            transport = _sync_transports[key] = httpx.HTTPTransport(limits=_limits())
+    return transport
+
+
+def get_client(base_url):
+    """Shared keep-alive ``httpx.Client`` for the host of ``base_url``"""
+    transport = sync_transport(base_url)
+    key = _host_key(base_url)
+    with _lock:
+        client = _sync_clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.Client(base_url=base_url, transport=transport, timeout=_timeout())
+            _sync_clients[key] = client
+    return client
+
+
+def get_async_client(base_url):
+    """Shared keep-alive ``httpx.AsyncClient`` for this host and running event loop"""
+    loop = asyncio.get_running_loop()
+    key = _host_key(base_url)
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=base_url,
+                transport=httpx.AsyncHTTPTransport(limits=_limits()),
+                timeout=_timeout(),
+            )
+            clients[key] = client
+    return client
+
+
+def ollama_client(base_url, **kwargs):
+    """``ollama.Client`` that rides on the shared connection pool for its host"""
+    import ollama
+
+    return ollama.Client(host=base_url, transport=sync_transport(base_url), **kwargs)
+
+
+def close():
+    """Close every sync pool, including ones ``configure`` replaced (async pools: ``aclose``, which
+    ``run_sync`` calls before its loop ends)"""
+    with _lock:
+        clients = list(_sync_clients.values())
+        transports = list(_sync_transports.values())
+        retired = list(_retired)
+        _sync_clients.clear()
+        _sync_transports.clear()
+        _retired.clear()
+    for pool in clients + transports + retired:
+        pool.close()
+
+
+async def aclose():
+    """Close the async pools bound to the running event loop"""
+    with _lock:
+        clients = list(_async_clients.pop(asyncio.get_running_loop(), {}).values())
+    for client in clients:
+        await client.aclose()
+
+
+def _payload(model, stream, extra):
+    payload = {'model': model, 'stream': stream}
+    payload.update({k: v for k, v in extra.items() if v is not None})
+    return payload
+
+
+class OllamaHTTP:
+    """Synchronous Ollama REST front end over the shared pool"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    @property
+    def client(self):
+        return get_client(self.base_url)
+
+    def tags(self, timeout=None):
+        """GET /api/tags"""
+        return self._request('GET', '/api/tags', timeout=timeout)
+
+    def ps(self, timeout=None):
+        """GET /api/ps (models currently loaded in memory)"""
+        return self._request('GET', '/api/ps', timeout=timeout)
+
+    def generate(self, model, prompt, stream=False, timeout=None, **kwargs):
+        """POST /api/generate; returns a dict, or an iterator of chunks when streaming"""
+        payload = _payload(model, stream, {'prompt': prompt, **kwargs})
+        if stream:
+            return self._stream('/api/generate', payload, timeout)
+        return self._request('POST', '/api/generate', json=payload, timeout=timeout)
+
+    def chat(self, model, messages, stream=False, timeout=None, **kwargs):
+        """POST /api/chat; returns a dict, or an iterator of chunks when streaming"""
+        payload = _payload(model, stream, {'messages': messages, **kwargs})
+        if stream:
+            return self._stream('/api/chat', payload, timeout)
+        return self._request('POST', '/api/chat', json=payload, timeout=timeout)
+
+    def _request(self, method, path, json=None, timeout=None):
+        kwargs = {'json': json}
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        response = self.client.request(method, f"{self.base_url}{path}", **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def _stream(self, path, payload, timeout):
+        kwargs = {'json': payload}
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        with self.client.stream('POST', f"{self.base_url}{path}", **kwargs) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+
+class AsyncOllamaHTTP:
+    """Asynchronous Ollama REST front end over the shared pool"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    @property
+    def client(self):
+        return get_async_client(self.base_url)
+
+    async def tags(self, timeout=None):
+        """GET /api/tags"""
+        return await self._request('GET', '/api/tags', timeout=timeout)
+
+    async def ps(self, timeout=None):
+        """GET /api/ps (models currently loaded in memory)"""
+        return await self._request('GET', '/api/ps', timeout=timeout)
+
+    async def generate(self, model, prompt, timeout=None, **kwargs):
+        """POST /api/generate with ``stream=False``"""
+        payload = _payload(model, False, {'prompt': prompt, **kwargs})
+        return await self._request('POST', '/api/generate', json=payload, timeout=timeout)
+
+    async def chat(self, model, messages, timeout=None, **kwargs):
+        """POST /api/chat with ``stream=False``"""
+        payload = _payload(model, False, {'messages': messages, **kwargs})
+        return await self._request('POST', '/api/chat', json=payload, timeout=timeout)
+
+    def generate_stream(self, model, prompt, timeout=None, **kwargs):
+        """Async iterator over streamed /api/generate chunks"""
+        payload = _payload(model, True, {'prompt': prompt, **kwargs})
+        return self._stream('/api/generate', payload, timeout)
+
+    def chat_stream(self, model, messages, timeout=None, **kwargs):
+        """Async iterator over streamed /api/chat chunks"""
+        payload = _payload(model, True, {'messages': messages, **kwargs})
+        return self._stream('/api/chat', payload, timeout)
+
+    async def _request(self, method, path, json=None, timeout=None):
+        kwargs = {'json': json}
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        response = await self.client.request(method, f"{self.base_url}{path}", **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    async def _stream(self, path, payload, timeout):
+        kwargs = {'json': payload}
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        async with self.client.stream('POST', f"{self.base_url}{path}", **kwargs) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line:
+                    yield json.loads(line)
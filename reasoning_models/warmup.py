@@ -0,0 +1,277 @@
+"""
+Model warm-up and keep-alive scheduling for Ollama
+
+Loading ``deepseek-r1:14b`` takes long enough to trip a 30 s timeout, so the
+scheduler pre-loads configured models with an empty-prompt generate carrying
+``keep_alive``, sends an adaptive ``keep_alive`` with every call (a multiple of
+the model's observed gap between calls), re-warms configured models that the
+server dropped, and evicts idle models in LRU order before a load would
+exceed the memory budget. Each call is classified warm or cold from the
+server's ``load_duration`` so the budget and keep-alive can be sized:
+
+    scheduler = WarmupScheduler(url, ['deepseek-r1:14b'], budget=24 * GB)
+    scheduler.warm()
+    response = scheduler.generate('deepseek-r1:14b', 'Hello!')
+    print(scheduler.report())
+"""
+import os
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+
+from reasoning_models.fake_server import parse_duration
+from reasoning_models.transport import OllamaHTTP
+
+GB = 1024 ** 3
+KEEP_ALIVE = float(os.environ.get('OLLAMA_KEEP_ALIVE_SECONDS', 30 * 60))
+MIN_KEEP_ALIVE = 5 * 60.0
+MAX_KEEP_ALIVE = 4 * 3600.0
+KEEP_ALIVE_FACTOR = 3.0         # keep a model loaded for this many average gaps between calls
+MEMORY_BUDGET = float(os.environ.get('OLLAMA_MEMORY_BUDGET_GB', 0)) * GB or None    # None: unlimited
+LOAD_TIMEOUT = 300.0            # a cold 14b load can take minutes on a small GPU
+COLD_LOAD_THRESHOLD = 0.5       # load_duration (s) above which a call counts as cold
+EWMA_ALPHA = 0.3
+NS = 1e9
+
+
+def _parse_expiry(value):
+    """Epoch seconds from an /api/ps ``expires_at`` (nanosecond ISO timestamps included)"""
+    if not value:
+        return None
+    value = re.sub(r'(\.\d{6})\d+', r'\1', value.replace('Z', '+00:00'))
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+@dataclass
+class ModelState:
+    name: str
+    size: int = 0                   # bytes; size_vram from /api/ps once loaded, else /api/tags size
+    pinned: bool = False            # configured for warm-up; re-warmed when dropped
+    loaded: bool = False
+    expires_at: float = 0.0
+    last_used: float = 0.0
+    mean_gap: float | None = None   # EWMA of seconds between calls
+    calls: int = 0
+    warm_calls: int = 0
+    cold_calls: int = 0
+    load_time: float = 0.0          # total seconds spent loading (warm-ups included)
+    evictions: int = 0
+
+    @property
+    def keep_alive(self):
+        if self.mean_gap is None:
+            return KEEP_ALIVE
+        return min(MAX_KEEP_ALIVE, max(MIN_KEEP_ALIVE, KEEP_ALIVE_FACTOR * self.mean_gap))
+
+    def is_warm(self, now=None):
+        return self.loaded and self.expires_at > (now or time.time())
+
+    def expiry(self, now, keep_alive=None):
+        """When the server unloads the model after a call at ``now`` with ``keep_alive`` (None: adaptive)"""
+        seconds = self.keep_alive if keep_alive is None else parse_duration(keep_alive)
+        return float('inf') if seconds < 0 else now + seconds      # negative: kept loaded indefinitely
+
+
+@dataclass(frozen=True)
+class CallHeat:
+    """Whether one call found its model loaded"""
+    timestamp: float
+    model: str
+    cold: bool
+    load_time: float
+    evicted: tuple = ()
+
+
+class WarmupScheduler:
+    """Keeps the configured models loaded within a memory budget and tracks warm/cold calls"""
+
+    def __init__(self, base_url, models=(), budget=MEMORY_BUDGET, http=None, history=1000):
+        self.http = http or OllamaHTTP(base_url)
+        self.budget = budget
+        self.over_budget = 0            # loads that did not fit even after evicting everything
+        self.states = {}
+        self.history = deque(maxlen=history)
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+        for model in models:
+            self._state(model).pinned = True
+
+    def _state(self, model):
+        state = self.states.get(model)
+        if state is None:
+            state = self.states[model] = ModelState(model)
+        return state
+
+    def sync(self):
+        """Refresh sizes and loaded/expiry state from /api/tags and /api/ps"""
+        tags = self.http.tags(timeout=10).get('models', [])
+        loaded = self.http.ps(timeout=10).get('models', [])
+        with self._lock:
+            for entry in tags:
+                state = self.states.get(entry.get('name'))
+                if state and not state.loaded:
+                    state.size = entry.get('size') or state.size
+            running = {entry.get('name'): entry for entry in loaded}
+            for entry in loaded:
+                self._state(entry.get('name'))
+            for name, state in self.states.items():
+                entry = running.get(name)
+                state.loaded = entry is not None
+                if entry:
+                    state.size = entry.get('size_vram') or entry.get('size') or state.size
+                    state.expires_at = _parse_expiry(entry.get('expires_at')) or time.time() + state.keep_alive
+
+    def _used(self, exclude=None):
+        return sum(s.size for s in self.states.values() if s.is_warm() and s.name != exclude)
+
+    def _make_room(self, model):
+        """Evict least recently used loaded models until ``model`` fits; returns evicted names"""
+        state = self._state(model)
+        if self.budget is None or state.is_warm():
+            return ()
+        if not state.size:
+            self.sync()
+        evicted = []
+        with self._lock:
+            victims = sorted((s for s in self.states.values() if s.is_warm() and s.name != model),
+                             key=lambda s: s.last_used)
+            used = self._used(exclude=model)
+            for victim in victims:
+                if used + state.size <= self.budget:
+                    break
+                used -= victim.size
+                evicted.append(victim)
+                victim.loaded = False
+                victim.evictions += 1
+            if used + state.size > self.budget:
+                self.over_budget += 1
+        for victim in evicted:
+            self.http.generate(victim.name, '', keep_alive=0, timeout=LOAD_TIMEOUT)
+        return tuple(victim.name for victim in evicted)
+
+    def _observe(self, model, response, evicted=(), keep_alive=None):
+        now = time.time()
+        load = (response or {}).get('load_duration', 0) / NS
+        cold = load >= COLD_LOAD_THRESHOLD
+        with self._lock:
+            state = self._state(model)
+            if state.last_used:
+                gap = now - state.last_used
+                state.mean_gap = gap if state.mean_gap is None else (
+                    EWMA_ALPHA * gap + (1 - EWMA_ALPHA) * state.mean_gap)
+            state.last_used = now
+            state.calls += 1
+            state.warm_calls += not cold
+            state.cold_calls += cold
+            state.load_time += load
+            state.loaded = True
+            state.expires_at = state.expiry(now, keep_alive)
+        heat = CallHeat(now, model, cold, load, evicted)
+        self.history.append(heat)
+        return heat
+
+    def load(self, model, keep_alive=None):
+        """Load ``model`` now (empty-prompt generate); returns the load time in seconds"""
+        self._make_room(model)
+        state = self._state(model)
+        if keep_alive is None:
+            keep_alive = state.keep_alive
+        response = self.http.generate(model, '', keep_alive=keep_alive, timeout=LOAD_TIMEOUT)
+        load = response.get('load_duration', 0) / NS
+        with self._lock:
+            state.loaded = True
+            state.expires_at = state.expiry(time.time(), keep_alive)
+            state.load_time += load
+        return load
+
+    def warm(self, models=None):
+        """Pre-load the configured (or given) models; returns {model: load seconds}"""
+        try:
+            self.sync()
+        except Exception:
+            pass    # the loads below surface connection problems
+        names = models or [name for name, state in self.states.items() if state.pinned]
+        return {name: 0.0 if self._state(name).is_warm() else self.load(name) for name in names}
+
+    def refresh(self, margin=60.0):
+        """Re-warm pinned models that were dropped or are about to expire while still in use"""
+        now = time.time()
+        refreshed = []
+        for state in list(self.states.values()):
+            expiring = state.is_warm(now) and state.expires_at - now < margin
+            active = state.last_used and now - state.last_used < state.keep_alive
+            if (state.pinned and (not state.is_warm(now) or expiring)) or (expiring and active):
+                self.load(state.name)
+                refreshed.append(state.name)
+        return refreshed
+
+    def start(self, interval=30.0):
+        """Run ``refresh`` on a background thread every ``interval`` seconds"""
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.refresh(margin=2 * interval)
+                except Exception:
+                    pass    # server briefly unreachable; try again next tick
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, name='ollama-warmup', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _call(self, method, model, *args, stream=False, keep_alive=None, **kwargs):
+        evicted = self._make_room(model)
+        requested = keep_alive
+        if keep_alive is None:
+            keep_alive = self._state(model).keep_alive
+        result = method(model, *args, stream=stream, keep_alive=keep_alive, **kwargs)
+        if stream:
+            return self._observe_stream(model, result, evicted, requested)
+        self._observe(model, result, evicted, requested)
+        return result
+
+    def _observe_stream(self, model, chunks, evicted, keep_alive=None):
+        last = None
+        for chunk in chunks:
+            last = chunk
+            yield chunk
+        self._observe(model, last, evicted, keep_alive)
+
+    def generate(self, model, prompt, stream=False, **kwargs):
+        """``http.generate`` with an adaptive keep_alive and budget-aware loading"""
+        return self._call(self.http.generate, model, prompt, stream=stream, **kwargs)
+
+    def chat(self, model, messages, stream=False, **kwargs):
+        """``http.chat`` with an adaptive keep_alive and budget-aware loading"""
+        return self._call(self.http.chat, model, messages, stream=stream, **kwargs)
+
+    def report(self):
+        """Per-model warm/cold counts, load time, keep-alive and evictions"""
+        with self._lock:
+            models = {
+                name: {
+                    'calls': s.calls,
+                    'warm': s.warm_calls,
+                    'cold': s.cold_calls,
+                    'warm_ratio': s.warm_calls / s.calls if s.calls else None,
+                    'load_time': s.load_time,
+                    'keep_alive': s.keep_alive,
+                    'loaded': s.is_warm(),
+                    'size': s.size,
+                    'evictions': s.evictions,
+                }
+                for name, s in self.states.items()
+            }
+            return {'budget': self.budget, 'used': self._used(),
+                    'over_budget_loads': self.over_budget, 'models': models}
@@ -2,12 +2,18 @@
 """
 Robust test of Ollama with both Python client and direct requests
 """
-import ollama
-import requests
+import httpx
 import json
 import os
 from dotenv import load_dotenv
 
+from reasoning_models.endpoints import EndpointPool
+from reasoning_models.batch import BatchRunner, expand_jobs
+from reasoning_models.metrics import InstrumentedOllama, MetricsRecorder
+from reasoning_models.router import Router
+from reasoning_models.transport import ollama_client
+from reasoning_models.warmup import WarmupScheduler
+
 # Load environment variables
 load_dotenv()
 
@@ -18,38 +24,33 @@ OLLAMA_URLS = [
 ]
 
 MODEL_NAME = 'deepseek-r1:14b'
+# Set to 1 to also send a few real generations through the router
+ROUTER_GENERATE = os.getenv('OLLAMA_TEST_ROUTER_GENERATE') == '1'
 
 def test_direct_requests():
-    """Test using direct HTTP requests (more reliable)"""
+    """Probe all Ollama URLs concurrently and return the best one with the model"""
     print("🔍 Testing direct HTTP requests...")
     
-    for url in OLLAMA_URLS:
-        print(f"   Trying: {url}")
-        try:
-            # Test connection
-            response = requests.get(f"{url}/api/tags", timeout=5)
-            if response.status_code == 200:
-                models_data = response.json()
-                models = models_data.get('models', [])
-                model_names = [model.get('name', 'unnamed') for model in models]
-                
-                print(f"   ✅ Connected! Found {len(models)} models")
-                
-                if MODEL_NAME in model_names:
-                    print(f"   ✅ {MODEL_NAME} available")
-                    return url
-                else:
-                    print(f"   ❌ {MODEL_NAME} not in: {model_names[:3]}...")
+    pool = EndpointPool(OLLAMA_URLS, model=MODEL_NAME)
+    working_url = pool.resolve()
+    
+    for record in pool.ranked():
+        if not record.last_checked:
+            continue
+        print(f"   Trying: {record.url}")
+        if record.healthy:
+            print(f"   ✅ Connected in {record.latency * 1000:.0f} ms! Found {len(record.models)} models")
+            if MODEL_NAME in record.models:
+                print(f"   ✅ {MODEL_NAME} available")
             else:
-                print(f"   ❌ HTTP {response.status_code}")
-                
-        except Exception as e:
-            print(f"   ❌ Error: {e}")
+                print(f"   ❌ {MODEL_NAME} not in: {record.models[:3]}...")
+        else:
+            print(f"   ❌ Error: {record.last_error}")
     
-    return None
+    return working_url
 
 def test_direct_generate(base_url):
-    """Test generate using direct HTTP"""
+    """Test generate using direct HTTP (shared keep-alive pool)"""
     print(f"\n🧪 Testing direct generate call...")
     
     payload = {
@@ -59,26 +60,58 @@ def test_direct_generate(base_url):
     }
     
     try:
-        response = requests.post(f"{base_url}/api/generate", json=payload, timeout=30)
-        if response.status_code == 200:
-            result = response.json()
-            answer = result.get('response', 'No response')
-            print(f"✅ DeepSeek says: {answer}")
-            return True
-        else:
-            print(f"❌ Generate failed: {response.status_code}")
-            print(f"Response: {response.text}")
-            return False
+        recorder = MetricsRecorder(os.getenv('REASONING_METRICS_PATH'))
+        # Pre-load the model so the 30s timeout only covers generation
+        scheduler = WarmupScheduler(base_url, [MODEL_NAME], http=InstrumentedOllama(base_url, recorder))
+        load_time = scheduler.warm()[MODEL_NAME]
+        print(f"   🔥 {MODEL_NAME} ready ({'already loaded' if not load_time else f'loaded in {load_time:.1f}s'})")
+        result = scheduler.generate(timeout=30, **payload)
+        answer = result.get('response', 'No response')
+        print(f"✅ DeepSeek says: {answer}")
+        
+        stats = recorder.records[-1]
+        heat = 'cold' if scheduler.history[-1].cold else 'warm'
+        print(f"   ⏱️  Wall time: {stats.wall_time:.2f}s | Model load: {stats.load_time or 0:.2f}s ({heat})")
+        print(f"   📝 Tokens: {stats.prompt_tokens} prompt, {stats.output_tokens} output "
+              f"({stats.thinking_tokens} thinking / {stats.answer_tokens} answer)")
+        if stats.tokens_per_second:
+            print(f"   ⚡ Throughput: {stats.tokens_per_second:.1f} tokens/sec")
+        return True
+    except httpx.HTTPStatusError as e:
+        print(f"❌ Generate failed: {e.response.status_code}")
+        print(f"Response: {e.response.text}")
+        return False
     except Exception as e:
         print(f"❌ Error: {e}")
         return False
 
+def test_router():
+    """Check every Ollama host's models (/api/tags) and loaded models (/api/ps) through the router.
+
+    With OLLAMA_TEST_ROUTER_GENERATE=1, also spreads a few requests over the healthy hosts.
+    """
+    print(f"\n🔀 Testing router across {len(OLLAMA_URLS)} hosts...")
+    
+    router = Router(OLLAMA_URLS)
+    router.refresh()
+    if ROUTER_GENERATE:
+        prompts = [f"What's {i}+{i}? Answer with the number only." for i in range(2 * len(OLLAMA_URLS))]
+        results = BatchRunner(router=router, timeout=120).run(expand_jobs(prompts, [MODEL_NAME]))
+        print(f"   ✅ {sum(r.ok for r in results)}/{len(results)} requests succeeded")
+    report = router.report()
+    for url, host in report.items():
+        state = '🟢' if host['up'] else '🔴'
+        has_model = '✅' if MODEL_NAME in host['available'] else '❌'
+        print(f"   {state} {url}: {len(host['available'])} models ({MODEL_NAME} {has_model}), "
+              f"loaded: {', '.join(host['loaded']) or 'none'}, served {host['served']}")
+    return any(host['up'] for host in report.values())
+
 def test_ollama_client(base_url):
     """Test the Ollama Python client"""
     print(f"\n🔍 Testing Ollama Python client...")
     
     try:
-        client = ollama.Client(host=base_url)
+        client = ollama_client(base_url)
         
         # Try different methods to check models
         try:
@@ -145,6 +178,10 @@ def main():
         print("❌ Direct HTTP generate failed")
         return
     
+    # Test 2b: all hosts at once
+    if not test_router():
+        print("⚠️  No Ollama host is up")
+    
     # Test 3: Ollama Python client
     client = test_ollama_client(working_url)
     
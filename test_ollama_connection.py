@@ -4,10 +4,13 @@ Test script for connecting to Ollama running in WSL2 from Windows
 """
 import socket
 import subprocess
-import requests
+import httpx
 import json
 import os
 
+from reasoning_models.endpoints import EndpointPool
+from reasoning_models.warmup import WarmupScheduler
+
 def get_wsl_ip():
     """Get the IP address of WSL2 from Windows"""
     try:
@@ -22,7 +25,7 @@ def get_wsl_ip():
     return None
 
 def test_ollama_urls():
-    """Test various URLs to connect to Ollama"""
+    """Test various URLs to connect to Ollama (all probed concurrently)"""
     
     # Get WSL IP
     wsl_ip = get_wsl_ip()
@@ -37,25 +40,19 @@ def test_ollama_urls():
     if wsl_ip:
         test_urls.insert(0, f'http://{wsl_ip}:11434')  # WSL2 IP (most likely to work)
     
+    pool = EndpointPool(test_urls)
+    pool.probe_all()
+    
     working_urls = []
     
-    for url in test_urls:
-        print(f"\n🔍 Testing: {url}")
-        try:
-            response = requests.get(f"{url}/api/tags", timeout=3)
-            if response.status_code == 200:
-                print(f"✅ SUCCESS! Connected to {url}")
-                models = response.json()
-                print(f"   Found {len(models.get('models', []))} models")
-                working_urls.append(url)
-            else:
-                print(f"❌ HTTP {response.status_code}")
-        except requests.exceptions.ConnectionError:
-            print(f"❌ Connection refused")
-        except requests.exceptions.Timeout:
-            print(f"❌ Timeout")
-        except Exception as e:
-            print(f"❌ Error: {e}")
+    for record in pool.ranked():
+        print(f"\n🔍 Testing: {record.url}")
+        if record.healthy:
+            print(f"✅ SUCCESS! Connected to {record.url} ({record.latency * 1000:.0f} ms)")
+            print(f"   Found {len(record.models)} models")
+            working_urls.append(record.url)
+        else:
+            print(f"❌ {record.last_error}")
     
     return working_urls
 
@@ -70,14 +67,15 @@ def test_deepseek_chat(base_url):
     }
     
     try:
-        response = requests.post(f"{base_url}/api/generate", json=payload, timeout=30)
-        if response.status_code == 200:
-            result = response.json()
-            print(f"✅ DeepSeek Response: {result.get('response', 'No response')}")
-            return True
-        else:
-            print(f"❌ Generate failed: {response.status_code}")
-            return False
+        scheduler = WarmupScheduler(base_url, [payload["model"]])
+        scheduler.warm()
+        result = scheduler.generate(timeout=30, **payload)
+        heat = 'cold' if scheduler.history[-1].cold else 'warm'
+        print(f"✅ DeepSeek Response ({heat} model): {result.get('response', 'No response')}")
+        return True
+    except httpx.HTTPStatusError as e:
+        print(f"❌ Generate failed: {e.response.status_code}")
+        return False
     except Exception as e:
         print(f"❌ Error testing chat: {e}")
         return False
@@ -0,0 +1,48 @@
+"""ThinkingBudget cut-off, abort and forced continuation against scripted chats"""
+from reasoning_models.budget import FORCE_ANSWER, BudgetExceeded, ThinkingBudget
+from reasoning_models.thinking import AnswerDelta, ThinkingDelta, ThinkingFinished, ThinkingStarted
+
+
+class ScriptedChat:
+    """``chat(stream=True)`` returning scripted content chunks, one script per call"""
+
+    def __init__(self, *scripts):
+        self.scripts = list(scripts)
+        self.requests = []
+
+    def chat(self, model, messages, stream=True, **kwargs):
+        self.requests.append(messages)
+        return ({'message': {'role': 'assistant', 'content': text}} for text in self.scripts.pop(0))
+
+
+THINKING = ['<think>', 'one', ' two', ' three', ' four', '</think>', 'answer']
+
+
+def test_abort_ends_the_thinking_block():
+    events = list(ThinkingBudget(ScriptedChat(THINKING), max_thinking_tokens=2, on_exceed='abort')
+                  .stream('m', [{'role': 'user', 'content': 'q'}]))
+    assert events == [ThinkingStarted(), ThinkingDelta('one'), ThinkingDelta(' two'),
+                      BudgetExceeded('tokens', 2, events[3].elapsed), ThinkingFinished()]
+
+
+def test_continue_prefills_the_thinking_so_far():
+    chat = ScriptedChat(THINKING, ['Four', '.'])
+    budget = ThinkingBudget(chat, max_thinking_tokens=2)
+    events = list(budget.stream('m', [{'role': 'user', 'content': 'q'}]))
+    assert events[-3:] == [ThinkingFinished(), AnswerDelta('Four'), AnswerDelta('.')]
+    prefill = chat.requests[1][-1]
+    assert prefill == {'role': 'assistant', 'content': '<think>one two' + FORCE_ANSWER}
+    assert budget.stats.continued and budget.stats.exceeded == 'tokens'
+
+
+def test_continue_does_not_reopen_a_block_the_template_opened():
+    chat = ScriptedChat(THINKING[1:], ['Four'])
+    list(ThinkingBudget(chat, max_thinking_tokens=2, in_thinking=True).stream('m', []))
+    assert chat.requests[1][-1]['content'] == 'one two' + FORCE_ANSWER
+
+
+def test_within_budget_passes_through():
+    budget = ThinkingBudget(ScriptedChat(THINKING), max_thinking_tokens=10)
+    result = budget.complete('m', [])
+    assert (result.thinking, result.answer) == ('one two three four', 'answer')
+    assert budget.stats.exceeded is None and budget.stats.thinking_tokens == 4
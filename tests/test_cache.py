@@ -0,0 +1,67 @@
+"""ResponseCache keys, stream storage and eviction"""
+import pytest
+
+from reasoning_models.batch import BatchRunner, expand_jobs
+from reasoning_models.cache import CachedOllama, ResponseCache, cache_key
+from reasoning_models.fake_server import FakeOllamaConfig, FakeOllamaServer
+
+MODEL = 'deepseek-r1:1.5b'
+MESSAGES = [{'role': 'user', 'content': 'What is 2+2?'}]
+
+
+class CountingHTTP:
+    """Upstream stub: one canned response per call, counted"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def chat(self, model, messages, stream=False, **kwargs):
+        self.calls += 1
+        response = {'model': model, 'message': {'role': 'assistant', 'content': '4'}, 'done': True}
+        return iter([response]) if stream else response
+
+
+@pytest.fixture
+def cache():
+    cache = ResponseCache(':memory:')
+    yield cache
+    cache.close()
+
+
+def test_transport_kwargs_do_not_change_the_key():
+    key = cache_key('chat', MODEL, messages=MESSAGES, options={'seed': 1})
+    assert cache_key('chat', MODEL, messages=MESSAGES, options={'seed': 1}, timeout=30, keep_alive='5m',
+                     stream=True) == key
+    assert cache_key('chat', MODEL, messages=MESSAGES, options={'seed': 2}) != key
+
+
+def test_batch_runner_and_cached_client_share_entries(cache):
+    config = FakeOllamaConfig(models=[MODEL], token_rate=5000, load_time=0.0)
+    with FakeOllamaServer(config) as server:
+        [result] = BatchRunner(server.base_url, cache=cache, timeout=60).run(expand_jobs(['What is 2+2?'], [MODEL]))
+    assert result.ok
+    upstream = CountingHTTP()
+    client = CachedOllama(None, cache=cache, http=upstream)
+    assert client.chat(MODEL, MESSAGES, timeout=30, keep_alive='10m') == result.response
+    assert upstream.calls == 0
+
+
+def test_streamed_and_single_responses_are_kept_apart(cache):
+    upstream = CountingHTTP()
+    client = CachedOllama(None, cache=cache, http=upstream)
+    chunks = list(client.chat(MODEL, MESSAGES, stream=True))
+    response = client.chat(MODEL, MESSAGES)
+    assert list(client.chat(MODEL, MESSAGES, stream=True)) == chunks
+    assert client.chat(MODEL, MESSAGES) == response
+    assert upstream.calls == 2
+    assert cache.stats()['entries'] == 2
+
+
+def test_eviction_keeps_the_total_under_budget(cache):
+    cache.max_bytes = 10_000
+    for i in range(200):
+        cache.put(f'k{i}', MODEL, {'text': 'x' * 200})
+    stats = cache.stats()
+    assert stats['bytes'] <= cache.max_bytes
+    assert cache._bytes == stats['bytes']
+    assert cache.get('k199') is not None and cache.get('k0') is None
@@ -0,0 +1,96 @@
+"""Cascade thresholds: vote counting, share parsing and offline replay/sweep against exact fractions"""
+import itertools
+import random
+from fractions import Fraction
+
+import pytest
+
+from reasoning_models.cascade import (GRID, Attempt, agrees, format_share, parse_share, replay, sweep,
+                                      votes_needed)
+
+SHARES = sorted({Fraction(c, s) for s in range(1, 10) for c in range(s + 1)}
+                | {Fraction(g).limit_denominator(100) for g in GRID})
+
+
+@pytest.mark.parametrize('samples', range(1, 10))
+def test_votes_needed_matches_exact_fractions(samples):
+    for share in SHARES:
+        threshold = float(share)
+        exact = [c for c in range(samples + 1) if Fraction(c, samples) >= share]
+        assert votes_needed(threshold, samples) == max(1, exact[0]), (share, samples)
+        for count in range(samples + 1):
+            assert agrees(count / samples, threshold) == (Fraction(count, samples) >= share), (count, samples, share)
+
+
+def test_shares_round_trip():
+    for value in GRID:
+        assert parse_share(format_share(value)) == pytest.approx(value)
+    assert parse_share(' 2/3 ') == 2 / 3
+    assert format_share(2 / 3) == '2/3'
+    assert Attempt('t', answer='1', agreement=2 / 3, valid=True).confident(2 / 3)
+    assert not Attempt('t', answer='1', agreement=1.0, valid=False).confident(0.0)
+
+
+def random_records(rng, tiers, n):
+    records = []
+    for _ in range(n):
+        reference = rng.choice(['1', '2', None])
+        results = {}
+        for name, samples in tiers:
+            answer = rng.choice(['1', '2', None])
+            count = rng.randint(1, samples) if answer is not None else 0
+            results[name] = {'answer': answer, 'agreement': count / samples, 'count': count, 'samples': samples,
+                             'valid': answer is not None and rng.random() < 0.9,
+                             'latency': rng.randint(1, 20) / 10, 'cost': rng.randint(0, 5) / 100}
+        records.append({'prompt': 'p', 'reference': reference, 'tiers': results})
+    return records
+
+
+def brute_force_replay(records, tiers, thresholds):
+    """Walk each record with exact fractions; returns (accuracy, cost, accepted counts)"""
+    accepted = {name: 0 for name in tiers}
+    correct = judged = 0
+    cost = 0
+    for record in records:
+        reference = record['reference'] or record['tiers'][tiers[-1]]['answer']
+        for name in tiers:
+            attempt = record['tiers'][name]
+            cost += Fraction(round(attempt['cost'] * 100), 100)
+            threshold = Fraction(thresholds.get(name, 0.0)).limit_denominator(100)
+            if name == tiers[-1] or (attempt['valid'] and Fraction(attempt['count'], attempt['samples']) >= threshold):
+                accepted[name] += 1
+                answer = attempt['answer']
+                break
+        if reference is not None:
+            judged += 1
+            correct += answer == reference
+    return (correct / judged if judged else None), cost, accepted
+
+
+def test_replay_matches_brute_force():
+    rng = random.Random(7)
+    tiers = [('small', 3), ('medium', 5), ('large', 1)]
+    names = [name for name, _ in tiers]
+    records = random_records(rng, tiers, 200)
+    for values in itertools.product(GRID, repeat=2):
+        thresholds = dict(zip(names, values))
+        report = replay(records, names, thresholds)
+        accuracy, cost, accepted = brute_force_replay(records, names, thresholds)
+        assert report['accuracy'] == pytest.approx(accuracy)
+        assert report['cost'] == pytest.approx(float(cost))
+        assert report['share'] == {name: accepted[name] / len(records) for name in names}
+
+
+def test_sweep_picks_the_cheapest_setting_on_target():
+    rng = random.Random(3)
+    names = ['small', 'large']
+    records = random_records(rng, [('small', 3), ('large', 1)], 100)
+    best, reports = sweep(records, names, GRID, target=0.5)
+    assert len(reports) == len(GRID)
+    costs = [r['cost'] for r in reports]
+    assert costs == sorted(costs)
+    eligible = [r for r in reports if r['accuracy'] is not None and r['accuracy'] >= 0.5]
+    assert best is (eligible[0] if eligible else None)
+    # The strictest threshold escalates everything, so it always reproduces the top tier's answers
+    strict = replay(records, names, {'small': 1.0 + 1e-3})
+    assert strict['share']['large'] == 1.0
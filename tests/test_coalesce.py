@@ -0,0 +1,186 @@
+"""Single-flight coalescing: one upstream call per identical in-flight request"""
+import asyncio
+import threading
+
+import pytest
+
+from reasoning_models.coalesce import AsyncSingleFlight, SingleFlight, merge_chunks
+
+CHUNKS = [{'message': {'role': 'assistant', 'thinking': 'hm'}, 'done': False},
+          {'message': {'role': 'assistant', 'content': 'Hel'}, 'done': False},
+          {'message': {'role': 'assistant', 'content': 'lo'}, 'done': False},
+          {'message': {'role': 'assistant', 'content': ''}, 'done': True, 'eval_count': 3}]
+
+
+class GatedHTTP:
+    """Streams ``CHUNKS`` one at a time, each only after ``release()``"""
+
+    def __init__(self, fail_after=None):
+        self.calls = []
+        self.closed = 0
+        self.fail_after = fail_after
+        self.gate = threading.Semaphore(0)
+
+    def release(self, n=len(CHUNKS)):
+        for _ in range(n):
+            self.gate.release()
+
+    def chat(self, model, messages, stream=False, **kwargs):
+        assert stream
+        self.calls.append((model, messages, kwargs))
+        return self._stream()
+
+    def _stream(self):
+        try:
+            for i, chunk in enumerate(CHUNKS):
+                if i == self.fail_after:
+                    raise ConnectionError('upstream went away')
+                self.gate.acquire(timeout=5)
+                yield chunk
+        finally:
+            self.closed += 1
+
+
+def in_thread(fn):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault('value', fn()))
+    thread.start()
+    return thread, result
+
+
+def wait_for(predicate):
+    for _ in range(500):
+        if predicate():
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError('timed out')
+
+
+def test_merge_chunks():
+    merged = merge_chunks(CHUNKS)
+    assert merged['message'] == {'role': 'assistant', 'content': 'Hello', 'thinking': 'hm'}
+    assert merged['done'] and merged['eval_count'] == 3
+    generated = merge_chunks([{'response': 'a', 'thinking': 't'}, {'response': 'b', 'done': True}])
+    assert generated == {'response': 'ab', 'thinking': 't', 'done': True}
+    assert merge_chunks([]) == {}
+
+
+def test_concurrent_streamed_and_plain_callers_share_one_upstream_call():
+    http = GatedHTTP()
+    flight = SingleFlight(http)
+    messages = [{'role': 'user', 'content': 'hi'}]
+    plain, plain_result = in_thread(lambda: flight.chat('m', messages, options={'seed': 1}))
+    wait_for(lambda: http.calls)
+    http.release(2)
+    # Joins late, with a different timeout: still the same request, so the prefix is replayed
+    streamed, streamed_result = in_thread(
+        lambda: list(flight.chat('m', messages, stream=True, options={'seed': 1}, timeout=9)))
+    wait_for(lambda: flight.coalesced == 1)
+    http.release()
+    plain.join(5)
+    streamed.join(5)
+    assert len(http.calls) == flight.upstream == 1
+    assert streamed_result['value'] == CHUNKS
+    assert plain_result['value'] == merge_chunks(CHUNKS)
+    assert http.closed == 1
+
+
+def test_different_requests_are_not_coalesced():
+    http = GatedHTTP()
+    http.release(100)
+    flight = SingleFlight(http)
+    messages = [{'role': 'user', 'content': 'hi'}]
+    flight.chat('m', messages, options={'seed': 1})
+    flight.chat('m', messages, options={'seed': 2})
+    flight.chat('m', messages, options={'seed': 1})     # the first flight is over: not remembered
+    assert flight.upstream == 3 and flight.coalesced == 0
+
+
+def test_errors_reach_every_waiter():
+    http = GatedHTTP(fail_after=2)
+    flight = SingleFlight(http)
+    messages = [{'role': 'user', 'content': 'hi'}]
+    errors = []
+
+    def call():
+        try:
+            flight.chat('m', messages)
+        except ConnectionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: flight.upstream + flight.coalesced == 3)
+    http.release()
+    for thread in threads:
+        thread.join(5)
+    assert len(errors) == 3 and flight.upstream == 1
+
+
+def test_abandoned_flight_closes_upstream():
+    http = GatedHTTP()
+    flight = SingleFlight(http)
+    stream = flight.chat('m', [{'role': 'user', 'content': 'hi'}], stream=True)
+    http.release(1)
+    assert next(stream) == CHUNKS[0]
+    stream.close()
+    http.release()
+    wait_for(lambda: http.closed == 1)
+    assert not flight._flights
+
+
+class AsyncGatedHTTP:
+    def __init__(self):
+        self.calls = 0
+        self.closed = 0
+        self.gate = None
+
+    async def chat_stream(self, model, messages, **kwargs):
+        self.calls += 1
+        try:
+            for chunk in CHUNKS:
+                await self.gate.wait()
+                yield chunk
+        finally:
+            self.closed += 1
+
+
+def test_async_concurrent_callers_share_one_upstream_call():
+    async def scenario():
+        http = AsyncGatedHTTP()
+        http.gate = asyncio.Event()
+        flight = AsyncSingleFlight(http)
+        messages = [{'role': 'user', 'content': 'hi'}]
+
+        async def streamed():
+            return [c async for c in flight.chat_stream('m', messages, keep_alive='5m')]
+
+        tasks = [asyncio.create_task(flight.chat('m', messages)) for _ in range(3)]
+        tasks.append(asyncio.create_task(streamed()))
+        await asyncio.sleep(0.01)
+        http.gate.set()
+        results = await asyncio.gather(*tasks)
+        return http, flight, results
+
+    http, flight, results = asyncio.run(scenario())
+    assert http.calls == flight.upstream == 1 and flight.coalesced == 3
+    assert results[:3] == [merge_chunks(CHUNKS)] * 3
+    assert results[3] == CHUNKS
+
+
+def test_async_abandoned_flight_cancels_upstream():
+    async def scenario():
+        http = AsyncGatedHTTP()
+        http.gate = asyncio.Event()
+        flight = AsyncSingleFlight(http)
+        task = asyncio.create_task(flight.chat('m', [{'role': 'user', 'content': 'hi'}]))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.01)
+        return http, flight
+
+    http, flight = asyncio.run(scenario())
+    assert http.closed == 1 and not flight._flights
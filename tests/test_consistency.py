@@ -0,0 +1,66 @@
+"""Self-consistency voting against a scripted async front end"""
+import asyncio
+
+import pytest
+
+from reasoning_models.consistency import SelfConsistency, extract_answer
+
+
+class ScriptedHTTP:
+    """``chat_stream`` that answers by seed: ``{seed: (delay, chunks)}``"""
+
+    def __init__(self, script):
+        self.script = script
+
+    async def chat_stream(self, model, messages, options=None, **kwargs):
+        delay, chunks = self.script[options['seed']]
+        await asyncio.sleep(delay)
+        for thinking, content in chunks:
+            yield {'message': {'role': 'assistant', 'thinking': thinking, 'content': content}, 'done': False}
+
+
+def answer(text, delay=0.0):
+    return delay, [('Let me add.', ''), ('', text)]
+
+
+def run(script, **kwargs):
+    return SelfConsistency(ScriptedHTTP(script), **kwargs).run('m', [{'role': 'user', 'content': 'q'}])
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('The answer is 12231 (27 × 453).', '12231'),
+    ('So \\boxed{1,024}', '1024'),
+    ('Half of it: 2/4', '1/2'),
+    ('27 * 453 = 12231', '12231'),
+    ('It costs $4.50', '4.5'),
+    ('Paris', 'paris'),
+    ('', None),
+])
+def test_extract_answer(text, expected):
+    assert extract_answer(text) == expected
+
+
+def test_votes_of_samples_finished_before_the_early_stop_count():
+    # Samples 0-2 finish in the same loop turn; the majority of 2 is reached before as_completed yields sample 2
+    script = {0: answer('4'), 1: answer('4'), 2: answer('4'), 3: answer('5', 30), 4: answer('5', 30)}
+    result = run(script, n=5, majority=2)
+    assert result.early_stopped
+    assert result.answer == '4'
+    assert result.votes == {'4': 3}
+    assert result.completed == 3
+    assert result.agreement == 1.0
+    assert [s.cancelled for s in result.samples] == [False, False, False, True, True]
+
+
+def test_ties_go_to_the_lowest_sample_index():
+    script = {0: answer('7', 0.02), 1: answer('3'), 2: answer('7'), 3: answer('3', 0.01)}
+    result = run(script, n=4, majority=4)
+    assert list(result.votes) == ['7', '3']
+    assert result.answer == '7'
+
+
+def test_chunk_with_thinking_and_content_counts_both():
+    script = {0: (0.0, [('Adding.', ''), ('Done.', 'The answer'), ('', ' is 4.')])}
+    sample = run(script, n=1).samples[0]
+    assert (sample.thinking_tokens, sample.answer_tokens) == (2, 2)
+    assert sample.answer == '4'
@@ -0,0 +1,68 @@
+"""LatencyHistogram buckets, percentiles and merge against exact values"""
+import random
+
+import pytest
+
+from reasoning_models.histogram import HALF, LatencyHistogram
+
+BUCKET_ERROR = 1 / HALF
+
+
+def exact_percentile(values, q):
+    ordered = sorted(values)
+    return ordered[max(1, round(len(ordered) * q / 100)) - 1]
+
+
+def test_bucket_upper_bound_within_stated_error():
+    histogram = LatencyHistogram(unit=1)
+    rng = random.Random(0)
+    for value in [rng.randint(0, 10 ** 9) for _ in range(50_000)] + [0, 1, 2 * HALF - 1, 2 * HALF, 2 ** 20]:
+        upper = histogram._value(histogram._index(value))
+        assert value <= upper <= value * (1 + BUCKET_ERROR)
+        assert histogram._index(value) <= histogram._index(value + 1)
+
+
+@pytest.mark.parametrize('q', [1, 50, 90, 99, 99.9, 100])
+def test_percentiles_match_sorted_values(q):
+    rng = random.Random(q)
+    values = [rng.lognormvariate(-1, 1.5) for _ in range(20_000)]
+    histogram = LatencyHistogram(max_seconds=3600)
+    for value in values:
+        histogram.record(value)
+    exact = exact_percentile(values, q)
+    # One microsecond of truncation plus the bucket width
+    assert exact - 1e-6 <= histogram.percentile(q) <= exact * (1 + BUCKET_ERROR) + 1e-6
+    assert histogram.percentile(100) == max(values)
+
+
+def test_merge_equals_recording_everything_in_one():
+    rng = random.Random(1)
+    a_values = [rng.expovariate(2) for _ in range(5000)]
+    b_values = [rng.expovariate(0.2) for _ in range(3000)]
+    a, b, both = LatencyHistogram(600), LatencyHistogram(600), LatencyHistogram(600)
+    for value in a_values:
+        a.record(value)
+        both.record(value)
+    for value in b_values:
+        b.record(value)
+        both.record(value)
+    a.merge(b)
+    assert a.counts == both.counts
+    assert (a.count, a.min, a.max) == (both.count, both.min, both.max)
+    assert a.total == pytest.approx(both.total)
+    assert a.summary() == pytest.approx(both.summary())
+
+
+def test_values_past_the_range_land_in_the_last_bucket():
+    histogram = LatencyHistogram(max_seconds=1.0)
+    histogram.record(5.0)
+    assert histogram.counts[-1] == 1
+    assert histogram.percentile(50) == 5.0
+
+
+def test_empty_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) is None
+    assert histogram.mean is None
+    histogram.merge(LatencyHistogram())
+    assert histogram.count == 0 and histogram.min is None
@@ -0,0 +1,34 @@
+"""CLI startup must not import heavy modules (``main.py import-check``, which runs ``-X importtime``)"""
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+MAIN = Path(__file__).resolve().parent.parent / 'main.py'
+
+
+def import_check(*argv, allow=()):
+    options = [f'--allow={name}' for name in allow]
+    return subprocess.run([sys.executable, str(MAIN), 'import-check', *options, '--', *argv],
+                          capture_output=True, text=True, cwd=MAIN.parent)
+
+
+@pytest.mark.parametrize('argv, allow', [
+    (['--help'], ()),
+    (['health', '--help'], ()),
+    (['generate', '--help'], ()),
+    (['score', '--help'], ()),
+    (['import-check', '--help'], ()),
+    # bench takes its arguments from reasoning_models.bench, which needs the HTTP layer
+    (['bench', '--help'], ('httpx',)),
+])
+def test_startup_imports(argv, allow):
+    result = import_check(*argv, allow=allow)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+
+def test_nested_heavy_imports_are_caught():
+    result = import_check('bench', '--help')
+    assert result.returncode == 1
+    assert 'Heavy modules imported at startup: httpx' in result.stdout
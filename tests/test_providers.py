@@ -0,0 +1,76 @@
+"""Recorded provider streams replayed through each backend's ``normalize``"""
+import asyncio
+from pathlib import Path
+
+from reasoning_models.accounting import usage_input_tokens
+from reasoning_models.providers import Usage, replay_fixture
+from reasoning_models.thinking import AnswerDelta, ThinkingDelta, ThinkingFinished, ThinkingStarted
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+
+def replay(provider):
+    async def consume():
+        return [event async for event in replay_fixture(FIXTURES / f'{provider}_stream.jsonl', provider)]
+    return asyncio.run(consume())
+
+
+def test_anthropic_thinking_blocks():
+    events = replay('anthropic')
+    assert events[:-1] == [
+        ThinkingStarted(),
+        ThinkingDelta('Adding two and two gives four. '),
+        ThinkingDelta('Double-check: ok.'),
+        ThinkingFinished(),
+        AnswerDelta('The answer'),
+        AnswerDelta(' is 4.'),
+    ]
+    # 48 of 64 streamed characters are thinking: 3/4 of the 40 output tokens
+    assert events[-1] == Usage('anthropic', 'fixture', input_tokens=25, output_tokens=40, thinking_tokens=30,
+                               cached_tokens=100, stop_reason='end_turn')
+
+
+def test_anthropic_input_tokens_exclude_cache_reads():
+    usage = replay('anthropic')[-1]
+    assert usage.input_tokens == 25
+    assert usage_input_tokens(usage) == 125
+
+
+def test_openai_reasoning_content():
+    events = replay('openai')
+    assert events[:-1] == [
+        ThinkingStarted(),
+        ThinkingDelta('Two and two'),
+        ThinkingDelta(' make four.'),
+        ThinkingFinished(),
+        AnswerDelta('The answer'),
+        AnswerDelta(' is 4.'),
+    ]
+    usage = events[-1]
+    assert usage == Usage('openai', 'fixture', input_tokens=120, output_tokens=300, thinking_tokens=256,
+                          cached_tokens=64, stop_reason='stop')
+    # OpenAI's prompt_tokens already include the cached ones
+    assert usage_input_tokens(usage) == 120
+
+
+def test_ollama_think_tags_split_across_chunks():
+    events = replay('ollama')
+    assert events[:-1] == [
+        ThinkingStarted(),
+        ThinkingDelta('Two and'),
+        ThinkingDelta(' two'),
+        ThinkingDelta(' is four.'),
+        ThinkingFinished(),
+        AnswerDelta('\n\n'),
+        AnswerDelta('4'),
+    ]
+    # 3 thinking chunks and 2 answer chunks share the 8 output tokens
+    assert events[-1] == Usage('ollama', 'fixture', input_tokens=12, output_tokens=8, thinking_tokens=5,
+                               cached_tokens=None, stop_reason='stop')
+
+
+def test_every_stream_ends_with_one_usage():
+    for provider in ('anthropic', 'openai', 'ollama'):
+        events = replay(provider)
+        assert [type(e) for e in events].count(Usage) == 1
+        assert isinstance(events[-1], Usage)
@@ -0,0 +1,74 @@
+"""Router picking and mid-stream chat failover with scripted hosts"""
+import asyncio
+
+import httpx
+
+from reasoning_models.router import Router
+
+
+class ScriptedHost:
+    """``chat_stream`` yielding ``(thinking, content)`` chunks, raising ``fail`` after them if set.
+
+    A failing host reports the model as loaded, so the router tries it first.
+    """
+
+    def __init__(self, chunks, fail=None):
+        self.chunks = chunks
+        self.fail = fail
+        self.requests = []
+
+    async def tags(self, **kwargs):
+        return {'models': [{'name': 'm'}]}
+
+    async def ps(self, **kwargs):
+        return {'models': [{'name': 'm'}] if self.fail else []}
+
+    async def chat_stream(self, model, messages, **kwargs):
+        self.requests.append(messages)
+        for thinking, content in self.chunks:
+            yield {'message': {'role': 'assistant', 'thinking': thinking, 'content': content}, 'done': False}
+        if self.fail:
+            raise self.fail
+
+
+def make_router(*hosts):
+    router = Router([f'http://host{i}:11434' for i in range(len(hosts))], cooldown=60)
+    for host, http in zip(router.hosts.values(), hosts):
+        host.http = http
+    return router
+
+
+def stream(router, messages):
+    async def consume():
+        return [chunk async for chunk in router.chat_stream('m', messages)]
+    return asyncio.run(consume())
+
+
+def test_resume_carries_thinking_from_the_separate_field():
+    broken = ScriptedHost([('Two and', ''), (' two', ''), ('', 'The answer')], fail=httpx.ReadError('reset'))
+    spare = ScriptedHost([('', ' is 4.')])
+    router = make_router(broken, spare)
+    messages = [{'role': 'user', 'content': 'What is 2+2?'}]
+    chunks = stream(router, messages)
+    assert len(chunks) == 4
+    assert spare.requests[0] == messages + [
+        {'role': 'assistant', 'content': '<think>Two and two</think>The answer'}]
+    report = router.report()
+    assert report['http://host0:11434']['failovers'] == 1
+    assert report['http://host1:11434']['served'] == 1
+
+
+def test_resume_mid_thinking_leaves_the_block_open():
+    broken = ScriptedHost([('Two and', '')], fail=httpx.ReadError('reset'))
+    spare = ScriptedHost([(' two', ''), ('', '4')])
+    router = make_router(broken, spare)
+    stream(router, [])
+    assert spare.requests[0][-1] == {'role': 'assistant', 'content': '<think>Two and'}
+
+
+def test_inline_think_tags_are_resumed_as_sent():
+    broken = ScriptedHost([('', '<think>Two'), ('', '</think>4')], fail=httpx.ReadError('reset'))
+    spare = ScriptedHost([('', '.')])
+    router = make_router(broken, spare)
+    stream(router, [])
+    assert spare.requests[0][-1] == {'role': 'assistant', 'content': '<think>Two</think>4'}
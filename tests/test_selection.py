@@ -0,0 +1,65 @@
+"""Top-k and Pareto frontier against brute force, with ties and duplicate rows"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from reasoning_models.scoring import Criterion, ScoringEngine
+from reasoning_models.selection import pareto_frontier, pareto_mask, stream_top_k, top_k
+
+
+def brute_force_mask(points):
+    """Rows that no other row beats: >= on every column and > on one (larger is better)"""
+    ge = (points[None, :, :] >= points[:, None, :]).all(axis=2)
+    gt = (points[None, :, :] > points[:, None, :]).any(axis=2)
+    return ~(ge & gt).any(axis=1)
+
+
+def engine_for(dims):
+    # Alternate directions so negation of lower-is-better criteria is exercised too
+    return ScoringEngine([Criterion(f'c{i}', 100, higher_is_better=i % 2 == 0) for i in range(dims)])
+
+
+@pytest.mark.parametrize('dims', [1, 2, 3, 4])
+@pytest.mark.parametrize('levels', [3, 10, 1000])   # few levels: many ties and duplicate rows
+def test_pareto_mask_matches_brute_force(dims, levels):
+    rng = np.random.default_rng(dims * 1000 + levels)
+    engine = engine_for(dims)
+    signs = np.array([1.0 if c.higher_is_better else -1.0 for c in engine.criteria])
+    for n in (1, 2, 7, 60, 300):
+        data = rng.integers(0, levels, size=(n, dims)).astype(float)
+        expected = brute_force_mask(data * signs)
+        assert (pareto_mask(data, engine) == expected).all(), data
+
+
+def test_duplicates_of_a_frontier_row_are_all_kept():
+    engine = engine_for(3)
+    data = np.array([[5, 1, 5], [5, 1, 5], [4, 1, 5], [5, 2, 5], [1, 0, 9]], dtype=float)
+    assert list(pareto_mask(data, engine)) == [True, True, False, False, True]
+
+
+def test_pareto_frontier_frame():
+    frame = pd.DataFrame({'model': ['a', 'b', 'c', 'd'], 'intelligence': [90, 80, 70, 90],
+                          'speed': [100, 200, 150, 100], 'cost': [10, 5, 5, 12]})
+    assert list(pareto_frontier(frame)['model']) == ['a', 'b']
+
+
+@pytest.mark.parametrize('k', [0, 1, 5, 50, 200])
+def test_top_k_matches_a_stable_sort(k):
+    rng = np.random.default_rng(k)
+    scores = rng.integers(0, 20, 100).astype(float)     # plenty of ties
+    result = top_k(scores, k)
+    expected = np.argsort(-scores, kind='stable')[:k]
+    assert list(scores[result]) == list(scores[expected])
+    assert len(set(result.tolist())) == len(result) == min(k, 100)
+
+
+def test_stream_top_k_matches_in_memory(tmp_path):
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({'model': [f'm{i}' for i in range(1000)], 'intelligence': rng.uniform(0, 100, 1000),
+                          'speed': rng.uniform(0, 500, 1000), 'cost': rng.uniform(0, 100, 1000)})
+    path = tmp_path / 'catalog.csv'
+    frame.to_csv(path, index=False)
+    weights = {'intelligence': 0.5, 'speed': 0.3, 'cost': 0.2}
+    best = stream_top_k(path, 10, weights=weights, chunksize=97)
+    scored = ScoringEngine().score_frame(pd.read_csv(path), weights)
+    assert list(best['model']) == list(scored['model'].iloc[:10])
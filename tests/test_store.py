@@ -0,0 +1,93 @@
+"""ColumnStore dtype widening, time queries and concurrent segment naming"""
+import math
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from reasoning_models.metrics import CallRecord
+from reasoning_models.store import ColumnStore
+
+
+def test_dtypes_widen_across_segments(tmp_path):
+    with ColumnStore(tmp_path, segment_rows=2) as store:
+        store.append([{'timestamp': 1.0, 'tokens': 10, 'ok': True}, {'timestamp': 2.0, 'tokens': 20, 'ok': True}])
+        store.append([{'timestamp': 3.0, 'tokens': 2.5, 'ok': False, 'model': 'a'},
+                      {'timestamp': 4.0, 'tokens': None, 'ok': True, 'model': 'b'}])
+        store.append([{'timestamp': 5.0, 'tokens': 'many', 'ok': True, 'model': 'a'}])
+    assert store.schema == {'timestamp': 'float64', 'tokens': 'str', 'ok': 'bool', 'model': 'str'}
+    assert [s.meta['columns']['tokens']['dtype'] for s in store.segments()] == ['int64', 'float64', 'str']
+
+    # A reopened store starts from the widened schema of every segment
+    assert ColumnStore(tmp_path).schema == store.schema
+
+    frame = ColumnStore(tmp_path).to_frame()
+    assert list(frame['timestamp']) == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert list(frame['model'].iloc[2:]) == ['a', 'b', 'a']
+    assert frame['model'].iloc[:2].isna().all()       # segment written before the column existed
+
+
+def test_a_late_none_widens_int_to_float(tmp_path):
+    with ColumnStore(tmp_path) as store:
+        store.append([{'timestamp': 1.0, 'n': 1}, {'timestamp': 2.0}])
+    assert store.schema['n'] == 'float64'
+    assert math.isnan(ColumnStore(tmp_path).to_frame()['n'].iloc[1])
+
+
+def test_explicit_schema_rejects_unknown_columns(tmp_path):
+    store = ColumnStore(tmp_path, schema={'timestamp': 'float64', 'n': 'int64'})
+    store.append({'timestamp': 1.0, 'n': 1, 'extra': 'x'})
+    with pytest.raises(ValueError, match='extra'):
+        store.flush()
+
+
+@pytest.mark.parametrize('timestamp', [None, float('nan'), np.float64('nan')])
+def test_rows_need_a_time(tmp_path, timestamp):
+    store = ColumnStore(tmp_path)
+    store.append({'timestamp': 1.0})
+    with pytest.raises(ValueError, match='timestamp'):
+        store.append({'timestamp': timestamp})
+    with pytest.raises(ValueError, match='timestamp'):
+        store.append({'value': 1})
+
+
+def test_time_range_queries_match_a_mask(tmp_path):
+    rng = np.random.default_rng(0)
+    times = rng.uniform(0, 1000, 5000)
+    with ColumnStore(tmp_path, segment_rows=700) as store:
+        store.append([{'timestamp': t, 'value': i} for i, t in enumerate(times)])
+    for start, end in [(None, None), (100, 200), (None, 50), (990, None), (2000, 3000), (333.3, 333.3)]:
+        frame = store.to_frame(start=start, end=end)
+        expected = times[((start is None) | (times >= (start or 0))) & ((end is None) | (times <= (end or 0)))]
+        assert sorted(frame['timestamp']) == sorted(expected)
+
+
+def test_dataclass_schema(tmp_path):
+    with ColumnStore(tmp_path, schema=CallRecord) as store:
+        store.append(CallRecord(1.0, 'chat', 'm'))
+    frame = store.to_frame(columns=['timestamp', 'model', 'output_tokens'])
+    assert list(frame.columns) == ['timestamp', 'model', 'output_tokens']
+    assert frame['output_tokens'].dtype == np.float64
+
+
+def test_segment_number_taken_by_another_writer(tmp_path, monkeypatch):
+    store = ColumnStore(tmp_path)
+    rename = os.rename
+
+    def racing_rename(src, dst):
+        # Another process writes this segment number between our glob and our rename
+        if not os.path.exists(dst) and 'seg-00000000' in str(dst):
+            other = ColumnStore(tmp_path)
+            other.append({'timestamp': 0.5})
+            monkeypatch.setattr(os, 'rename', rename)
+            other.flush()
+            monkeypatch.setattr(os, 'rename', racing_rename)
+        return rename(src, dst)
+
+    monkeypatch.setattr(os, 'rename', racing_rename)
+    store.append([{'timestamp': 1.0}, {'timestamp': 2.0}])
+    store.flush()
+    assert [p.name for p in sorted(tmp_path.glob('seg-*'))] == ['seg-00000000', 'seg-00000001']
+    assert sorted(ColumnStore(tmp_path).to_frame()['timestamp']) == [0.5, 1.0, 2.0]
+    assert not list(tmp_path.glob('.tmp-*'))
@@ -0,0 +1,59 @@
+"""Traffic capture and replay against the fake Ollama server"""
+import asyncio
+
+import pytest
+
+from reasoning_models import traffic
+from reasoning_models.fake_server import FakeOllamaConfig, FakeOllamaServer
+from reasoning_models.traffic import AsyncLoggedOllama, LoggedOllama, TrafficLog, read_log, replay
+
+MODEL = 'deepseek-r1:1.5b'
+
+
+@pytest.fixture
+def server():
+    config = FakeOllamaConfig(models=[MODEL], token_rate=5000, load_time=0.0, thinking_tokens=4, answer_tokens=4)
+    with FakeOllamaServer(config) as server:
+        yield server
+
+
+def test_replay_keeps_the_captured_stream_flag(server, tmp_path):
+    log = TrafficLog(tmp_path / 'traffic.jsonl')
+    http = LoggedOllama(server.base_url, log=log)
+    http.generate(MODEL, 'Hi')
+    list(http.chat(MODEL, [{'role': 'user', 'content': 'Hi'}], stream=True))
+    log.close()
+
+    captured = read_log(tmp_path / 'traffic.jsonl')
+    assert [(r['endpoint'], r['body']['stream'], r['error']) for r in captured] == [
+        ('generate', False, None), ('chat', True, None)]
+    records = asyncio.run(replay(captured, server.base_url, speed=0))
+    assert [(r.endpoint, r.streamed, r.ok) for r in records] == [('generate', False, True), ('chat', True, True)]
+    assert all(r.output_tokens for r in records)
+
+
+def test_read_log_does_not_open_a_log(tmp_path):
+    path = tmp_path / 'traffic.jsonl'
+    path.write_text('')
+    before = len(traffic._open_logs)
+    assert read_log(path) == []
+    assert len(traffic._open_logs) == before
+
+
+def test_cancelled_async_call_is_logged_as_ended(tmp_path):
+    log = TrafficLog(tmp_path / 'traffic.jsonl')
+
+    async def cancel_mid_call(http):
+        task = asyncio.create_task(http.generate(MODEL, 'Hi'))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    # About two seconds of generation, cancelled after a tenth of one
+    with FakeOllamaServer(FakeOllamaConfig(models=[MODEL], token_rate=50, load_time=0.0)) as slow:
+        asyncio.run(cancel_mid_call(AsyncLoggedOllama(slow.base_url, log=log)))
+    log.close()
+    [captured] = read_log(tmp_path / 'traffic.jsonl')
+    assert captured['error'] == 'abandoned'
+    assert captured['duration'] is not None
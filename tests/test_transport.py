@@ -0,0 +1,43 @@
+"""Shared connection pools: reuse per host and reconfiguration"""
+import pytest
+
+from reasoning_models import transport
+from reasoning_models.fake_server import FakeOllamaConfig, FakeOllamaServer
+
+
+@pytest.fixture
+def server():
+    with FakeOllamaServer(FakeOllamaConfig(models=['m:1'])) as server:
+        yield server
+    transport.close()
+
+
+def test_one_pool_per_host(server):
+    assert transport.sync_transport(server.base_url) is transport.sync_transport(server.base_url + '/')
+    assert transport.get_client(server.base_url) is transport.get_client(server.base_url)
+
+
+def test_configure_leaves_existing_clients_working(server):
+    client = transport.ollama_client(server.base_url)
+    before = transport.sync_transport(server.base_url)
+    client.list()
+    warm = list(before._pool.connections)
+    try:
+        transport.configure(max_connections=2)
+        after = transport.sync_transport(server.base_url)
+        assert after is not before
+        assert after._pool._max_connections == 2
+        # The client keeps its pool and its warm keep-alive connection
+        assert before._pool.connections == warm and warm
+        assert [m.model for m in client.list().models] == ['m:1']
+        assert transport.OllamaHTTP(server.base_url).tags()['models'][0]['name'] == 'm:1'
+    finally:
+        transport.configure(max_connections=transport.MAX_CONNECTIONS)
+
+
+def test_close_also_closes_replaced_pools(server):
+    transport.ollama_client(server.base_url)
+    old = transport.sync_transport(server.base_url)
+    transport.configure(timeout=transport.TIMEOUT)
+    transport.close()
+    assert not transport._retired
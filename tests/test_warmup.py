@@ -0,0 +1,40 @@
+"""WarmupScheduler keep-alive handling against the fake Ollama server"""
+import pytest
+
+from reasoning_models.fake_server import FakeOllamaConfig, FakeOllamaServer
+from reasoning_models.transport import OllamaHTTP
+from reasoning_models.warmup import WarmupScheduler
+
+MODEL = 'deepseek-r1:14b'
+
+
+@pytest.fixture
+def server():
+    with FakeOllamaServer(FakeOllamaConfig(models=[MODEL], token_rate=5000, load_time=0.01)) as server:
+        yield server
+
+
+def loaded(server):
+    return [m['name'] for m in OllamaHTTP(server.base_url).ps().get('models', [])]
+
+
+def test_explicit_zero_keep_alive_unloads(server):
+    scheduler = WarmupScheduler(server.base_url)
+    scheduler.load(MODEL, keep_alive=0)
+    assert not scheduler.states[MODEL].is_warm()
+    scheduler.generate(MODEL, 'Hi', keep_alive=0)
+    assert loaded(server) == []
+    assert not scheduler.report()['models'][MODEL]['loaded']
+
+
+def test_default_keep_alive_is_adaptive(server):
+    scheduler = WarmupScheduler(server.base_url)
+    scheduler.generate(MODEL, 'Hi')
+    assert loaded(server) == [MODEL]
+    assert scheduler.states[MODEL].is_warm()
+
+
+def test_negative_keep_alive_never_expires(server):
+    scheduler = WarmupScheduler(server.base_url)
+    scheduler.generate(MODEL, 'Hi', keep_alive='-1')
+    assert scheduler.states[MODEL].expires_at == float('inf')